@@ -36,11 +36,9 @@ function runScript(scriptName) {
 
 async function main() {
     try {
-        // Lista de scripts a ejecutar en orden
+        // Extracción, merge de PDFs y merge de CSVs en un solo proceso de Python
         const scripts = [
-            "scripts/extract.py",
-            "scripts/merge_data.py",
-            "scripts/merge_csv_data.py"
+            "scripts/pipeline.py"
         ];
 
         for (const script of scripts) {
@@ -0,0 +1,151 @@
+import os
+import logging
+import pandas as pd
+
+# Agregados acumulados del almacén de extracciones: tabla -> {columna: expresión SQL sobre pedidos}.
+# Cada tabla guarda, por combinación de claves, las filas, los pedidos (Numero_Pedido no nulo) y
+# el total en centavos (entero, para que sumar y restar lotes no acumule error de redondeo).
+# Las claves nulas se guardan como '' (una clave primaria de SQLite no agrupa los NULL).
+AGGREGATES = {
+    'analisis_tipo': {'Tipo_Docto': 'Tipo_Docto', 'Descripcion': 'Descripcion'},
+    'analisis_cheque': {'Cheque': 'Cheque', 'Proveedor': 'Proveedor', 'Descripcion': 'Descripcion'},
+    'analisis_proveedor': {'Proveedor': 'Proveedor', 'Descripcion': 'Descripcion'},
+    'analisis_mes': {'Mes': 'substr(Fecha_Pedido, 1, 7)', 'Descripcion': 'Descripcion'},
+}
+
+# Versión de los agregados (PRAGMA user_version del almacén); si la base es anterior se reconstruyen
+AGGREGATES_VERSION = 1
+
+# Reporte de conciliación por cheque, proveedor y mes
+RECONCILIATION_FILE = os.path.join('RESULTADOFINAL', 'conciliacion_cheques.xlsx')
+
+
+def summarize_doc_types(doc_analysis):
+    """
+    Completa el análisis por tipo de documento (Tipo_Docto, Descripcion, Numero_Pedido, Total)
+    con el porcentaje de pedidos y lo ordena de mayor a menor, como la hoja 'Análisis'
+    """
+    total_docs = doc_analysis['Numero_Pedido'].sum()
+    # Convertir a porcentaje (si deseas que sea 0-100, multiplica por 100, o déjalo entre 0 y 1)
+    doc_analysis['Porcentaje'] = (doc_analysis['Numero_Pedido'] / total_docs).round(2)
+    return doc_analysis.sort_values('Numero_Pedido', ascending=False)
+
+
+class RunningAggregates:
+    """
+    Agregados por tipo de documento, cheque, proveedor y mes que se mantienen en el mismo
+    almacén SQLite que los pedidos. ExtractionStore los actualiza en la misma transacción en
+    que agrega o elimina filas: add_rows() suma solo el lote recién insertado y remove_rows()
+    resta las filas antes de borrarlas, así nunca se recalculan sobre todo el historial.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        for table, keys in AGGREGATES.items():
+            columns = ''.join(f"{col} TEXT NOT NULL, " for col in keys)
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {columns}Filas INTEGER NOT NULL,
+                    Pedidos INTEGER NOT NULL,
+                    Centavos INTEGER NOT NULL,
+                    PRIMARY KEY ({', '.join(keys)})
+                )
+            """)
+        self.conn.commit()
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < AGGREGATES_VERSION:
+            self.rebuild()
+
+    def rebuild(self):
+        """Recalcula todos los agregados desde los pedidos (solo al crear o actualizar la base)"""
+        with self.conn:
+            for table in AGGREGATES:
+                self.conn.execute(f"DELETE FROM {table}")
+            self._apply(1, "1", ())
+            self.conn.execute(f"PRAGMA user_version = {AGGREGATES_VERSION}")
+        logging.info("Agregados de análisis reconstruidos desde el almacén")
+
+    def add_rows(self, after_rowid):
+        """Suma a los agregados las filas insertadas después de after_rowid (sin confirmar)"""
+        self._apply(1, "rowid > ?", (after_rowid,))
+
+    def remove_rows(self, where, params):
+        """Resta de los agregados las filas que cumplen where, antes de eliminarlas (sin confirmar)"""
+        self._apply(-1, where, params)
+
+    def _apply(self, sign, where, params):
+        for table, keys in AGGREGATES.items():
+            columns = ', '.join(keys)
+            expressions = ', '.join(f"IFNULL({expr}, '')" for expr in keys.values())
+            groups = ', '.join(str(i) for i in range(1, len(keys) + 1))
+            self.conn.execute(f"""
+                INSERT INTO {table} ({columns}, Filas, Pedidos, Centavos)
+                SELECT {expressions}, {sign} * COUNT(*), {sign} * COUNT(Numero_Pedido),
+                       {sign} * IFNULL(SUM(CAST(ROUND(Total * 100) AS INTEGER)), 0)
+                FROM pedidos WHERE {where} GROUP BY {groups}
+                ON CONFLICT ({columns}) DO UPDATE SET
+                    Filas = Filas + excluded.Filas,
+                    Pedidos = Pedidos + excluded.Pedidos,
+                    Centavos = Centavos + excluded.Centavos
+            """, params)
+            if sign < 0:
+                self.conn.execute(f"DELETE FROM {table} WHERE Filas = 0")
+
+    def doc_types(self):
+        """
+        Análisis por tipo de documento de la hoja 'Análisis' (mismas columnas que el groupby
+        histórico sobre todo el acumulado, que omitía los tipos o descripciones vacíos); None si no hay datos
+        """
+        doc_analysis = pd.read_sql_query(
+            "SELECT Tipo_Docto, Descripcion, Pedidos AS Numero_Pedido, Centavos / 100.0 AS Total "
+            "FROM analisis_tipo WHERE Tipo_Docto != '' AND Descripcion != '' "
+            "ORDER BY Tipo_Docto, Descripcion", self.conn
+        )
+        if doc_analysis.empty:
+            return None
+        return summarize_doc_types(doc_analysis)
+
+    def summary(self, table):
+        """
+        Tabla de un agregado con una fila por clave (sin la descripción): documentos, una columna
+        con el importe de cada descripción y el neto
+        """
+        keys = [col for col in AGGREGATES[table] if col != 'Descripcion']
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(keys)}, Descripcion, Filas, Centavos FROM {table} ORDER BY {', '.join(keys)}",
+            self.conn
+        )
+        if df.empty:
+            return pd.DataFrame(columns=keys + ['Documentos', 'Neto'])
+        importes = df.pivot_table(index=keys, columns='Descripcion', values='Centavos',
+                                  aggfunc='sum', fill_value=0) / 100
+        importes.columns = [descripcion or 'SIN DESCRIPCION' for descripcion in importes.columns]
+        report = df.groupby(keys)['Filas'].sum().rename('Documentos').to_frame().join(importes)
+        report['Neto'] = importes.sum(axis=1)
+        return report.reset_index()
+
+
+def write_reconciliation(aggregates, report_file=RECONCILIATION_FILE):
+    """
+    Escribe el reporte de conciliación: hoja 'Cheques' (documentos e importes por tipo de
+    documento y neto de cada cheque), 'Proveedores' y 'Meses', a partir de los agregados
+    """
+    sheets = {
+        'Cheques': aggregates.summary('analisis_cheque'),
+        'Proveedores': aggregates.summary('analisis_proveedor'),
+        'Meses': aggregates.summary('analisis_mes'),
+    }
+    report_dir = os.path.dirname(report_file)
+    if report_dir and not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+    with pd.ExcelWriter(report_file, engine='xlsxwriter') as writer:
+        money_format = writer.book.add_format({'num_format': '$#,##0.00'})
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+            worksheet = writer.sheets[name]
+            first_amount = df.columns.get_loc('Documentos') + 1
+            worksheet.set_column(0, first_amount - 2, 25)  # Claves (cheque, proveedor o mes)
+            worksheet.set_column(first_amount - 1, first_amount - 1, 12)  # Documentos
+            worksheet.set_column(first_amount, len(df.columns) - 1, 18, money_format)  # Importes y neto
+    logging.info(f"Reporte de conciliación guardado en: {report_file} "
+                 f"({len(sheets['Cheques'])} cheques)")
+    return report_file
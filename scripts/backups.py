@@ -0,0 +1,130 @@
+import os
+import re
+import gzip
+import errno
+import shutil
+import logging
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl de Linux para clonar un archivo por referencia (btrfs, XFS, etc.)
+FICLONE = 0x40049409
+
+BACKUP_PREFIX = 'Concentrado_Sears_backup_'
+# Fecha del respaldo: segundos, microsegundos (opcionales en respaldos anteriores) y un contador
+# si aun así el nombre ya existe
+_TIMESTAMP_RE = re.compile(r'_(\d{8}_\d{6})(?:_(\d{6}))?(?:-(\d+))?\.xlsx(\.gz)?$')
+
+
+class BackupPolicy:
+    """
+    Política de respaldos del concentrado:
+    - keep_last: respaldos más recientes que siempre se conservan (None = conservar todos)
+    - keep_daily: además, el más reciente de cada uno de los últimos N días con respaldo
+    - keep_weekly: además, el más reciente de cada una de las últimas N semanas con respaldo
+    - compress: guardar el respaldo comprimido con gzip (.xlsx.gz)
+    """
+
+    def __init__(self, keep_last=20, keep_daily=14, keep_weekly=8, compress=False):
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+        self.compress = compress
+
+
+def copy_file(src, dst):
+    """
+    Copia un archivo byte a byte. En Linux intenta primero un reflink (copia instantánea que
+    comparte bloques hasta que alguno se modifica). No se usan enlaces duros: openpyxl reescribe
+    el concentrado en el mismo inodo y el respaldo cambiaría junto con él.
+    El destino se crea en modo exclusivo: si ya existe se lanza FileExistsError y no se toca.
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'xb') as fdst:
+        cloned = False
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                cloned = True
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                    raise
+        if not cloned:
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+    shutil.copystat(src, dst)
+
+
+def create_backup(src, backup_dir, label='', policy=None):
+    """Respalda src en backup_dir aplicando la política de retención; devuelve la ruta del respaldo"""
+    policy = policy or BackupPolicy()
+    if not os.path.exists(src):
+        return None
+    if not os.path.exists(backup_dir):
+        os.makedirs(backup_dir)
+
+    # Nombre con microsegundos; si ya existe (p. ej. dos respaldos en el mismo instante) se agrega
+    # un contador. Los archivos se crean en modo exclusivo: un respaldo nunca se sobrescribe
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    extension = '.xlsx.gz' if policy.compress else '.xlsx'
+    counter = 0
+    while True:
+        suffix = f'-{counter}' if counter else ''
+        backup_file = os.path.join(backup_dir, f'{BACKUP_PREFIX}{label}{timestamp}{suffix}{extension}')
+        try:
+            if policy.compress:
+                with open(src, 'rb') as fsrc, gzip.open(backup_file, 'xb', compresslevel=6) as fdst:
+                    shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+            else:
+                copy_file(src, backup_file)
+            break
+        except FileExistsError:
+            counter += 1
+    logging.info(f"Backup creado: {backup_file}")
+
+    apply_retention(backup_dir, policy)
+    return backup_file
+
+
+def list_backups(backup_dir):
+    """Respaldos del concentrado (fecha, contador, ruta), del más reciente al más antiguo"""
+    backups = []
+    for filename in os.listdir(backup_dir):
+        match = _TIMESTAMP_RE.search(filename)
+        if filename.startswith(BACKUP_PREFIX) and match:
+            created = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+            created = created.replace(microsecond=int(match.group(2) or 0))
+            backups.append((created, int(match.group(3) or 0), os.path.join(backup_dir, filename)))
+    backups.sort(reverse=True)
+    return backups
+
+
+def apply_retention(backup_dir, policy):
+    """Elimina los respaldos que no conserva la política; devuelve las rutas eliminadas"""
+    if policy.keep_last is None:
+        return []
+    backups = list_backups(backup_dir)
+
+    keep = {path for _, _, path in backups[:policy.keep_last]}
+    days = set()
+    weeks = set()
+    for created, _, path in backups:
+        day = created.date()
+        if len(days) < policy.keep_daily and day not in days:
+            days.add(day)
+            keep.add(path)
+        week = created.isocalendar()[:2]
+        if len(weeks) < policy.keep_weekly and week not in weeks:
+            weeks.add(week)
+            keep.add(path)
+
+    removed = []
+    for _, _, path in backups:
+        if path not in keep:
+            os.remove(path)
+            removed.append(path)
+    if removed:
+        logging.info(f"Retención de respaldos: {len(removed)} eliminados, {len(keep)} conservados")
+    return removed
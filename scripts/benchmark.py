@@ -0,0 +1,343 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import platform
+from datetime import datetime
+from contextlib import contextmanager
+
+# Los scripts configuran logging hacia logs/ al importarse
+os.makedirs('logs', exist_ok=True)
+
+import openpyxl
+import pandas as pd
+import pdfplumber
+from extract import SearsExtractor
+from pdf_backends import BACKENDS
+from merge_data import SearsMerger
+from merge_csv_data import SearsCsvMerger
+from metrics import peak_rss_mb
+from synthetic import (LINES_PER_PAGE, generar_concentrado, generar_csv, generar_estado_cuenta,
+                       generar_pedidos)
+from xlsx_engine import ENGINES
+
+# Escalas de la suite: PDFs, páginas por PDF, filas del CSV y filas del concentrado
+ESCALAS = {
+    'chica': {'pdfs': 2, 'paginas': 5, 'filas_csv': 2000, 'filas_concentrado': 10000},
+    'mediana': {'pdfs': 10, 'paginas': 20, 'filas_csv': 20000, 'filas_concentrado': 50000},
+    'grande': {'pdfs': 20, 'paginas': 50, 'filas_csv': 100000, 'filas_concentrado': 200000},
+}
+# Etapas medidas por escala, en el orden en que se ejecutan
+ETAPAS = ('extraccion', 'merge_pdf', 'merge_csv')
+
+
+def contar_paginas(pdf_paths):
+    """Cuenta las páginas totales de una lista de PDFs."""
+    total = 0
+    for pdf_path in pdf_paths:
+        with pdfplumber.open(pdf_path) as pdf:
+            total += len(pdf.pages)
+    return total
+
+
+def benchmark_extraccion(pdf_paths, repeticiones=1, rondas=3, workers=1, backend='pdfplumber'):
+    """
+    Ejecuta SearsExtractor sobre los PDFs y devuelve (páginas, segundos, filas).
+    Se toma la mejor de varias rondas para reducir el ruido de la máquina.
+    """
+    paginas = contar_paginas(pdf_paths) * repeticiones
+    mejor = None
+    for _ in range(rondas):
+        extractor = SearsExtractor(workers=workers, use_manifest=False, use_store=False, backend=backend)
+        inicio = time.perf_counter()
+        for pdf_path, document in extractor.extract_documents(pdf_paths * repeticiones):
+            if document is not None:
+                extractor.add_document_rows(pdf_path, *document)
+        segundos = time.perf_counter() - inicio
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return paginas, mejor, len(extractor.processed_data)
+
+
+def comparar_backends(pdf_paths, rondas=3):
+    """
+    Extrae los PDFs con cada backend, verifica que las filas sean idénticas a las de pdfplumber
+    y devuelve [(backend, páginas/s, diferencias)], donde diferencias son los PDFs que no coinciden.
+    """
+    referencia = {}
+    resultados = []
+    for backend in BACKENDS:
+        extractor = SearsExtractor(use_manifest=False, use_store=False, backend=backend)
+        documentos = {pdf_path: extractor.extract_document(pdf_path) for pdf_path in pdf_paths}
+        if backend == 'pdfplumber':
+            referencia = documentos
+        diferencias = [pdf_path for pdf_path in pdf_paths if documentos[pdf_path] != referencia[pdf_path]]
+        paginas, segundos, _ = benchmark_extraccion(pdf_paths, 1, rondas, 1, backend)
+        resultados.append((backend, paginas / segundos, diferencias))
+    return resultados
+
+
+def benchmark_csv(filas, filas_concentrado=None, semilla=0, engine='openpyxl'):
+    """
+    Genera un concentrado y un CSV sintéticos y mide SearsCsvMerger.merge_csv_data con el motor
+    de Excel indicado.
+    Devuelve (segundos, filas del CSV).
+    """
+    filas_concentrado = filas_concentrado or filas
+    pedidos = generar_pedidos(max(filas, filas_concentrado), semilla)
+    workdir = tempfile.mkdtemp(prefix='sears_bench_')
+    try:
+        merger = SearsCsvMerger(engine=engine, use_index=False)
+        merger.concentrado_file = os.path.join(workdir, 'Concentrado Sears.xlsx')
+        merger.backup_dir = os.path.join(workdir, 'backups')
+        merger.report_file = os.path.join(workdir, 'reporte_merge_csv.xlsx')
+        csv_file = os.path.join(workdir, 'Reporte - Pedidos-bench.csv')
+        generar_concentrado(merger.concentrado_file, pedidos[:filas_concentrado])
+        generar_csv(csv_file, pedidos[:filas], semilla)
+
+        inicio = time.perf_counter()
+        merger.merge_csv_data(csv_file)
+        return time.perf_counter() - inicio, filas
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+@contextmanager
+def en_directorio(path):
+    """Ejecuta el bloque con path como directorio de trabajo (los scripts usan rutas relativas)"""
+    anterior = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(anterior)
+
+
+def preparar_escala(workdir, escala, semilla=0):
+    """
+    Genera en workdir las carpetas del proceso con datos sintéticos: estados de cuenta en
+    PDFSEARS, un reporte en CSVreporte y el concentrado (más una copia base para restaurarlo
+    antes de cada medición). Los PDFs y el CSV usan pedidos que existen en el concentrado.
+    """
+    for carpeta in ('PDFSEARS', 'CSVreporte', 'RESULTADOFINAL', 'EXCELPDFSEARS'):
+        os.makedirs(os.path.join(workdir, carpeta), exist_ok=True)
+    lineas_por_pdf = escala['paginas'] * LINES_PER_PAGE
+    filas_concentrado = max(escala['filas_concentrado'], escala['pdfs'] * lineas_por_pdf, escala['filas_csv'])
+    pedidos = generar_pedidos(filas_concentrado, semilla)
+
+    for i in range(escala['pdfs']):
+        cheque = 90000 + i
+        generar_estado_cuenta(os.path.join(workdir, 'PDFSEARS', f'Pago-{cheque}.pdf'),
+                              pedidos[i * lineas_por_pdf:(i + 1) * lineas_por_pdf], cheque, semilla=semilla + i)
+    # El CSV toma los pedidos del final del concentrado: una parte coincide con los de los PDFs
+    generar_csv(os.path.join(workdir, 'CSVreporte', 'Reporte - Pedidos-bench.csv'),
+                pedidos[-escala['filas_csv']:], semilla)
+    generar_concentrado(os.path.join(workdir, 'concentrado_base.xlsx'), pedidos)
+
+
+def _restaurar_concentrado(workdir):
+    shutil.copyfile(os.path.join(workdir, 'concentrado_base.xlsx'),
+                    os.path.join(workdir, 'RESULTADOFINAL', 'Concentrado Sears.xlsx'))
+
+
+def medir_escala(workdir, rondas=3, workers=1, backend='pdfplumber', engine='openpyxl'):
+    """
+    Mide SearsExtractor (extracción completa al almacén), SearsMerger.merge_data y
+    SearsCsvMerger.merge_csv_batch sobre una escala ya preparada. Cada ronda parte del mismo
+    estado (almacén vacío y concentrado base); se reporta la mejor ronda de cada etapa.
+    """
+    resultados = {}
+    with en_directorio(workdir):
+        for _ in range(rondas):
+            shutil.rmtree('EXCELPDFSEARS')
+            os.makedirs('EXCELPDFSEARS')
+            _restaurar_concentrado(workdir)
+
+            extractor = SearsExtractor(workers=workers, backend=backend)
+            inicio = time.perf_counter()
+            extractor.process_all_pdfs()
+            extractor.save_to_store()
+            segundos = time.perf_counter() - inicio
+            extractor.store.close()
+            extractor.manifest.close()
+            paginas = extractor.metrics.counters.get('paginas', 0)
+            _mejor(resultados, 'extraccion', segundos, paginas=paginas,
+                   filas=extractor.metrics.counters.get('filas_extraidas', 0),
+                   paginas_por_segundo=round(paginas / segundos, 1))
+
+            merger = SearsMerger(engine=engine)
+            inicio = time.perf_counter()
+            merger.merge_data()
+            _mejor(resultados, 'merge_pdf', time.perf_counter() - inicio, filas=len(extractor.processed_data))
+
+            _restaurar_concentrado(workdir)
+            csv_merger = SearsCsvMerger(engine=engine)
+            csv_files = csv_merger.list_csvs()
+            inicio = time.perf_counter()
+            csv_merger.merge_csv_batch(csv_files)
+            segundos = time.perf_counter() - inicio
+            filas = sum(len(pd.read_csv(csv_file, usecols=['Pedido'])) for csv_file in csv_files)
+            _mejor(resultados, 'merge_csv', segundos, filas=filas, filas_por_segundo=round(filas / segundos))
+    return resultados
+
+
+def _mejor(resultados, etapa, segundos, **datos):
+    """Conserva la medición más rápida de cada etapa"""
+    if etapa not in resultados or segundos < resultados[etapa]['segundos']:
+        resultados[etapa] = {'segundos': round(segundos, 4), **datos}
+
+
+def benchmark_suite(escalas, rondas=3, workers=1, backend='pdfplumber', engine='openpyxl', semilla=0):
+    """
+    Ejecuta la suite sobre las escalas indicadas (ver ESCALAS) con datos sintéticos generados
+    en un directorio temporal. Devuelve el resultado serializable a JSON, con las versiones usadas.
+    """
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'pandas': pd.__version__,
+            'openpyxl': openpyxl.__version__,
+            'pdfplumber': pdfplumber.__version__,
+        },
+        'parametros': {'rondas': rondas, 'workers': workers, 'backend': backend,
+                       'motor_excel': engine, 'semilla': semilla},
+        'escalas': {},
+    }
+    for nombre in escalas:
+        workdir = tempfile.mkdtemp(prefix=f'sears_suite_{nombre}_')
+        try:
+            preparar_escala(workdir, ESCALAS[nombre], semilla)
+            resultado['escalas'][nombre] = {
+                'parametros': ESCALAS[nombre],
+                'etapas': medir_escala(workdir, rondas, workers, backend, engine),
+            }
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    # Máximo del proceso completo (ru_maxrss no se reinicia entre escalas)
+    resultado['memoria_max_mb'] = peak_rss_mb()
+    return resultado
+
+
+def comparar_resultados(actual, referencia, tolerancia=0.2):
+    """
+    Compara los segundos de cada escala y etapa contra una ejecución de referencia.
+    Devuelve [(escala, etapa, segundos de referencia, segundos actuales, cociente, es_regresión)];
+    es regresión si tarda más de (1 + tolerancia) veces la referencia.
+    """
+    comparacion = []
+    for escala, datos in actual['escalas'].items():
+        base = referencia.get('escalas', {}).get(escala)
+        if base is None or base.get('parametros') != datos['parametros']:
+            continue
+        for etapa in ETAPAS:
+            if etapa not in datos['etapas'] or etapa not in base['etapas']:
+                continue
+            antes = base['etapas'][etapa]['segundos']
+            despues = datos['etapas'][etapa]['segundos']
+            cociente = despues / antes if antes else float('inf')
+            comparacion.append((escala, etapa, antes, despues, cociente, cociente > 1 + tolerancia))
+    return comparacion
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks del proceso Sears')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    extraccion = subparsers.add_parser('extraccion', help='Páginas por segundo de la extracción de PDFs')
+    extraccion.add_argument('pdfs', nargs='*', help='PDFs a procesar (por defecto los de PDFSEARS)')
+    extraccion.add_argument('-n', '--repeticiones', type=int, default=20,
+                            help='Veces que se procesa cada PDF')
+    extraccion.add_argument('-r', '--rondas', type=int, default=3,
+                            help='Rondas a medir (se reporta la mejor)')
+    extraccion.add_argument('-w', '--workers', type=int, default=1,
+                            help='Procesos para la extracción (0 = todos los núcleos)')
+    extraccion.add_argument('-b', '--backend', choices=sorted(BACKENDS), default='pdfplumber',
+                            help='Lector de PDFs')
+
+    backends = subparsers.add_parser('backends', help='Compara velocidad y salida de los lectores de PDF')
+    backends.add_argument('pdfs', nargs='*', help='PDFs a procesar (por defecto los de PDFSEARS)')
+    backends.add_argument('-r', '--rondas', type=int, default=3,
+                          help='Rondas a medir (se reporta la mejor)')
+
+    csv = subparsers.add_parser('csv', help='Merge de un CSV sintético contra un concentrado sintético')
+    csv.add_argument('-f', '--filas', type=int, default=100000, help='Filas del CSV')
+    csv.add_argument('--filas-concentrado', type=int, help='Filas del concentrado (por defecto igual al CSV)')
+    csv.add_argument('-m', '--motor-excel', choices=ENGINES, default='openpyxl',
+                     help='Motor de actualización del concentrado')
+
+    suite = subparsers.add_parser('suite', help='Extracción y merges sobre PDFs, CSV y concentrado sintéticos')
+    suite.add_argument('-e', '--escalas', nargs='+', choices=list(ESCALAS), default=['chica', 'mediana'],
+                       help='Escalas a medir')
+    suite.add_argument('-r', '--rondas', type=int, default=3,
+                       help='Rondas a medir (se reporta la mejor de cada etapa)')
+    suite.add_argument('-w', '--workers', type=int, default=1,
+                       help='Procesos para la extracción (0 = todos los núcleos)')
+    suite.add_argument('-b', '--backend', choices=sorted(BACKENDS), default='pdfplumber',
+                       help='Lector de PDFs')
+    suite.add_argument('-m', '--motor-excel', choices=ENGINES, default='openpyxl',
+                       help='Motor de actualización del concentrado')
+    suite.add_argument('-o', '--salida',
+                       help='Archivo JSON de resultados (por defecto logs/benchmarks/suite_<fecha>.json)')
+    suite.add_argument('-c', '--comparar',
+                       help='JSON de una ejecución anterior; termina con error si alguna etapa es más lenta')
+    suite.add_argument('-t', '--tolerancia', type=float, default=0.2,
+                       help='Margen de tiempo aceptado al comparar (0.2 = 20%% más lento)')
+    args = parser.parse_args(argv)
+
+    # Silenciar el log por página/fila para no medir la escritura del log
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.benchmark in ('extraccion', 'backends'):
+        pdf_paths = args.pdfs or [
+            os.path.join('PDFSEARS', f) for f in sorted(os.listdir('PDFSEARS')) if f.endswith('.pdf')
+        ]
+
+    if args.benchmark == 'extraccion':
+        paginas, segundos, filas = benchmark_extraccion(pdf_paths, args.repeticiones, args.rondas,
+                                                        args.workers, args.backend)
+        print(f"Páginas: {paginas} | Filas: {filas} | Tiempo: {segundos:.2f} s | "
+              f"{paginas / segundos:.1f} páginas/s")
+    elif args.benchmark == 'backends':
+        resultados = comparar_backends(pdf_paths, args.rondas)
+        for backend, paginas_por_segundo, diferencias in resultados:
+            estado = 'idéntico' if not diferencias else f"DIFERENTE en {', '.join(diferencias)}"
+            print(f"{backend}: {paginas_por_segundo:.1f} páginas/s | {estado}")
+        if any(diferencias for _, _, diferencias in resultados):
+            return 1
+    elif args.benchmark == 'csv':
+        segundos, filas = benchmark_csv(args.filas, args.filas_concentrado, engine=args.motor_excel)
+        print(f"Filas CSV: {filas} | Tiempo: {segundos:.2f} s | {filas / segundos:.0f} filas/s")
+    elif args.benchmark == 'suite':
+        resultado = benchmark_suite(args.escalas, args.rondas, args.workers, args.backend, args.motor_excel)
+        salida = args.salida or os.path.join(
+            'logs', 'benchmarks', f"suite_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        os.makedirs(os.path.dirname(salida) or '.', exist_ok=True)
+        with open(salida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+        for escala, datos in resultado['escalas'].items():
+            for etapa, medicion in datos['etapas'].items():
+                detalle = ' | '.join(f"{clave}: {valor}" for clave, valor in medicion.items() if clave != 'segundos')
+                print(f"{escala} {etapa}: {medicion['segundos']:.2f} s | {detalle}")
+        print(f"Resultados guardados en: {salida}")
+
+        if args.comparar:
+            with open(args.comparar, encoding='utf-8') as f:
+                referencia = json.load(f)
+            if referencia.get('parametros') != resultado['parametros']:
+                print(f"Aviso: la referencia usó otros parámetros: {referencia.get('parametros')}")
+            comparacion = comparar_resultados(resultado, referencia, args.tolerancia)
+            for escala, etapa, antes, despues, cociente, regresion in comparacion:
+                estado = 'REGRESIÓN' if regresion else 'ok'
+                print(f"{escala} {etapa}: {antes:.2f} s -> {despues:.2f} s ({cociente:.2f}x) {estado}")
+            if any(regresion for *_, regresion in comparacion):
+                return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
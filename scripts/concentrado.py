@@ -0,0 +1,83 @@
+import logging
+from xlsx_engine import open_sheet
+
+# Columna del concentrado con el número de orden de Sears
+ORDER_COLUMN = 'ORDEN SEARS '
+
+# Qué hacer cuando un pedido aparece en varias filas del concentrado:
+#   'first'     -> se actualiza solo la primera fila (comportamiento histórico)
+#   'all'       -> se actualizan todas las filas del pedido
+#   'conflict'  -> no se actualiza ninguna y el pedido se reporta como conflicto
+DUPLICATE_POLICIES = ('first', 'all', 'conflict')
+
+
+def build_order_index(orders, first_row=2):
+    """
+    Construye en una sola pasada el índice {pedido: [filas de Excel]} a partir de los
+    valores de la columna 'ORDEN SEARS ' (la primera fila de datos es la 2, tras el encabezado).
+    Devuelve (índice, duplicados) donde duplicados solo contiene los pedidos con más de una fila.
+    """
+    index = {}
+    for offset, order in enumerate(orders):
+        index.setdefault(order, []).append(first_row + offset)
+    return index, find_duplicates(index)
+
+
+def find_duplicates(index):
+    """Pedidos del índice con más de una fila; se registran como advertencia"""
+    duplicates = {order: rows for order, rows in index.items() if len(rows) > 1}
+    if duplicates:
+        logging.warning(f"El concentrado tiene {len(duplicates)} pedidos repetidos en varias filas")
+        for order, rows in duplicates.items():
+            logging.debug(f"Pedido {order} repetido en las filas {rows}")
+    return duplicates
+
+
+def resolve_rows(index, order, policy='first'):
+    """
+    Devuelve las filas del concentrado a actualizar para un pedido según la política de duplicados.
+    Lista vacía si no hay coincidencia; None si el pedido está en conflicto.
+    """
+    rows = index.get(order)
+    if not rows:
+        return []
+    if len(rows) == 1 or policy == 'first':
+        return rows[:1]
+    if policy == 'all':
+        return rows
+    return None
+
+
+def order_key(value):
+    """Clave de pedido como texto: los números enteros (aunque Excel los guarde como float) sin decimales"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def load_concentrado(concentrado_file, engine='openpyxl', index_cache=None):
+    """
+    Carga la hoja activa del concentrado para edición con el motor indicado (ver
+    xlsx_engine.ENGINES) y construye el índice de pedidos; devuelve (hoja, índice).
+    Con index_cache (ver order_cache.OrderIndexCache) el índice se toma del disco si el libro
+    no cambió, sin leer la columna de pedidos, y se mantiene al día en cada guardado.
+    """
+    logging.info("Leyendo archivo concentrado...")
+    order_index = index_cache.load(concentrado_file) if index_cache is not None else None
+    sheet = open_sheet(concentrado_file, engine)
+    order_col = sheet.header_map()[ORDER_COLUMN]
+    if order_index is None:
+        # La columna de pedidos se toma de la hoja ya cargada: el archivo se lee una sola vez
+        orders = [order_key(value) for value in sheet.column_values(order_col)]
+        
+        # Índice pedido -> filas de Excel, construido una sola vez
+        order_index, _ = build_order_index(orders)
+        if index_cache is not None:
+            index_cache.save(concentrado_file, order_index)
+    else:
+        find_duplicates(order_index)
+    if index_cache is not None:
+        sheet.save_hooks.append(lambda path: index_cache.after_save(path, sheet, order_col))
+    return sheet, order_index
@@ -0,0 +1,258 @@
+import os
+import time
+import shutil
+import sqlite3
+import logging
+import numbers as pynumbers
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils.exceptions import IllegalCharacterError
+import numpy as np
+from xlsx_engine import OpenpyxlSheet, XmlSheet
+from order_cache import file_fingerprint
+
+# Base SQLite del concentrado (motor 'sqlite'), junto a los demás archivos intermedios
+CONCENTRADO_DB = os.path.join('EXCELPDFSEARS', 'concentrado.db')
+
+# Tipos de celda que SQLite no distingue por sí mismo; números y textos se guardan tal cual
+_DECODERS = {
+    'bool': bool,
+    'fecha': datetime.fromisoformat,
+    'dia': date.fromisoformat,
+    'hora': dtime.fromisoformat,
+    'duracion': lambda seconds: timedelta(seconds=seconds),
+}
+
+
+def _encode(value):
+    """(valor, tipo) de una celda para guardarla en SQLite; los NaN/NaT se guardan vacíos"""
+    if value is None or value != value:
+        return None, None
+    if isinstance(value, (bool, np.bool_)):
+        return int(value), 'bool'
+    if isinstance(value, datetime):
+        return value.isoformat(), 'fecha'
+    if isinstance(value, date):
+        return value.isoformat(), 'dia'
+    if isinstance(value, dtime):
+        return value.isoformat(), 'hora'
+    if isinstance(value, timedelta):
+        return value.total_seconds(), 'duracion'
+    if isinstance(value, pynumbers.Integral):
+        return int(value), None
+    if isinstance(value, pynumbers.Real):
+        return float(value), None
+    return str(value), None
+
+
+def _decode(valor, tipo):
+    return valor if tipo is None or valor is None else _DECODERS[tipo](valor)
+
+
+def _open_workbook(path):
+    """Hoja del libro con el motor xml; con el de openpyxl si el XML no tiene la forma esperada"""
+    try:
+        return XmlSheet(path)
+    except ValueError as e:
+        logging.warning(f"{e}; se usa openpyxl para leer y exportar el concentrado")
+        return OpenpyxlSheet(path)
+
+
+class SqliteSheet:
+    """
+    Hoja activa del concentrado guardada en SQLite: una fila por celda con valor, indexada por
+    (fila, columna) y por (columna, valor) para leer columnas completas. La base se importa del
+    .xlsx la primera vez y cada vez que el libro cambia fuera del proceso (se compara su huella).
+    Las escrituras son UPSERT dentro de una transacción abierta: si el proceso falla antes de
+    guardar, la base queda como estaba. Al guardar se exportan al .xlsx solo las celdas
+    modificadas (sobre el libro existente, con sus estilos) y después se confirma la transacción.
+    La base usa WAL: otros procesos pueden consultarla mientras se actualiza.
+    """
+
+    engine = 'sqlite'
+
+    def __init__(self, path, db_path=CONCENTRADO_DB):
+        self.path = path
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS libro (
+                ruta TEXT NOT NULL,
+                tamano INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                max_fila INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS filas (
+                fila INTEGER PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS celdas (
+                fila INTEGER NOT NULL,
+                col INTEGER NOT NULL,
+                valor,
+                tipo TEXT,
+                PRIMARY KEY (fila, col)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS ix_celdas_col_valor ON celdas (col, valor);
+        """)
+        # Celdas escritas desde el último guardado, para exportarlas: {(fila, columna): (valor, formato)}
+        self.pending = {}
+        # Celdas escritas desde la carga (métricas de la ejecución) y columnas modificadas
+        self.cells_written = 0
+        self.written_columns = set()
+        # Funciones hook(path) que se llaman después de cada guardado (ver order_cache)
+        self.save_hooks = []
+        self._sync()
+
+    # --- Importación -----------------------------------------------------------------------
+
+    def _sync(self):
+        """Usa la base si corresponde al libro actual; si no, la vuelve a importar del .xlsx"""
+        registro = self.conn.execute(
+            "SELECT ruta, tamano, mtime_ns, sha256, max_fila FROM libro"
+        ).fetchone()
+        if registro is not None and registro[0] == self.path:
+            huella = file_fingerprint(self.path, registro[1:4])
+            if huella[2] == registro[3]:
+                if huella != tuple(registro[1:4]):
+                    # Mismo contenido con otra fecha (p. ej. copiado de nuevo): solo actualizar la huella
+                    with self.conn:
+                        self._save_fingerprint(self.path, huella)
+                self.max_row = registro[4]
+                self.rows = {fila for (fila,) in self.conn.execute("SELECT fila FROM filas")}
+                logging.info(f"Concentrado leído de {self.db_path} ({self.max_row} filas)")
+                return
+            logging.info("El concentrado cambió fuera de la base; se vuelve a importar")
+        self.import_workbook()
+
+    def import_workbook(self):
+        """Reemplaza el contenido de la base por el de la hoja activa del .xlsx"""
+        inicio = time.perf_counter()
+        source = _open_workbook(self.path)
+        rows = source.row_numbers()
+        with self.conn:
+            self.conn.execute("DELETE FROM libro")
+            self.conn.execute("DELETE FROM filas")
+            self.conn.execute("DELETE FROM celdas")
+            self.conn.executemany("INSERT INTO filas (fila) VALUES (?)", ((row,) for row in rows))
+            self.conn.executemany(
+                "INSERT INTO celdas (fila, col, valor, tipo) VALUES (?, ?, ?, ?)",
+                ((row, col, *_encode(value)) for row, col, value in source.iter_cells())
+            )
+            self.max_row = max(rows, default=0)
+            self.conn.execute(
+                "INSERT INTO libro (ruta, tamano, mtime_ns, sha256, max_fila) VALUES (?, ?, ?, ?, ?)",
+                (self.path, *file_fingerprint(self.path), self.max_row)
+            )
+        source.close()
+        self.rows = set(rows)
+        logging.info(f"Concentrado importado a {self.db_path} ({self.max_row} filas) "
+                     f"en {time.perf_counter() - inicio:.2f} s")
+
+    def _save_fingerprint(self, path, huella):
+        self.conn.execute("UPDATE libro SET ruta = ?, tamano = ?, mtime_ns = ?, sha256 = ?", (path, *huella))
+
+    # --- Lectura de celdas -----------------------------------------------------------------
+
+    def header_map(self):
+        """{nombre de encabezado: índice de columna} a partir de la fila 1"""
+        header = {col: _decode(valor, tipo) for col, valor, tipo in self.conn.execute(
+            "SELECT col, valor, tipo FROM celdas WHERE fila = 1")}
+        if not header:
+            return {}
+        return {header.get(col): col for col in range(1, max(header) + 1)}
+
+    def column_values(self, col, first_row=2):
+        """Valores de una columna desde first_row hasta la última fila de la hoja"""
+        values = [None] * max(self.max_row - first_row + 1, 0)
+        for fila, valor, tipo in self.conn.execute(
+                "SELECT fila, valor, tipo FROM celdas WHERE col = ? AND fila >= ?", (col, first_row)):
+            values[fila - first_row] = _decode(valor, tipo)
+        return values
+
+    def get(self, row, col):
+        registro = self.conn.execute(
+            "SELECT valor, tipo FROM celdas WHERE fila = ? AND col = ?", (row, col)
+        ).fetchone()
+        return _decode(*registro) if registro else None
+
+    def read_block(self, rows, cols, batch_size=500):
+        """
+        Arreglo (filas x columnas) con los valores de las celdas indicadas. Las consultas se
+        hacen por lotes de batch_size filas.
+        """
+        block = np.full((len(rows), len(cols)), None, dtype=object)
+        positions = {}
+        for i, row in enumerate(rows):
+            positions.setdefault(int(row), []).append(i)
+        col_positions = {col: j for j, col in enumerate(cols)}
+        if not positions or not col_positions:
+            return block
+        distinct = sorted(positions)
+        col_params = ', '.join('?' * len(col_positions))
+        for start in range(0, len(distinct), batch_size):
+            batch = distinct[start:start + batch_size]
+            for fila, col, valor, tipo in self.conn.execute(
+                    f"SELECT fila, col, valor, tipo FROM celdas WHERE fila IN ({', '.join('?' * len(batch))}) "
+                    f"AND col IN ({col_params})", (*batch, *col_positions)):
+                value = _decode(valor, tipo)
+                for i in positions[fila]:
+                    block[i, col_positions[col]] = value
+        return block
+
+    # --- Escritura -------------------------------------------------------------------------
+
+    def set(self, row, col, value, number_format=None):
+        """
+        Escribe el valor en la transacción abierta; number_format se aplica al exportar (el
+        resto del estilo de la celda se conserva, como en los otros motores)
+        """
+        if isinstance(value, str) and ILLEGAL_CHARACTERS_RE.search(value):
+            raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+        if row not in self.rows:
+            raise KeyError(f"La fila {row} no existe en la hoja")
+        self.conn.execute(
+            "INSERT INTO celdas (fila, col, valor, tipo) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (fila, col) DO UPDATE SET valor = excluded.valor, tipo = excluded.tipo",
+            (row, col, *_encode(value))
+        )
+        previous = self.pending.get((row, col))
+        if number_format is None and previous is not None:
+            number_format = previous[1]
+        self.pending[(row, col)] = (value, number_format)
+        self.cells_written += 1
+        self.written_columns.add(col)
+
+    def save(self, path=None):
+        """
+        Exporta las celdas modificadas al .xlsx y confirma la transacción. Si la exportación
+        falla no se confirma nada; si el proceso se interrumpe entre el .xlsx y la confirmación,
+        la huella ya no coincide y la base se vuelve a importar al abrirla.
+        """
+        path = path or self.path
+        if self.pending:
+            workbook = _open_workbook(self.path)
+            for (row, col), (value, number_format) in self.pending.items():
+                workbook.set(row, col, value, number_format)
+            workbook.save(path)
+            workbook.close()
+        elif path != self.path:
+            shutil.copy2(self.path, path)
+        self._save_fingerprint(path, file_fingerprint(path))
+        self.conn.commit()
+        logging.info(f"Base del concentrado actualizada: {len(self.pending)} celdas en {self.db_path}")
+        self.path = path
+        self.pending = {}
+        for hook in self.save_hooks:
+            hook(path)
+
+    def close(self):
+        """Descarta los cambios no guardados y cierra la base"""
+        self.conn.rollback()
+        self.conn.close()
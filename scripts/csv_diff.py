@@ -0,0 +1,125 @@
+import logging
+import operator
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+# Tipo con el que se comparan las columnas del reporte CSV; las demás se comparan como números
+# si pandas las leyó numéricas y como texto en otro caso
+COLUMN_TYPES = {
+    'Pedido': 'int',
+    'Monto': 'float',
+    'Precio': 'float',
+    'Fecha_Pedido': 'datetime',
+}
+
+# Columnas del registro de cambios
+CHANGE_COLUMNS = ['Fila_CSV', 'Pedido', 'Fila', 'Columna', 'Campo', 'Valor_Anterior', 'Valor_Nuevo']
+
+_equal = np.frompyfunc(operator.eq, 2, 1)
+
+
+def column_type(csv_df, csv_col):
+    """Tipo de comparación de una columna del CSV ('int', 'float', 'datetime' o 'text')"""
+    if csv_col in COLUMN_TYPES:
+        return COLUMN_TYPES[csv_col]
+    dtype = csv_df[csv_col].dtype
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        return 'float'
+    return 'text'
+
+
+def parse_dates(values):
+    """
+    Convierte las fechas del CSV a Timestamp; cada valor distinto se convierte una sola vez
+    (las fechas se repiten mucho). Los valores que no se pueden convertir quedan como estaban.
+    """
+    parsed = {}
+    for value in pd.unique(values):
+        if pd.isna(value):
+            continue
+        try:
+            parsed[value] = pd.to_datetime(value)
+        except Exception as e:
+            logging.warning(f"No se pudo formatear la fecha '{value}': {str(e)}")
+            parsed[value] = value
+    return np.array([parsed.get(value, value) for value in values], dtype=object)
+
+
+def _as_int(value):
+    """El pedido se escribe como número entero si el texto lo permite"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _typed(values, kind):
+    """Valores normalizados para comparar: float64 para números y datetime64 para fechas"""
+    if kind in ('int', 'float'):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+    dates = [value if isinstance(value, (datetime, date)) else None for value in values]
+    return pd.to_datetime(pd.Series(dates, dtype=object), errors='coerce').to_numpy(dtype='datetime64[us]')
+
+
+def diff_csv(csv_df, sheet, targets, columns):
+    """
+    Compara en bloque las columnas mapeadas del CSV contra las celdas del concentrado.
+    targets es la lista (posición en el CSV, fila de Excel) de los pedidos encontrados, en el
+    orden del CSV; columns es la lista (columna del CSV, índice de columna en Excel).
+    Devuelve un DataFrame con CHANGE_COLUMNS y solo las celdas que cambian (los valores nulos
+    del CSV no se escriben), en el orden en que se aplican: fila del CSV, fila de Excel, columna.
+    Si un pedido se repite en el CSV, cada aparición se compara con el valor que dejó la anterior.
+    """
+    if not targets or not columns:
+        return pd.DataFrame(columns=CHANGE_COLUMNS)
+    positions = np.fromiter((pos for pos, _ in targets), dtype=np.int64, count=len(targets))
+    rows = np.fromiter((row for _, row in targets), dtype=np.int64, count=len(targets))
+    current = sheet.read_block(rows, [col for _, col in columns])
+    repeated = len(np.unique(rows)) < len(rows)
+    entries = np.arange(len(targets))
+    pedidos = csv_df['Pedido'].to_numpy(dtype=object)[positions]
+
+    changes = []
+    for j, (csv_col, col) in enumerate(columns):
+        kind = column_type(csv_df, csv_col)
+        new = csv_df[csv_col].to_numpy(dtype=object)[positions]
+        present = pd.notna(new)
+        if kind == 'int':
+            written = np.array([_as_int(value) for value in new], dtype=object)
+        elif kind == 'datetime' and not pd.api.types.is_datetime64_any_dtype(csv_df[csv_col]):
+            written = parse_dates(new)
+        else:
+            written = new
+        old = current[:, j]
+        if repeated:
+            # Valor escrito por la aparición anterior del mismo pedido (fila de Excel) en el CSV
+            previous = pd.Series(np.where(present, written, None), dtype=object)
+            previous = previous.groupby(rows).ffill().groupby(rows).shift(1).to_numpy(dtype=object)
+            old = np.where(pd.notna(previous), previous, old)
+
+        equal = _equal(old, written).astype(bool)
+        if kind != 'text':
+            typed_old, typed_new = _typed(old, kind), _typed(written, kind)
+            equal |= typed_old == typed_new
+        changed = np.flatnonzero(present & ~equal)
+        if not len(changed):
+            continue
+        changes.append(pd.DataFrame({
+            'Fila_CSV': positions[changed],
+            'Pedido': pedidos[changed],
+            'Fila': rows[changed],
+            'Columna': get_column_letter(col),
+            'Campo': csv_col,
+            'Valor_Anterior': old[changed],
+            'Valor_Nuevo': written[changed],
+            '_entrada': entries[changed],
+            '_columna': j,
+        }))
+
+    if not changes:
+        return pd.DataFrame(columns=CHANGE_COLUMNS)
+    diff = pd.concat(changes, ignore_index=True)
+    diff = diff.sort_values(['_entrada', '_columna'], kind='stable', ignore_index=True)
+    return diff[CHANGE_COLUMNS]
@@ -0,0 +1,156 @@
+import logging
+import importlib.util
+import numpy as np
+import pandas as pd
+from concentrado import order_key
+
+# Lectores de CSV: 'pandas' (motor C de pandas) o 'pyarrow' (pyarrow.csv.open_csv, opcional)
+CSV_ENGINES = ('pandas', 'pyarrow')
+
+# Esquema declarado de las columnas del reporte CSV; cada bloque se convierte según el tipo:
+#   'key'   -> número de pedido como texto, normalizado igual que el índice del concentrado
+#   'text'  -> texto tal cual (se lee como texto, sin inferir el tipo)
+#   'float' -> número con decimales; los valores que no son números quedan como texto
+#   'id'    -> identificador (se lee como texto): entero si el valor lo es, número o texto si no
+#   'date'  -> fecha (se lee como texto); cada valor distinto se convierte una sola vez por archivo
+# Los valores se convierten uno por uno, así el tipo de una celda no depende del resto del bloque
+# ni de --filas-por-bloque
+CSV_SCHEMA = {
+    'Pedido': 'key',
+    'Marketplace': 'text',
+    'Seller': 'id',
+    'Monto': 'float',
+    'Nombre_producto': 'text',
+    'Precio': 'float',
+    'sku': 'text',
+    'Estatus_pedido': 'text',
+    'Estatus_partida': 'text',
+    'Fecha_Pedido': 'date',
+    'IdFulfillment': 'id',
+    'NoGuia': 'text',
+    'Tipo_envio': 'text',
+}
+
+# Tipos que se leen como texto; los decimales se dejan al analizador de pandas, que es más rápido
+# que convertir después (si el bloque tiene texto lo deja como texto y se convierte valor por valor)
+TEXT_KINDS = ('text', 'id', 'date')
+
+
+def check_engine(engine):
+    """Valida el lector de CSV antes de empezar (pyarrow es opcional)"""
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Lector de CSV no válido: {engine}")
+    if engine == 'pyarrow' and importlib.util.find_spec('pyarrow') is None:
+        raise ImportError("El lector de CSV 'pyarrow' requiere instalar pyarrow")
+
+
+def csv_columns(csv_file):
+    """Encabezados del CSV, sin leer los datos"""
+    return list(pd.read_csv(csv_file, encoding='utf-8', nrows=0).columns)
+
+
+class CsvChunkReader:
+    """
+    Lee un reporte CSV por bloques de filas con solo las columnas indicadas y convierte cada
+    bloque según CSV_SCHEMA. La caché de fechas se conserva entre bloques. Con pyarrow todas las
+    columnas se leen como texto (sus tipos inferidos no pueden cambiar entre bloques).
+    """
+
+    def __init__(self, csv_file, columns, chunk_rows=50000, engine='pandas'):
+        check_engine(engine)
+        self.csv_file = csv_file
+        self.columns = list(columns)
+        self.chunk_rows = chunk_rows
+        self.engine = engine
+        self.dates = {}
+
+    def __iter__(self):
+        chunks = self._read_pyarrow() if self.engine == 'pyarrow' else self._read_pandas()
+        for chunk in chunks:
+            yield self.convert(chunk)
+
+    def _read_pandas(self):
+        with pd.read_csv(self.csv_file, encoding='utf-8', usecols=self.columns,
+                         dtype={col: str for col in self.columns if CSV_SCHEMA.get(col, 'text') in TEXT_KINDS},
+                         chunksize=self.chunk_rows) as reader:
+            yield from reader
+
+    def _read_pyarrow(self):
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=self.columns,
+            column_types={col: pa.string() for col in self.columns},
+            strings_can_be_null=True,
+        )
+        with pa_csv.open_csv(self.csv_file, convert_options=convert_options) as reader:
+            for batch in reader:
+                for start in range(0, batch.num_rows, self.chunk_rows):
+                    yield batch.slice(start, self.chunk_rows).to_pandas()
+
+    def convert(self, chunk):
+        """Aplica los tipos de CSV_SCHEMA a un bloque"""
+        for col in chunk.columns:
+            kind = CSV_SCHEMA.get(col, 'text')
+            if kind == 'key':
+                chunk[col] = order_keys(chunk[col])
+            elif kind in ('float', 'id'):
+                chunk[col] = _to_number(chunk[col], integers=kind == 'id')
+            elif kind == 'date':
+                chunk[col] = self._to_dates(chunk[col])
+        return chunk
+
+    def _to_dates(self, values):
+        """Fechas como datetime64; si alguna no se puede convertir la columna queda con los valores originales"""
+        for value in values.dropna().unique():
+            if value not in self.dates:
+                try:
+                    self.dates[value] = pd.to_datetime(value)
+                except Exception as e:
+                    logging.warning(f"No se pudo formatear la fecha '{value}': {str(e)}")
+                    self.dates[value] = value
+        converted = values.map(self.dates)
+        if all(isinstance(value, pd.Timestamp) for value in converted.dropna().unique()):
+            return pd.to_datetime(converted)
+        return converted.astype(object)
+
+
+def order_keys(values):
+    """
+    Números de pedido como texto, igual que concentrado.order_key: los valores numéricos enteros
+    ('84959412', 84959412.0) quedan sin decimales; los vacíos como 'nan'.
+    """
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype(str).astype(object)
+    if pd.api.types.is_float_dtype(values):
+        return values.map(order_key).astype(object)
+    keys = values.str.strip()
+    # Solo se convierten los que no están escritos ya como entero sin ceros a la izquierda
+    pending = keys.notna() & ~keys.str.fullmatch(r'[1-9]\d*', na=False)
+    numbers = pd.to_numeric(keys[pending], errors='coerce')
+    integral = numbers[numbers.notna() & (numbers == np.floor(numbers))]
+    keys = keys.astype(object)
+    keys[integral.index] = integral.astype('int64').astype(str)
+    return keys.fillna('nan')
+
+
+def _to_number(values, integers):
+    """
+    Convierte a número cada valor que lo sea; los demás quedan como texto. Sin integers la
+    columna queda como float64 si todos son números. Con integers los enteros escritos sin
+    decimales se convierten a int de Python (exacto aunque no quepa en int64) y la columna
+    queda siempre como object.
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype('float64')
+    text = values.str.strip()
+    numbers = pd.to_numeric(text, errors='coerce')
+    numeric = numbers.notna()
+    if not integers and numeric.sum() == values.notna().sum():
+        return numbers.astype('float64')
+    result = values.astype(object).where(values.notna(), None)
+    result[numeric] = numbers[numeric].astype(object)
+    if integers:
+        whole = text.str.fullmatch(r'[-+]?\d+', na=False)
+        result[whole] = [int(value) for value in text[whole]]
+    return result
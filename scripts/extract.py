@@ -1,9 +1,18 @@
 import os
 import pandas as pd
-import pdfplumber
 import logging
+import argparse
+import time
 import traceback
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from manifest import ExtractionManifest
+from store import ExtractionStore, DATE_COLUMNS
+from grammar import DateParser, match_order_line
+from pdf_backends import BACKENDS, open_pdf
+from rowbuffer import RowBuffer
+from metrics import RunMetrics, enable_debug_logging
+from ocr import PageOcr
+from analytics import summarize_doc_types, write_reconciliation
 
 # Configuración de logging
 logging.basicConfig(
@@ -15,10 +24,48 @@ logging.basicConfig(
     ]
 )
 
+def _parse_pdf_pages_task(pdf_path, start_page, end_page, backend='pdfplumber', ocr=False):
+    """
+    Tarea del pool de procesos: extrae un rango de páginas de un PDF (con los tiempos por página
+    y los contadores). Con ocr, las páginas sin texto no se leen en la tarea: se devuelven como
+    [(página, hash)] para que el proceso principal las envíe a su pool de OCR.
+    """
+    extractor = SearsExtractor(use_manifest=False, use_store=False, backend=backend)
+    ocr_pages = [] if ocr else None
+    return (extractor.parse_pdf_pages(pdf_path, start_page, end_page, ocr_pages), ocr_pages or [],
+            extractor.metrics.pages, extractor.metrics.counters)
+
+
 class SearsExtractor:
-    def __init__(self):
+    def __init__(self, workers=1, pages_per_task=50, use_manifest=True, use_store=True, backend='pdfplumber',
+                 metrics=None, ocr_workers=None):
+        self.input_dir = 'PDFSEARS'
+        # Tiempos por PDF y por página y contadores de la ejecución (ver metrics.RunMetrics)
+        self.metrics = metrics or RunMetrics('extraccion')
+        # Backend de lectura de PDFs (ver pdf_backends.BACKENDS)
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend de PDF no válido: {backend}")
+        self.backend = backend
+        # OCR opcional de las páginas sin texto (ver ocr.PageOcr): procesos del pool de OCR, None = desactivado
+        self.ocr = PageOcr(workers=ocr_workers) if ocr_workers is not None else None
+        # Almacén acumulado (fuente de verdad); el Excel es solo una exportación
+        self.store = ExtractionStore(
+            os.path.join('EXCELPDFSEARS', 'sears_extractions.db')
+        ) if use_store else None
+        # Manifiesto de PDFs ya extraídos para no volver a leerlos
+        self.manifest = ExtractionManifest(
+            os.path.join('EXCELPDFSEARS', 'extract_manifest.db')
+        ) if use_manifest else None
+        self.pending_fingerprints = {}
+        # Archivos modificados cuyas filas anteriores deben reemplazarse
+        self.replaced_files = set()
+        # Procesos para la extracción; 1 = secuencial
+        self.workers = workers or os.cpu_count() or 1
+        # Páginas por tarea al dividir PDFs grandes entre procesos
+        self.pages_per_task = pages_per_task
         self.output_file = os.path.join('EXCELPDFSEARS', 'sears_extractions.xlsx')
-        self.processed_data = []
+        # Filas extraídas en esta ejecución, en formato columnar
+        self.processed_data = RowBuffer()
         # Diccionario para mapear tipos de documento
         self.doc_types = {
             'NP': 'PEDIDO ENTREGADO',
@@ -28,166 +75,491 @@ class SearsExtractor:
             'DV': 'DESCUENTO SERVICIO DE REPARTO'
         }
 
+    def close(self):
+        """Cierra el pool y la caché de OCR, el almacén y el manifiesto"""
+        if self.ocr is not None:
+            self.ocr.close()
+        if self.store is not None:
+            self.store.close()
+        if self.manifest is not None:
+            self.manifest.close()
+
     def format_date(self, date_str):
         """
         Formatea correctamente una cadena de fecha para asegurar que se reconozca como fecha.
-        Maneja diferentes formatos de entrada posibles.
+        Maneja diferentes formatos de entrada posibles (ver grammar.DateParser).
         """
-        try:
-            # Si ya es un objeto datetime, devolverlo tal cual
-            if isinstance(date_str, datetime) or isinstance(date_str, pd.Timestamp):
-                return date_str
-                
-            # Limpia la cadena de fecha
-            date_str = date_str.strip()
+        return DateParser().parse(date_str)
+
+    def parse_pdf_pages(self, pdf_path, start_page=0, end_page=None, ocr_pages=None):
+        """
+        Extrae en un solo recorrido las líneas de pedidos de las páginas [start_page, end_page).
+        Devuelve (filas, cheque, proveedor, num_pages). Cada fila es una tupla compacta
+        (pedido, fecha_pedido, fecha_vencimiento, documento, tipo, total, pagina); el cheque y el
+        proveedor son los primeros encontrados en el rango y se asignan a las filas después.
+        Con ocr_pages (lista) las páginas sin texto se agregan a ella (ver iter_page_rows).
+        """
+        cheque_global = ""
+        proveedor_global = ""
+        rows = []
+        
+        with open_pdf(pdf_path, self.backend) as pdf:
+            num_pages = pdf.num_pages
+            for page_rows, cheque_global, proveedor_global in self.iter_page_rows(pdf, pdf_path, start_page, end_page,
+                                                                                  ocr_pages):
+                rows.extend(page_rows)
+        
+        return rows, cheque_global, proveedor_global, num_pages
+
+    def iter_page_rows(self, pdf, pdf_path, start_page=0, end_page=None, ocr_pages=None):
+        """
+        Recorre las páginas [start_page, end_page) de un PDF abierto y genera, página por página,
+        (filas, cheque, proveedor) con el cheque y el proveedor encontrados hasta esa página.
+        Con OCR activado, las páginas sin texto se generan al final del rango, cuando termina su OCR.
+        Con ocr_pages (lista, en las tareas del pool) no se leen: se agregan como (página, hash).
+        """
+        cheque_global = ""
+        proveedor_global = ""
+        # Formato de fecha detectado una vez por documento, con caché de valores ya convertidos
+        date_parser = DateParser()
+        
+        num_pages = pdf.num_pages
+        if end_page is None or end_page > num_pages:
+            end_page = num_pages
+        
+        # Recorrido único: cada página se extrae una sola vez y de ella se toman
+        # tanto los datos de cheque/proveedor como las líneas de pedidos
+        archivo = os.path.basename(pdf_path)
+        # Páginas sin texto enviadas al OCR: se leen al final, sin detener las páginas con texto
+        ocr_pending = []
+        for page_num in range(start_page, end_page):
+            inicio = time.perf_counter()
+            page_text = pdf.page_text(page_num)
+            if not page_text:
+                if ocr_pages is not None:
+                    ocr_pages.append((page_num, pdf.page_hash(page_num)))
+                    continue
+                if self.ocr is not None:
+                    logging.info(f"Página {page_num+1} de {pdf_path} sin texto extraíble; se envía a OCR")
+                    ocr_pending.append((page_num, self.ocr.submit(pdf_path, page_num, pdf.page_hash(page_num))))
+                    continue
+                logging.warning(f"Página {page_num+1} de {pdf_path} está vacía o no contiene texto extraíble")
+                self.metrics.add_page(archivo, page_num+1, 0, time.perf_counter() - inicio)
+                continue
             
-            # Intenta formatear según el patrón DD/MM/YYYY
-            try:
-                return datetime.strptime(date_str, "%d/%m/%Y")
-            except ValueError:
-                pass
-                
-            # Intenta con formato alternativo MM/DD/YYYY
-            try:
-                return datetime.strptime(date_str, "%m/%d/%Y")
-            except ValueError:
-                pass
-                
-            # Intenta con formato YYYY-MM-DD
+            logging.debug(f"Procesando página {page_num+1} de {pdf_path}")
+            rows, cheque_global, proveedor_global = self.parse_page_text(
+                page_text, page_num, date_parser, cheque_global, proveedor_global)
+            
+            # Registrar líneas encontradas y tiempo por página
+            logging.debug(f"Encontradas {len(rows)} líneas de datos en página {page_num+1} de {pdf_path}")
+            self.metrics.add_page(archivo, page_num+1, len(rows), time.perf_counter() - inicio)
+            yield rows, cheque_global, proveedor_global
+        
+        yield from self.iter_ocr_rows(pdf_path, ocr_pending, date_parser, cheque_global, proveedor_global)
+
+    def submit_ocr_pages(self, pdf_path, ocr_pages):
+        """Envía al pool de OCR las páginas [(página, hash)] devueltas por una tarea de extracción"""
+        for page_num, _ in ocr_pages:
+            logging.info(f"Página {page_num+1} de {pdf_path} sin texto extraíble; se envía a OCR")
+        return [(page_num, self.ocr.submit(pdf_path, page_num, key)) for page_num, key in ocr_pages]
+
+    def iter_ocr_rows(self, pdf_path, ocr_pending, date_parser, cheque_global, proveedor_global):
+        """Espera el OCR de las páginas [(página, pendiente)] y genera (filas, cheque, proveedor) por página"""
+        archivo = os.path.basename(pdf_path)
+        for page_num, pending in ocr_pending:
+            page_text, segundos, de_cache = self.ocr.result(pending)
+            self.metrics.count('paginas_ocr_cache' if de_cache else 'paginas_ocr')
+            if not page_text:
+                logging.warning(f"Página {page_num+1} de {pdf_path} está vacía o no contiene texto extraíble (OCR)")
+                self.metrics.add_page(archivo, page_num+1, 0, segundos)
+                continue
+            rows, cheque_global, proveedor_global = self.parse_page_text(
+                page_text, page_num, date_parser, cheque_global, proveedor_global)
+            logging.info(f"OCR de la página {page_num+1} de {pdf_path}: {len(rows)} líneas de datos"
+                         f"{' (caché)' if de_cache else ''}")
+            self.metrics.add_page(archivo, page_num+1, len(rows), segundos)
+            yield rows, cheque_global, proveedor_global
+
+    def add_ocr_rows(self, pdf_path, document, ocr_pending):
+        """
+        Completa un documento (filas, cheque, proveedor) extraído en el pool con las filas de sus
+        páginas leídas con OCR, al final como en la extracción en serie
+        """
+        rows, cheque, proveedor = document
+        if not ocr_pending:
+            return document
+        rows = list(rows)
+        for page_rows, cheque, proveedor in self.iter_ocr_rows(pdf_path, ocr_pending, DateParser(), cheque, proveedor):
+            rows.extend(page_rows)
+        return rows, cheque, proveedor
+
+    def parse_page_text(self, page_text, page_num, date_parser, cheque_global, proveedor_global):
+        """
+        Líneas de pedidos del texto de una página. Devuelve (filas, cheque, proveedor); el cheque
+        y el proveedor recibidos se conservan si ya se habían encontrado en el documento.
+        """
+        rows = []
+        for line in page_text.split('\n'):
+            # Cheque y proveedor: se conserva el primero que aparezca en el documento
+            if 'Cheque' in line and not cheque_global:
+                cheque_parts = line.split(':')
+                if len(cheque_parts) > 1:
+                    cheque_global = cheque_parts[1].strip()
+            elif 'Proveedor' in line and not proveedor_global:
+                proveedor_parts = line.split(':')
+                if len(proveedor_parts) > 1:
+                    proveedor_global = proveedor_parts[1].strip()
+            
+            # Líneas de pedidos (8 dígitos): una sola coincidencia captura todos los campos
+            fields = match_order_line(line)
+            if fields is None:
+                continue
+            pedido, fecha_pedido, fecha_vencimiento, documento, tipo, total = fields
             try:
-                return datetime.strptime(date_str, "%Y-%m-%d")
-            except ValueError:
-                pass
-                
-            # Si ninguno funciona, intentar con pandas que es más flexible
-            return pd.to_datetime(date_str, errors='coerce')
-                
-        except Exception as e:
-            logging.warning(f"No se pudo formatear la fecha '{date_str}': {str(e)}")
-            return date_str  # Devuelve la cadena original si falla
+                rows.append((pedido, date_parser.parse(fecha_pedido), date_parser.parse(fecha_vencimiento),
+                             documento, tipo, total, page_num+1))
+            except Exception as e:
+                logging.error(f"Error procesando línea {line}: {str(e)}")
+        return rows, cheque_global, proveedor_global
 
-    def extract_data_from_pdf(self, pdf_path):
+    def iter_document_batches(self, pdf_path):
+        """
+        Extrae un PDF en lotes sin acumular el documento completo: genera (filas, cheque, proveedor)
+        por página. Las filas leídas antes de conocer el cheque y el proveedor se retienen hasta
+        encontrarlos (o hasta el final del documento), para asignarles los mismos valores que
+        en la extracción completa.
+        """
+        pending = []
+        cheque = ""
+        proveedor = ""
+        with open_pdf(pdf_path, self.backend) as pdf:
+            logging.info(f"Archivo {pdf_path} contiene {pdf.num_pages} páginas")
+            for page_rows, cheque, proveedor in self.iter_page_rows(pdf, pdf_path):
+                pending.extend(page_rows)
+                if pending and cheque and proveedor:
+                    yield pending, cheque, proveedor
+                    pending = []
+        if pending:
+            yield pending, cheque, proveedor
+
+    def add_document_rows(self, pdf_path, rows, cheque, proveedor):
+        """Agrega las filas compactas de un documento al buffer columnar"""
+        # Cheque y proveedor se completan también en filas leídas antes del encabezado
+        self.processed_data.extend_document(os.path.basename(pdf_path), rows, cheque, proveedor, self.doc_types)
+
+    def extract_document(self, pdf_path):
+        """Extrae un PDF completo y devuelve (filas, cheque, proveedor), o None si falla"""
         logging.info(f"Procesando archivo: {pdf_path}")
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                # Registrar información sobre páginas totales
-                num_pages = len(pdf.pages)
-                logging.info(f"Archivo {pdf_path} contiene {num_pages} páginas")
-                
-                # Variables para acumular datos por archivo
-                cheque_global = ""
-                proveedor_global = ""
-                total_lines_processed = 0
-                
-                # Primer recorrido para extraer información de cheque y proveedor del documento
-                # (tomando el primero que encontremos ya que generalmente es un dato por documento)
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if not page_text:
-                        continue
-                        
-                    lines = page_text.split('\n')
-                    for line in lines:
-                        if 'Cheque' in line and not cheque_global:
-                            cheque_parts = line.split(':')
-                            if len(cheque_parts) > 1:
-                                cheque_global = cheque_parts[1].strip()
-                        elif 'Proveedor' in line and not proveedor_global:
-                            proveedor_parts = line.split(':')
-                            if len(proveedor_parts) > 1:
-                                proveedor_global = proveedor_parts[1].strip()
-                            
-                    # Si ya encontramos ambos datos, podemos salir del primer escaneo
-                    if cheque_global and proveedor_global:
-                        break
-                
-                # Segundo recorrido para extraer líneas de datos de todas las páginas
-                for page_num, page in enumerate(pdf.pages):
-                    page_text = page.extract_text()
-                    if not page_text:
-                        logging.warning(f"Página {page_num+1} de {pdf_path} está vacía o no contiene texto extraíble")
-                        continue
-                    
-                    logging.info(f"Procesando página {page_num+1} de {pdf_path}")
-                    
-                    lines = page_text.split('\n')
-                    data_lines = []
-                    
-                    # Identificar líneas que contienen datos de pedidos (formato de 8 dígitos)
-                    for line in lines:
-                        parts = line.split()
-                        if len(parts) > 0 and parts[0].isdigit() and len(parts[0]) == 8:
-                            data_lines.append(line)
-                    
-                    # Registrar líneas encontradas por página
-                    page_lines = len(data_lines)
-                    total_lines_processed += page_lines
-                    logging.info(f"Encontradas {page_lines} líneas de datos en página {page_num+1} de {pdf_path}")
-                    
-                    # Procesar cada línea de datos
-                    for line in data_lines:
-                        parts = line.split()
-                        if len(parts) >= 6:
-                            try:
-                                # Formatear correctamente las fechas para asegurar que se reconozcan
-                                fecha_pedido = self.format_date(parts[1])
-                                fecha_vencimiento = self.format_date(parts[2])
-                                
-                                # Normalizar formato de valores numéricos
-                                total = parts[5].replace('$', '').replace(',', '')
-                                
-                                order_data = {
-                                    'Numero_Pedido': parts[0],
-                                    'Fecha_Pedido': fecha_pedido,
-                                    'Fecha_Vencimiento': fecha_vencimiento,
-                                    'Numero_Documento': parts[3],
-                                    'Tipo_Docto': parts[4],
-                                    'Total': total,
-                                    'Descripcion': self.doc_types.get(parts[4], 'OTRO'),
-                                    'Cheque': cheque_global,
-                                    'Proveedor': proveedor_global,
-                                    'Pagina_PDF': page_num+1,  # Referencia a la página de origen
-                                    'Archivo_PDF': os.path.basename(pdf_path)  # Referencia al archivo
-                                }
-                                self.processed_data.append(order_data)
-                                
-                            except Exception as e:
-                                logging.error(f"Error procesando línea {line}: {str(e)}")
-                
+            inicio = time.perf_counter()
+            rows, cheque, proveedor, num_pages = self.parse_pdf_pages(pdf_path)
+            self.metrics.add_pdf(os.path.basename(pdf_path), num_pages, len(rows), time.perf_counter() - inicio)
+            logging.info(f"Archivo {pdf_path} contiene {num_pages} páginas")
+            
             # Resumen final del procesamiento
-            logging.info(f"Finalizado procesamiento de {pdf_path}: {total_lines_processed} líneas en {num_pages} páginas")
+            logging.info(f"Finalizado procesamiento de {pdf_path}: {len(rows)} líneas en {num_pages} páginas")
+            return rows, cheque, proveedor
                 
         except Exception as e:
             logging.error(f"Error procesando {pdf_path}: {str(e)}")
             # Añadir trazabilidad del error
             logging.error(traceback.format_exc())
+            self.metrics.count('pdfs_con_error')
+            return None
+
+    def extract_data_from_pdf(self, pdf_path):
+        document = self.extract_document(pdf_path)
+        if document is not None:
+            self.add_document_rows(pdf_path, *document)
 
     def generate_analysis_from_df(self, df):
-        """Genera análisis estadístico a partir del DataFrame combinado."""
+        """
+        Genera análisis estadístico a partir del DataFrame combinado. Solo se usa sin almacén;
+        con almacén se toma de los agregados acumulados (ver analytics.RunningAggregates).
+        """
         if df.empty:
             return None
        
         # Análisis por tipo de documento
-        doc_analysis = df.groupby(['Tipo_Docto', 'Descripcion']).agg({
+        doc_analysis = df.groupby(['Tipo_Docto', 'Descripcion'], observed=True).agg({
             'Numero_Pedido': 'count',
             'Total': 'sum'
         }).reset_index()
         
-        total_docs = doc_analysis['Numero_Pedido'].sum()
-        # Convertir a porcentaje (si deseas que sea 0-100, multiplica por 100, o déjalo entre 0 y 1)
-        doc_analysis['Porcentaje'] = (doc_analysis['Numero_Pedido'] / total_docs).round(2)
-        doc_analysis = doc_analysis.sort_values('Numero_Pedido', ascending=False)
-        
-        return doc_analysis
+        return summarize_doc_types(doc_analysis)
+
+    def write_reconciliation(self):
+        """Escribe el reporte de conciliación por cheque desde los agregados del almacén"""
+        if self.store is None:
+            logging.info("Sin almacén de extracciones no hay agregados para el reporte de conciliación")
+            return None
+        return write_reconciliation(self.store.analytics)
+
+    def list_pdfs(self):
+        """Lista los PDFs de la carpeta de entrada en orden fijo"""
+        return [
+            os.path.join(self.input_dir, filename)
+            for filename in sorted(os.listdir(self.input_dir))
+            if filename.endswith('.pdf')
+        ]
+
+    def plan_extraction(self, pdf_paths):
+        """
+        Decide qué PDFs extraer según el manifiesto. Devuelve (pendientes, documentos) donde
+        documentos son las filas reutilizadas del manifiesto para archivos sin cambios que aún
+        no están en el almacén. Los archivos modificados se registran en replaced_files.
+        """
+        # Con manifiesto solo se extraen los archivos nuevos o modificados
+        pending = []
+        documents = {}
+        for pdf_path in pdf_paths:
+            if self.manifest is None:
+                pending.append(pdf_path)
+                continue
+            estado, huella = self.manifest.check(pdf_path)
+            if estado == 'sin_cambios':
+                # Si sus filas ya están en el almacén no hace falta volver a agregarlas
+                if self.store is not None and self.store.has_file(os.path.basename(pdf_path)):
+                    logging.info(f"Archivo sin cambios, ya está en el almacén: {pdf_path}")
+                    self.metrics.count('pdfs_sin_cambios')
+                    continue
+                logging.info(f"Archivo sin cambios, se reutilizan sus filas: {pdf_path}")
+                self.metrics.count('pdfs_sin_cambios')
+                documents[pdf_path] = self.manifest.load_document(pdf_path)
+            else:
+                if estado == 'modificado':
+                    logging.info(f"Archivo modificado, se reemplazarán sus filas: {pdf_path}")
+                    self.replaced_files.add(os.path.basename(pdf_path))
+                pending.append(pdf_path)
+                self.pending_fingerprints[pdf_path] = huella
+        return pending, documents
 
     def process_all_pdfs(self):
-        input_dir = 'PDFSEARS'
-        for filename in os.listdir(input_dir):
-            if filename.endswith('.pdf'):
-                pdf_path = os.path.join(input_dir, filename)
-                self.extract_data_from_pdf(pdf_path)
+        pdf_paths = self.list_pdfs()
+        self.seed_store()
+        pending, documents = self.plan_extraction(pdf_paths)
+        
+        for pdf_path, document in self.extract_documents(pending):
+            if document is None:
+                continue
+            documents[pdf_path] = document
+            if self.manifest is not None:
+                self.manifest.save_document(pdf_path, self.pending_fingerprints.pop(pdf_path), document)
+        
+        logging.info(f"PDFs: {len(pdf_paths)} en total, {len(pending)} extraídos")
+        for pdf_path in pdf_paths:
+            if pdf_path in documents:
+                self.add_document_rows(pdf_path, *documents[pdf_path])
 
-    def generate_excel(self):
+    def extract_documents(self, pdf_paths):
+        """Extrae varios PDFs, en serie o en paralelo, y devuelve [(pdf_path, documento)] en el mismo orden"""
+        if self.workers > 1 and pdf_paths:
+            return self.extract_documents_parallel(pdf_paths)
+        return [(pdf_path, self.extract_document(pdf_path)) for pdf_path in pdf_paths]
+
+    def extract_documents_parallel(self, pdf_paths):
+        """
+        Extrae los PDFs en un pool de procesos. Los PDFs grandes se dividen en rangos de
+        páginas; los resultados se combinan en el mismo orden que el recorrido secuencial.
+        """
+        tasks = []
+        for pdf_path in pdf_paths:
+            try:
+                with open_pdf(pdf_path, self.backend) as pdf:
+                    num_pages = pdf.num_pages
+            except Exception as e:
+                logging.error(f"Error procesando {pdf_path}: {str(e)}")
+                logging.error(traceback.format_exc())
+                self.metrics.count('pdfs_con_error')
+                tasks.append((pdf_path, []))
+                continue
+            tasks.append((pdf_path, [
+                (start, min(start + self.pages_per_task, num_pages))
+                for start in range(0, max(num_pages, 1), self.pages_per_task)
+            ]))
+        
+        logging.info(f"Extracción en paralelo: {len(tasks)} archivos con {self.workers} procesos")
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                (pdf_path, [
+                    executor.submit(_parse_pdf_pages_task, pdf_path, start, end, self.backend,
+                                    self.ocr is not None)
+                    for start, end in ranges
+                ])
+                for pdf_path, ranges in tasks
+            ]
+            
+            # Combinar en orden de archivo y de rango para obtener la misma salida que en serie.
+            # Las páginas sin texto se envían al pool de OCR en cuanto termina su rango, así el
+            # OCR corre mientras el pool de extracción sigue con los demás PDFs
+            extracted = []
+            for pdf_path, pdf_futures in futures:
+                if not pdf_futures:
+                    extracted.append((pdf_path, None))
+                    continue
+                try:
+                    rows = []
+                    cheque = ""
+                    proveedor = ""
+                    num_pages = 0
+                    pages = []
+                    ocr_pending = []
+                    for future in pdf_futures:
+                        (batch, batch_cheque, batch_proveedor, num_pages), ocr_pages, batch_pages, counters = future.result()
+                        rows.extend(batch)
+                        pages.extend(batch_pages)
+                        for name, amount in counters.items():
+                            self.metrics.count(name, amount)
+                        cheque = cheque or batch_cheque
+                        proveedor = proveedor or batch_proveedor
+                        ocr_pending.extend(self.submit_ocr_pages(pdf_path, ocr_pages))
+                    extracted.append((pdf_path, ((rows, cheque, proveedor), num_pages, pages, ocr_pending)))
+                except Exception as e:
+                    extracted.append((pdf_path, e))
+        
+        results = []
+        for pdf_path, extraction in extracted:
+            if extraction is None:
+                results.append((pdf_path, None))
+                continue
+            logging.info(f"Procesando archivo: {pdf_path}")
+            try:
+                if isinstance(extraction, Exception):
+                    raise extraction
+                document, num_pages, pages, ocr_pending = extraction
+                self.metrics.pages.extend(pages)
+                ocr_start = len(self.metrics.pages)
+                rows, cheque, proveedor = self.add_ocr_rows(pdf_path, document, ocr_pending)
+                # El tiempo del PDF es la suma de sus páginas (los rangos se leen en paralelo)
+                pages = pages + self.metrics.pages[ocr_start:]
+                self.metrics.add_pdf(os.path.basename(pdf_path), num_pages, len(rows),
+                                     sum(page['segundos'] for page in pages))
+                logging.info(f"Archivo {pdf_path} contiene {num_pages} páginas")
+                logging.info(f"Finalizado procesamiento de {pdf_path}: {len(rows)} líneas en {num_pages} páginas")
+                results.append((pdf_path, (rows, cheque, proveedor)))
+            except Exception as e:
+                logging.error(f"Error procesando {pdf_path}: {str(e)}")
+                logging.error(traceback.format_exc())
+                self.metrics.count('pdfs_con_error')
+                results.append((pdf_path, None))
+        return results
+
+    def build_dataframe(self):
+        """Crea el DataFrame tipado con los datos procesados en esta ejecución"""
+        # El buffer ya guarda números, fechas (datetime64) y categorías: no hay que convertir
+        new_df = self.processed_data.to_frame()
+        
+        for col in DATE_COLUMNS:
+            # Registrar información sobre fechas procesadas
+            if not new_df.empty:
+                valid_dates = new_df[col].notna().sum()
+                total_rows = len(new_df)
+                logging.info(f"Columna {col}: {valid_dates} de {total_rows} fechas válidas ({valid_dates/total_rows*100:.1f}%)")
+                # Registrar ejemplos de fechas para diagnóstico
+                sample_dates = new_df[col].dropna().head(3).tolist()
+                sample_str = ', '.join([str(d) for d in sample_dates])
+                logging.info(f"Ejemplos de {col}: {sample_str}")
+        
+        return new_df
+
+    def seed_store(self):
+        """Si el almacén está vacío y existe el Excel acumulado, importa su historial una sola vez"""
+        if self.store is not None and self.store.count() == 0 and os.path.exists(self.output_file):
+            try:
+                self.store.import_excel(self.output_file)
+            except Exception as e:
+                logging.error(f"Error al importar el archivo existente: {str(e)}")
+
+    def save_to_store(self):
+        """Agrega al almacén solo las filas nuevas de esta ejecución"""
+        self.seed_store()
+        
+        # Reemplazar las filas de los PDFs que cambiaron de contenido
+        removed = self.store.delete_files(self.replaced_files)
+        if removed:
+            logging.info(f"Reemplazando {removed} filas de {len(self.replaced_files)} PDFs modificados")
+        
+        inserted = self.store.append(self.build_dataframe())
+        logging.info(f"Almacén actualizado: {inserted} filas nuevas de {len(self.processed_data)} procesadas "
+                     f"({self.store.count()} en total)")
+        return inserted
+
+    def stream_to_store(self, chunk_rows=5000):
+        """
+        Modo streaming: extrae los PDFs página por página y escribe las filas al almacén en
+        bloques de chunk_rows, sin acumular todas las filas en memoria. Las filas de cada PDF
+        se confirman en una sola transacción al terminar el archivo; si falla, se descartan.
+        """
+        if self.store is None:
+            raise ValueError("El modo streaming requiere el almacén de extracciones")
+        if self.workers > 1:
+            logging.info("El modo streaming extrae los PDFs en serie")
+        
+        pdf_paths = self.list_pdfs()
+        self.seed_store()
+        pending, documents = self.plan_extraction(pdf_paths)
+        pending = set(pending)
+        
+        # Reemplazar las filas de los PDFs que cambiaron de contenido
+        removed = self.store.delete_files(self.replaced_files)
+        if removed:
+            logging.info(f"Reemplazando {removed} filas de {len(self.replaced_files)} PDFs modificados")
+        
+        inserted = 0
+        procesadas = 0
+        for pdf_path in pdf_paths:
+            if pdf_path in documents:
+                batches = [documents.pop(pdf_path)]
+            elif pdf_path in pending:
+                logging.info(f"Procesando archivo: {pdf_path}")
+                batches = self.iter_document_batches(pdf_path)
+            else:
+                continue
+            
+            filas_documento = 0
+            paginas_leidas = len(self.metrics.pages)
+            inicio = time.perf_counter()
+            try:
+                if self.manifest is not None and pdf_path in pending:
+                    self.manifest.start_document(pdf_path)
+                cheque = proveedor = ""
+                for rows, cheque, proveedor in batches:
+                    if self.manifest is not None and pdf_path in pending:
+                        self.manifest.add_rows(pdf_path, filas_documento, rows)
+                    filas_documento += len(rows)
+                    self.add_document_rows(pdf_path, rows, cheque, proveedor)
+                    if len(self.processed_data) >= chunk_rows:
+                        inserted += self.store.append(self.build_dataframe(), commit=False)
+                        self.processed_data.clear()
+                inserted += self.store.append(self.build_dataframe(), commit=False)
+                self.processed_data.clear()
+                self.store.commit()
+                if self.manifest is not None and pdf_path in pending:
+                    self.manifest.finish_document(pdf_path, self.pending_fingerprints.pop(pdf_path),
+                                                  cheque, proveedor)
+            except Exception as e:
+                logging.error(f"Error procesando {pdf_path}: {str(e)}")
+                logging.error(traceback.format_exc())
+                self.processed_data.clear()
+                self.store.rollback()
+                if self.manifest is not None:
+                    self.manifest.rollback()
+                self.metrics.count('pdfs_con_error')
+                continue
+            procesadas += filas_documento
+            if pdf_path in pending:
+                self.metrics.add_pdf(os.path.basename(pdf_path), len(self.metrics.pages) - paginas_leidas,
+                                     filas_documento, time.perf_counter() - inicio)
+            logging.info(f"Finalizado procesamiento de {pdf_path}: {filas_documento} líneas")
+        
+        logging.info(f"PDFs: {len(pdf_paths)} en total, {len(pending)} extraídos")
+        logging.info(f"Almacén actualizado: {inserted} filas nuevas de {procesadas} procesadas "
+                     f"({self.store.count()} en total)")
+        return inserted
+
+    def load_combined(self):
+        """Combina el Excel acumulado existente con los datos nuevos (modo sin almacén)"""
         # Si ya existe el Excel acumulado, lo leemos
         if os.path.exists(self.output_file):
             try:
@@ -199,34 +571,19 @@ class SearsExtractor:
         else:
             existing_df = pd.DataFrame()
 
+        # Descartar las filas anteriores de los PDFs que cambiaron de contenido
+        if not existing_df.empty and self.replaced_files and 'Archivo_PDF' in existing_df.columns:
+            replaced_mask = existing_df['Archivo_PDF'].isin(self.replaced_files)
+            logging.info(f"Reemplazando {replaced_mask.sum()} filas de {len(self.replaced_files)} PDFs modificados")
+            existing_df = existing_df[~replaced_mask]
+
         # Crear DataFrame de los nuevos datos procesados
-        new_df = pd.DataFrame(self.processed_data)
-        
-        # Convertir columnas numéricas
-        new_df['Total'] = pd.to_numeric(new_df['Total'], errors='coerce')
-        new_df['Numero_Pedido'] = pd.to_numeric(new_df['Numero_Pedido'], errors='coerce')
-        new_df['Numero_Documento'] = pd.to_numeric(new_df['Numero_Documento'], errors='coerce')
-        
-        # Convertir columnas de fecha explícitamente
-        date_columns = ['Fecha_Pedido', 'Fecha_Vencimiento']
-        for col in date_columns:
-            # Utilizar pd.to_datetime para convertir las columnas a fecha
-            new_df[col] = pd.to_datetime(new_df[col], errors='coerce')
-            # Registrar información sobre fechas procesadas
-            if not new_df.empty:
-                valid_dates = new_df[col].notna().sum()
-                total_rows = len(new_df)
-                logging.info(f"Columna {col}: {valid_dates} de {total_rows} fechas válidas ({valid_dates/total_rows*100:.1f}%)")
-                # Registrar ejemplos de fechas para diagnóstico
-                if col in new_df.columns:
-                    sample_dates = new_df[col].dropna().head(3).tolist()
-                    sample_str = ', '.join([str(d) for d in sample_dates])
-                    logging.info(f"Ejemplos de {col}: {sample_str}")
+        new_df = self.build_dataframe()
 
         # Combinar los datos existentes con los nuevos
         if not existing_df.empty:
             # Asegurar que las columnas de fecha también se convierten en el DataFrame existente
-            for col in date_columns:
+            for col in DATE_COLUMNS:
                 if col in existing_df.columns:
                     existing_df[col] = pd.to_datetime(existing_df[col], errors='coerce')
             
@@ -235,18 +592,25 @@ class SearsExtractor:
             combined_df = new_df
 
         # Eliminar registros duplicados (usando como clave Numero_Pedido y Numero_Documento)
-        combined_df = combined_df.drop_duplicates(subset=['Numero_Pedido', 'Numero_Documento'], keep='first')
+        return combined_df.drop_duplicates(subset=['Numero_Pedido', 'Numero_Documento'], keep='first')
+
+    def generate_excel(self):
+        """Exporta el acumulado completo a sears_extractions.xlsx"""
+        if self.store is not None:
+            combined_df = self.store.load()
+            # Análisis desde los agregados acumulados, sin recalcular sobre todo el historial
+            analysis_df = self.store.analytics.doc_types()
+        else:
+            combined_df = self.load_combined()
+            analysis_df = self.generate_analysis_from_df(combined_df)
 
         # Verificar estado final de las fechas antes de escribir
-        for col in date_columns:
+        for col in DATE_COLUMNS:
             if col in combined_df.columns:
                 valid_count = combined_df[col].notna().sum()
                 total_count = len(combined_df)
                 logging.info(f"Final {col}: {valid_count}/{total_count} fechas válidas")
 
-        # Generar análisis basado en el DataFrame combinado
-        analysis_df = self.generate_analysis_from_df(combined_df)
-
         # Crear Excel con múltiples hojas (se sobrescribe el archivo acumulado)
         with pd.ExcelWriter(self.output_file, engine='xlsxwriter', date_format='dd/mm/yyyy') as writer:
             # Hoja de datos principales
@@ -288,6 +652,44 @@ class SearsExtractor:
         logging.info(f"Excel generado exitosamente: {self.output_file}")
 
 if __name__ == "__main__":
-    extractor = SearsExtractor()
-    extractor.process_all_pdfs()
-    extractor.generate_excel()
+    parser = argparse.ArgumentParser(description='Extrae los pedidos de los PDFs de Sears')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Procesos para la extracción (0 = todos los núcleos)')
+    parser.add_argument('--paginas-por-tarea', type=int, default=50,
+                        help='Páginas por tarea al dividir PDFs grandes')
+    parser.add_argument('--sin-manifiesto', action='store_true',
+                        help='Volver a extraer todos los PDFs aunque no hayan cambiado')
+    parser.add_argument('--sin-excel', action='store_true',
+                        help='Solo actualizar el almacén, sin exportar sears_extractions.xlsx')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='pdfplumber',
+                        help='Lector de PDFs: pdfplumber (predeterminado) o pdfminer (solo texto, más rápido)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Extraer página por página y escribir al almacén por bloques (memoria acotada)')
+    parser.add_argument('--ocr', action='store_true',
+                        help='Leer con OCR (tesseract) las páginas sin texto extraíble, como los estados escaneados')
+    parser.add_argument('--workers-ocr', type=int, default=1,
+                        help='Procesos para el OCR de páginas escaneadas')
+    parser.add_argument('--detalle', action='store_true',
+                        help='Registrar el detalle por página (nivel DEBUG)')
+    args = parser.parse_args()
+    if args.detalle:
+        enable_debug_logging()
+
+    extractor = SearsExtractor(workers=args.workers, pages_per_task=args.paginas_por_tarea,
+                               use_manifest=not args.sin_manifiesto, backend=args.backend,
+                               ocr_workers=args.workers_ocr if args.ocr else None)
+    try:
+        with extractor.metrics.stage('extraccion'):
+            if args.streaming:
+                extractor.stream_to_store()
+            else:
+                extractor.process_all_pdfs()
+                extractor.save_to_store()
+        if not args.sin_excel:
+            with extractor.metrics.stage('exportar_excel'):
+                extractor.generate_excel()
+        with extractor.metrics.stage('conciliacion'):
+            extractor.write_reconciliation()
+    finally:
+        extractor.close()
+    extractor.metrics.write()
@@ -0,0 +1,96 @@
+import re
+import logging
+from datetime import datetime
+import pandas as pd
+
+# Tipos de documento conocidos de las líneas de pedidos
+DOC_TYPES = ('NP', 'NT', 'ND', 'DR', 'DV')
+
+# Línea de pedido: número de pedido de 8 dígitos, fecha de pedido, fecha de vencimiento,
+# número de documento, tipo y total ($1,117.14). Una sola coincidencia captura todos los campos.
+ORDER_LINE_RE = re.compile(
+    r'\s*(?P<pedido>\d{8})\s+'
+    r'(?P<fecha_pedido>\d{1,2}/\d{1,2}/\d{4})\s+'
+    r'(?P<fecha_vencimiento>\d{1,2}/\d{1,2}/\d{4})\s+'
+    r'(?P<documento>\d+)\s+'
+    rf'(?P<tipo>{"|".join(DOC_TYPES)})\s+'
+    r'(?P<total>-?\$?-?[\d,]+(?:\.\d+)?)(?=\s|$)'
+)
+
+# Alternativa genérica con la semántica histórica de line.split(): 8 dígitos y al menos seis
+# campos separados por espacios, sin validar su contenido (tipos nuevos, fechas en otro formato)
+GENERIC_LINE_RE = re.compile(r'\s*(\d{8})\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)')
+
+_DMY_RE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+
+# Formatos de fecha en el orden en que se prueban
+DATE_FORMATS = ('%d/%m/%Y', '%m/%d/%Y', '%Y-%m-%d')
+
+
+def match_order_line(line):
+    """
+    Devuelve (pedido, fecha_pedido, fecha_vencimiento, documento, tipo, total) como textos si la
+    línea es de pedido; el total ya viene sin '$' ni comas. None si la línea no tiene los campos.
+    """
+    match = ORDER_LINE_RE.match(line) or GENERIC_LINE_RE.match(line)
+    if match is None:
+        return None
+    pedido, fecha_pedido, fecha_vencimiento, documento, tipo, total = match.groups()
+    return pedido, fecha_pedido, fecha_vencimiento, documento, tipo, total.replace('$', '').replace(',', '')
+
+
+class DateParser:
+    """
+    Convierte las fechas de un documento. El formato se detecta con la primera fecha válida
+    y se prueba primero en las siguientes; los valores ya convertidos se guardan en caché
+    (en un estado de cuenta las mismas fechas se repiten en muchas líneas).
+    Si un valor no cumple el formato detectado se prueban los demás y al final pandas.
+    """
+
+    def __init__(self):
+        self.date_format = None
+        self.cache = {}
+
+    def parse(self, value):
+        if isinstance(value, (datetime, pd.Timestamp)):
+            return value
+        try:
+            return self.cache[value]
+        except KeyError:
+            pass
+        try:
+            parsed = self._parse(value.strip())
+        except Exception as e:
+            logging.warning(f"No se pudo formatear la fecha '{value}': {str(e)}")
+            parsed = value  # Devuelve la cadena original si falla
+        self.cache[value] = parsed
+        return parsed
+
+    def _parse(self, value):
+        formats = DATE_FORMATS
+        if self.date_format is not None:
+            formats = (self.date_format,) + tuple(f for f in DATE_FORMATS if f != self.date_format)
+        for date_format in formats:
+            try:
+                parsed = _strptime(value, date_format)
+            except ValueError:
+                continue
+            if self.date_format is None:
+                self.date_format = date_format
+                logging.debug(f"Formato de fecha detectado: {date_format}")
+            return parsed
+        # Si ninguno funciona, intentar con pandas que es más flexible
+        return pd.to_datetime(value, errors='coerce')
+
+
+def _strptime(value, date_format):
+    """strptime con atajo para dd/mm/aaaa y mm/dd/aaaa, los formatos de los estados de cuenta"""
+    if date_format in ('%d/%m/%Y', '%m/%d/%Y'):
+        match = _DMY_RE.fullmatch(value)
+        if match is None:
+            raise ValueError(f"'{value}' no coincide con {date_format}")
+        first, second, year = (int(g) for g in match.groups())
+        if date_format == '%d/%m/%Y':
+            return datetime(year, second, first)
+        return datetime(year, first, second)
+    return datetime.strptime(value, date_format)
@@ -0,0 +1,163 @@
+import os
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+
+
+class ExtractionManifest:
+    """
+    Registro persistente de los PDFs ya extraídos (SQLite).
+    Cada archivo se identifica por ruta, tamaño, fecha de modificación y hash de contenido,
+    y guarda sus filas compactas para reutilizarlas sin volver a leer el PDF.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS archivos (
+                ruta TEXT PRIMARY KEY,
+                tamano INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                sha256 TEXT NOT NULL,
+                cheque TEXT,
+                proveedor TEXT,
+                procesado TEXT
+            );
+            CREATE TABLE IF NOT EXISTS filas (
+                ruta TEXT NOT NULL,
+                orden INTEGER NOT NULL,
+                pedido TEXT,
+                fecha_pedido TEXT,
+                fecha_vencimiento TEXT,
+                documento TEXT,
+                tipo TEXT,
+                total TEXT,
+                pagina INTEGER,
+                PRIMARY KEY (ruta, orden)
+            );
+        """)
+
+    @staticmethod
+    def file_hash(path, chunk_size=1024 * 1024):
+        """Calcula el SHA-256 del contenido del archivo"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def check(self, pdf_path):
+        """
+        Compara el archivo con lo registrado. Devuelve (estado, huella) donde estado es
+        'sin_cambios', 'nuevo' o 'modificado' y huella es (tamaño, mtime, sha256).
+        El hash solo se calcula si cambian el tamaño o la fecha de modificación.
+        """
+        stat = os.stat(pdf_path)
+        registro = self.conn.execute(
+            "SELECT tamano, mtime, sha256 FROM archivos WHERE ruta = ?", (pdf_path,)
+        ).fetchone()
+        if registro and registro[0] == stat.st_size and registro[1] == stat.st_mtime:
+            return 'sin_cambios', (stat.st_size, stat.st_mtime, registro[2])
+
+        sha256 = self.file_hash(pdf_path)
+        huella = (stat.st_size, stat.st_mtime, sha256)
+        if registro is None:
+            return 'nuevo', huella
+        if registro[2] == sha256:
+            # Mismo contenido (p. ej. archivo copiado de nuevo): solo actualizar la huella
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE archivos SET tamano = ?, mtime = ? WHERE ruta = ?",
+                    (stat.st_size, stat.st_mtime, pdf_path)
+                )
+            return 'sin_cambios', huella
+        return 'modificado', huella
+
+    def load_document(self, pdf_path):
+        """Devuelve (filas, cheque, proveedor) registrados para el archivo"""
+        cheque, proveedor = self.conn.execute(
+            "SELECT cheque, proveedor FROM archivos WHERE ruta = ?", (pdf_path,)
+        ).fetchone()
+        rows = [
+            (pedido, _parse_fecha(fecha_pedido), _parse_fecha(fecha_vencimiento),
+             documento, tipo, total, pagina)
+            for pedido, fecha_pedido, fecha_vencimiento, documento, tipo, total, pagina
+            in self.conn.execute(
+                "SELECT pedido, fecha_pedido, fecha_vencimiento, documento, tipo, total, pagina "
+                "FROM filas WHERE ruta = ? ORDER BY orden", (pdf_path,)
+            )
+        ]
+        return rows, cheque, proveedor
+
+    def save_document(self, pdf_path, huella, document):
+        """Registra (o reemplaza) las filas extraídas de un archivo"""
+        rows, cheque, proveedor = document
+        try:
+            self.start_document(pdf_path)
+            self.add_rows(pdf_path, 0, rows)
+            self.finish_document(pdf_path, huella, cheque, proveedor)
+        except Exception:
+            self.rollback()
+            raise
+
+    def start_document(self, pdf_path):
+        """
+        Inicia el registro por lotes de un archivo (modo streaming). Las filas se escriben con
+        add_rows y quedan en una transacción abierta hasta finish_document o rollback.
+        """
+        self.conn.execute("DELETE FROM filas WHERE ruta = ?", (pdf_path,))
+
+    def add_rows(self, pdf_path, first_orden, rows):
+        """Agrega un lote de filas de un archivo a partir de la posición first_orden"""
+        self.conn.executemany(
+            "INSERT INTO filas (ruta, orden, pedido, fecha_pedido, fecha_vencimiento, "
+            "documento, tipo, total, pagina) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (pdf_path, orden, pedido, _format_fecha(fecha_pedido), _format_fecha(fecha_vencimiento),
+                 documento, tipo, total, pagina)
+                for orden, (pedido, fecha_pedido, fecha_vencimiento, documento, tipo, total, pagina)
+                in enumerate(rows, first_orden)
+            ]
+        )
+
+    def finish_document(self, pdf_path, huella, cheque, proveedor):
+        """Registra la huella del archivo y confirma sus filas"""
+        tamano, mtime, sha256 = huella
+        self.conn.execute(
+            "INSERT OR REPLACE INTO archivos (ruta, tamano, mtime, sha256, cheque, proveedor, procesado) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (pdf_path, tamano, mtime, sha256, cheque, proveedor, datetime.now().isoformat())
+        )
+        self.conn.commit()
+
+    def rollback(self):
+        """Descarta un registro por lotes sin terminar"""
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+def _format_fecha(value):
+    """Serializa una fecha extraída; NaT/None se guardan como NULL"""
+    if value is None or value != value:  # NaT no es igual a sí mismo
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _parse_fecha(value):
+    """Reconstruye la fecha guardada; los textos no reconocidos se devuelven tal cual"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        logging.debug(f"Fecha no ISO en el manifiesto: {value}")
+        return value
@@ -1,12 +1,19 @@
 import os
+import argparse
 import pandas as pd
 import logging
 from datetime import datetime
 import time
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
+import numpy as np
+from openpyxl.utils import column_index_from_string
 from openpyxl.styles import Font, numbers  # Importa números para formatos numéricos
-from datetime import datetime
+from backups import BackupPolicy, create_backup
+from concentrado import DUPLICATE_POLICIES, load_concentrado, resolve_rows
+from csv_diff import CHANGE_COLUMNS, diff_csv
+from csv_reader import CSV_ENGINES, CsvChunkReader, check_engine, csv_columns
+from xlsx_engine import ENGINES
+from metrics import enable_debug_logging
+from order_cache import OrderIndexCache
 
 # Configuración de logging
 logging.basicConfig(
@@ -18,13 +25,52 @@ logging.basicConfig(
     ]
 )
 
+# Formato de fecha de Excel (openpyxl no define una constante dd/mm/yyyy)
+DATE_FORMAT = 'dd/mm/yyyy'
+
+
+def _number_format(csv_col, value):
+    """
+    Formato numérico de una celda escrita desde el CSV (el resto del estilo se conserva):
+    número entero para valores numéricos y dd/mm/yyyy para la fecha del pedido
+    """
+    if csv_col == 'Fecha_Pedido' and pd.notna(value):
+        return DATE_FORMAT
+    if isinstance(value, (int, float)):
+        return numbers.FORMAT_NUMBER
+    return None
+
 
 class SearsCsvMerger:
-    def __init__(self):
+    def __init__(self, throttle=0, duplicate_policy='first', backup_policy=None, engine='openpyxl',
+                 export_changes=False, chunk_rows=50000, csv_engine='pandas', use_index=True):
         self.input_dir = 'CSVreporte'  # Carpeta donde se encuentran los archivos CSV
         self.concentrado_file = os.path.join('RESULTADOFINAL', 'Concentrado Sears.xlsx')
         self.backup_dir = os.path.join('RESULTADOFINAL', 'backups')
+        # Retención (y compresión opcional) de los respaldos del concentrado
+        self.backup_policy = backup_policy or BackupPolicy()
         self.report_file = os.path.join('RESULTADOFINAL', 'reporte_merge_csv.xlsx')
+        # Registro opcional de las celdas modificadas (se agrega al final en cada CSV aplicado)
+        self.export_changes = export_changes
+        self.changes_file = os.path.join('RESULTADOFINAL', 'cambios_merge_csv.csv')
+        # Pausa opcional (segundos) por fila del CSV; 0 = sin pausas
+        self.throttle = throttle
+        # Política ante pedidos repetidos en el concentrado (ver concentrado.DUPLICATE_POLICIES)
+        if duplicate_policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Política de duplicados no válida: {duplicate_policy}")
+        self.duplicate_policy = duplicate_policy
+        # Motor de actualización del concentrado (ver xlsx_engine.ENGINES)
+        if engine not in ENGINES:
+            raise ValueError(f"Motor de Excel no válido: {engine}")
+        self.engine = engine
+        # Lectura de los CSV por bloques de filas (ver csv_reader.CSV_ENGINES)
+        check_engine(csv_engine)
+        self.csv_engine = csv_engine
+        self.chunk_rows = chunk_rows
+        # Índice persistente de pedidos del concentrado (ver order_cache.OrderIndexCache)
+        self.index_cache = OrderIndexCache(
+            os.path.join('EXCELPDFSEARS', 'concentrado_index.db')
+        ) if use_index else None
         
         # Mapeo de columnas del CSV a columnas del Excel (comenzando en AB)
         self.column_mapping = {
@@ -45,224 +91,277 @@ class SearsCsvMerger:
 
     def create_backup(self):
         """Crea una copia de respaldo del archivo concentrado antes de modificarlo"""
-        if not os.path.exists(self.backup_dir):
-            os.makedirs(self.backup_dir)
-            
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = os.path.join(self.backup_dir, f'Concentrado_Sears_backup_csv_{timestamp}.xlsx')
-        
-        if os.path.exists(self.concentrado_file):
-            wb = load_workbook(self.concentrado_file)
-            wb.save(backup_file)
-            logging.info(f"Backup creado: {backup_file}")
+        return create_backup(self.concentrado_file, self.backup_dir, 'csv_', self.backup_policy)
 
-    def get_cell_value(self, ws, row_idx, col_letter):
-        """Obtiene el valor de una celda de manera segura"""
-        cell = ws[f"{col_letter}{row_idx}"]
-        return cell.value if cell else None
+    def load_concentrado(self):
+        """Carga el concentrado para edición y construye el índice de pedidos"""
+        return load_concentrado(self.concentrado_file, self.engine, self.index_cache)
 
-    def update_concentrado_cell(self, wb, sheet_name, row_idx, col_letter, value, csv_col):
-        """Actualiza una celda específica preservando el formato solo si hay un cambio real"""
-        ws = wb[sheet_name]
-        
-        # Obtener valor actual
-        current_value = self.get_cell_value(ws, row_idx, col_letter)
-        
-        # Normalizar valores para comparación
-        if isinstance(value, (int, float)) and pd.notna(value):
-            current_float = float(current_value) if pd.notna(current_value) else None
-            new_float = float(value)
-            if current_float == new_float:
-                return False, None  # No hay cambio real
-        elif current_value == value:
-            return False, None  # No hay cambio real
+    def apply_csv(self, csv_file, sheet, order_index):
+        """
+        Aplica un CSV sobre la hoja del concentrado ya cargada (ver xlsx_engine) y devuelve el
+        resultado para el reporte. El CSV se lee por bloques de filas (csv_reader) y cada bloque
+        se compara en bloque contra el concentrado (csv_diff.diff_csv) antes de leer el siguiente;
+        solo se escriben las celdas que cambian.
+        """
+        csv_filename = os.path.basename(csv_file)
+        logging.info(f"Procesando archivo: {csv_filename}")
         
-        # Si hay un cambio, actualizar la celda
-        target_cell = ws[f"{col_letter}{row_idx}"]
-        old_format = target_cell._style
+        # Columnas a actualizar: (nombre en CSV, índice de columna en Excel); solo se leen estas
+        header = csv_columns(csv_file)
+        mapped_columns = []
+        for csv_col, excel_col in self.column_mapping.items():
+            if csv_col in header:
+                mapped_columns.append((csv_col, column_index_from_string(excel_col)))
+            else:
+                logging.warning(f"El CSV {csv_filename} no tiene la columna {csv_col}")
         
-        # Convertir el valor al tipo correcto
-        if csv_col == 'Pedido':
-            try:
-                value = int(value)  # Forzar el pedido como número entero
-            except ValueError:
-                pass  # Si no se puede convertir, dejar como está
+        result = {
+            'csv_filename': csv_filename,
+            'total_rows': 0,
+            'matches': 0,
+            'updates': 0,
+            'no_matches': 0,
+            'match_pedidos': [],
+            'updated_pedidos': [],  # Pedidos con cambios reales
+            'no_match_pedidos': [],
+        }
+        changes = []
+        reader = CsvChunkReader(csv_file, [csv_col for csv_col, _ in mapped_columns],
+                                chunk_rows=self.chunk_rows, engine=self.csv_engine)
+        for chunk in reader:
+            changes.append(self.apply_chunk(chunk, result['total_rows'], sheet, order_index, mapped_columns, result))
+            result['total_rows'] += len(chunk)
+        result['changes'] = pd.concat(changes, ignore_index=True) if changes else pd.DataFrame(columns=CHANGE_COLUMNS)
+        return result
+
+    def apply_chunk(self, csv_df, offset, sheet, order_index, mapped_columns, result):
+        """
+        Aplica un bloque de filas del CSV (la primera es la fila offset del archivo), acumula los
+        contadores en result y devuelve las celdas modificadas
+        """
+        # Buscar cada pedido del bloque en el índice del concentrado: (posición en el bloque, fila de Excel)
+        targets = []
+        for pos, pedido in enumerate(csv_df['Pedido']):
+            if self.throttle:
+                time.sleep(self.throttle)
+            target_rows = resolve_rows(order_index, pedido, self.duplicate_policy)
+            
+            if target_rows:
+                result['matches'] += 1
+                result['match_pedidos'].append(pedido)
+                targets.extend((pos, row_idx) for row_idx in target_rows)
+            elif target_rows is None:
+                result['no_matches'] += 1
+                result['no_match_pedidos'].append(pedido)
+                logging.warning(f"Pedido {pedido} repetido en las filas {order_index[pedido]} del concentrado; no se actualiza")
+            else:
+                result['no_matches'] += 1
+                result['no_match_pedidos'].append(pedido)
+                logging.warning(f"No se encontró coincidencia para el pedido: {pedido}")
         
-        # Manejar fechas
-        if csv_col == 'Fecha_Pedido' and pd.notna(value):
+        # Celdas que cambian, en el orden del CSV
+        changes = diff_csv(csv_df, sheet, targets, mapped_columns)
+        applied = np.ones(len(changes), dtype=bool)
+        changes_by_row = {}
+        excel_columns = dict(mapped_columns)
+        for i, (pos, pedido, row_idx, csv_col, old, new) in enumerate(zip(
+                changes['Fila_CSV'].tolist(), changes['Pedido'].tolist(), changes['Fila'].tolist(),
+                changes['Campo'].tolist(), changes['Valor_Anterior'].tolist(), changes['Valor_Nuevo'].tolist())):
             try:
-                # Convertir la fecha a un objeto datetime
-                parsed_date = pd.to_datetime(value)
-                value = parsed_date  # Asignar el objeto datetime directamente
+                sheet.set(row_idx, excel_columns[csv_col], new, _number_format(csv_col, new))
             except Exception as e:
-                logging.warning(f"No se pudo formatear la fecha en columna {csv_col}: {str(e)}")
-        
-        target_cell.value = value
+                applied[i] = False
+                logging.warning(f"Error en columna {csv_col}, pedido {pedido}: {str(e)}")
+                continue
+            changes_by_row.setdefault(pos, []).append(f"{csv_col}: {old} -> {new}")
+        changes = changes[applied]
+        changes['Fila_CSV'] += offset
         
-        # Reaplicar el estilo original
-        target_cell._style = old_format
+        for pos, row_changes in changes_by_row.items():
+            pedido = csv_df['Pedido'].iat[pos]
+            result['updates'] += 1
+            result['updated_pedidos'].append(pedido)
+            logging.debug(f"Pedido {pedido}: {len(row_changes)} campos actualizados")
+            logging.debug("Cambios: " + ", ".join(row_changes))
+        return changes
 
-        # Aplicar formato numérico si es un número
-        if isinstance(value, (int, float)):
-            target_cell.number_format = numbers.FORMAT_NUMBER
+    def write_report(self, result):
+        """Guarda el reporte de un CSV aplicado y registra su resumen"""
+        csv_filename = result['csv_filename']
+        total_rows = result['total_rows']
+        matches = result['matches']
+        updates = result['updates']
+        no_matches = result['no_matches']
+        match_pedidos = result['match_pedidos']
+        updated_pedidos = result['updated_pedidos']
+        no_match_pedidos = result['no_match_pedidos']
         
-        # Aplicar formato de fecha si es una fecha
-        if csv_col == 'Fecha_Pedido' and pd.notna(value):
-            try:
-                target_cell.number_format = numbers.FORMAT_DATE_DDMMYYYY  # Formato de fecha en Excel
-            except Exception as e:
-                logging.warning(f"No se pudo aplicar el formato de fecha en columna {csv_col}: {str(e)}")
+        # Determinar el número máximo de filas necesarias
+        max_rows = max(len(match_pedidos), len(updated_pedidos), len(no_match_pedidos))
+        
+        # Crear el reporte con tres columnas y un solo encabezado
+        report_data = {
+            'Registros encontrados': match_pedidos + [''] * (max_rows - len(match_pedidos)),
+            'Registros actualizados': updated_pedidos + [''] * (max_rows - len(updated_pedidos)),
+            'Registros sin coincidencia': no_match_pedidos + [''] * (max_rows - len(no_match_pedidos))
+        }
+        report_df = pd.DataFrame(report_data)
+        
+        # Guardar el reporte con encabezados en negritas y formato numérico en las celdas
+        with pd.ExcelWriter(self.report_file, engine='openpyxl') as writer:
+            report_df.to_excel(writer, index=False, sheet_name='Reporte')
+            workbook = writer.book
+            worksheet = writer.sheets['Reporte']
+            
+            # Aplicar formato en negritas al encabezado
+            bold_font = Font(bold=True)
+            for col, header in enumerate(report_df.columns, 1):
+                cell = worksheet.cell(row=1, column=col)
+                cell.value = header
+                cell.font = bold_font
+            
+            # Aplicar formato numérico a las columnas específicas
+            numeric_columns = ['Registros encontrados', 'Registros actualizados', 'Registros sin coincidencia']
+            for col_idx, col_name in enumerate(report_df.columns, 1):
+                if col_name in numeric_columns:  # Solo aplica formato a las columnas numéricas
+                    for row_idx in range(2, len(report_df) + 2):  # Itera sobre las filas de datos (fila 2 en adelante)
+                        cell = worksheet.cell(row=row_idx, column=col_idx)
+                        try:
+                            # Intenta convertir el valor a número y aplica formato
+                            cell.value = float(cell.value) if cell.value else None
+                            cell.number_format = numbers.FORMAT_NUMBER  # Formato de número entero
+                        except ValueError:
+                            # Si no se puede convertir, deja la celda como está
+                            pass
+        
+        # Resumen en logs
+        logging.info(f"""
+        Resumen del proceso de merge CSV:
+        Archivo: {csv_filename}
+        - Total de registros: {total_rows}
+        - Registros encontrados: {matches}
+        - Registros actualizados: {updates}
+        - Registros sin coincidencia: {no_matches}
+        - Pedidos encontrados: {', '.join(match_pedidos)}
+        - Pedidos no encontrados: {', '.join(no_match_pedidos)}
+        
+        El reporte detallado se ha guardado en: {self.report_file}
+        """)
         
-        return True, f"{csv_col}: {current_value} -> {value}"
+        if self.export_changes:
+            self.write_changes(result)
+
+    def write_changes(self, result):
+        """Agrega las celdas modificadas por un CSV al registro de cambios"""
+        changes = result['changes'].drop(columns='Fila_CSV')
+        changes.insert(0, 'Archivo', result['csv_filename'])
+        changes.insert(0, 'Fecha_Merge', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        exists = os.path.exists(self.changes_file)
+        changes.to_csv(self.changes_file, mode='a', header=not exists, index=False, encoding='utf-8')
+        logging.info(f"{len(changes)} cambios agregados al registro: {self.changes_file}")
 
     def merge_csv_data(self, csv_file):
         try:
             # Crear backup antes de comenzar
             self.create_backup()
-            time.sleep(0.5)
-            
-            csv_filename = os.path.basename(csv_file)
-            logging.info(f"Procesando archivo: {csv_filename}")
             
-            # Leer el archivo CSV
-            csv_df = pd.read_csv(csv_file, encoding='utf-8')
-            csv_df['Pedido'] = csv_df['Pedido'].astype(str)
-            
-            # Leer el archivo concentrado
-            logging.info("Leyendo archivo concentrado...")
-            wb = load_workbook(self.concentrado_file)
-            ws = wb.active
-            concentrado_df = pd.read_excel(self.concentrado_file)
-            concentrado_df['ORDEN SEARS '] = concentrado_df['ORDEN SEARS '].astype(str)
-            
-            # Contadores y listas
-            updates = 0
-            no_matches = 0
-            matches = 0
-            no_match_pedidos = []
-            match_pedidos = []
-            updated_pedidos = []  # Nueva lista para pedidos con cambios reales
-            
-            # Procesar cada fila del CSV
-            for idx, row in csv_df.iterrows():
-                time.sleep(0.05)
-                pedido = str(row['Pedido'])
-                
-                # Buscar coincidencia
-                mask = concentrado_df['ORDEN SEARS '] == pedido
-                
-                if mask.any():
-                    excel_row_idx = mask.idxmax() + 2
-                    changes = []
-                    updates_in_row = 0
-                    
-                    # Verificar y actualizar cada campo
-                    for csv_col, excel_col in self.column_mapping.items():
-                        try:
-                            value = row[csv_col]
-                            if pd.notna(value):  # Solo procesar valores no nulos
-                                updated, change_msg = self.update_concentrado_cell(
-                                    wb, ws.title, excel_row_idx, excel_col, value, csv_col
-                                )
-                                if updated:
-                                    updates_in_row += 1
-                                    if change_msg:
-                                        changes.append(change_msg)
-                        except Exception as e:
-                            logging.warning(f"Error en columna {csv_col}, pedido {pedido}: {str(e)}")
-                    
-                    matches += 1
-                    match_pedidos.append(pedido)
-                    
-                    if updates_in_row > 0:
-                        updates += 1
-                        updated_pedidos.append(pedido)  # Agregar a lista de actualizados
-                        logging.info(f"Pedido {pedido}: {updates_in_row} campos actualizados")
-                        if changes:
-                            logging.info("Cambios: " + ", ".join(changes))
-                    
-                else:
-                    no_matches += 1
-                    no_match_pedidos.append(pedido)
-                    logging.warning(f"No se encontró coincidencia para el pedido: {pedido}")
+            sheet, order_index = self.load_concentrado()
+            result = self.apply_csv(csv_file, sheet, order_index)
             
             # Guardar archivo actualizado
             logging.info("Guardando archivo actualizado...")
-            wb.save(self.concentrado_file)
+            sheet.save()
             
-            # Determinar el número máximo de filas necesarias
-            max_rows = max(len(match_pedidos), len(updated_pedidos), len(no_match_pedidos))
+            self.write_report(result)
             
-            # Crear el reporte con tres columnas y un solo encabezado
-            report_data = {
-                'Registros encontrados': match_pedidos + [''] * (max_rows - len(match_pedidos)),
-                'Registros actualizados': updated_pedidos + [''] * (max_rows - len(updated_pedidos)),
-                'Registros sin coincidencia': no_match_pedidos + [''] * (max_rows - len(no_match_pedidos))
-            }
-            report_df = pd.DataFrame(report_data)
+        except Exception as e:
+            logging.error(f"Error durante el proceso de merge CSV: {str(e)}")
+            raise
+
+    def merge_csv_batch(self, csv_files):
+        """
+        Aplica varios CSV en el orden recibido con un solo respaldo, una sola carga y un solo
+        guardado del concentrado. Si un pedido aparece en varios CSV prevalece el último.
+        """
+        try:
+            # Crear backup antes de comenzar
+            self.create_backup()
             
-            # Guardar el reporte con encabezados en negritas y formato numérico en las celdas
-            with pd.ExcelWriter(self.report_file, engine='openpyxl') as writer:
-                report_df.to_excel(writer, index=False, sheet_name='Reporte')
-                workbook = writer.book
-                worksheet = writer.sheets['Reporte']
-                
-                # Aplicar formato en negritas al encabezado
-                bold_font = Font(bold=True)
-                for col, header in enumerate(report_df.columns, 1):
-                    cell = worksheet.cell(row=1, column=col)
-                    cell.value = header
-                    cell.font = bold_font
-                
-                # Aplicar formato numérico a las columnas específicas
-                numeric_columns = ['Registros encontrados', 'Registros actualizados', 'Registros sin coincidencia']
-                for col_idx, col_name in enumerate(report_df.columns, 1):
-                    if col_name in numeric_columns:  # Solo aplica formato a las columnas numéricas
-                        for row_idx in range(2, len(report_df) + 2):  # Itera sobre las filas de datos (fila 2 en adelante)
-                            cell = worksheet.cell(row=row_idx, column=col_idx)
-                            try:
-                                # Intenta convertir el valor a número y aplica formato
-                                cell.value = float(cell.value) if cell.value else None
-                                cell.number_format = numbers.FORMAT_NUMBER  # Formato de número entero
-                            except ValueError:
-                                # Si no se puede convertir, deja la celda como está
-                                pass
+            sheet, order_index = self.load_concentrado()
+            results = [self.apply_csv(csv_file, sheet, order_index) for csv_file in csv_files]
             
-            # Resumen en logs
-            logging.info(f"""
-            Resumen del proceso de merge CSV:
-            Archivo: {csv_filename}
-            - Total de registros: {len(csv_df)}
-            - Registros encontrados: {matches}
-            - Registros actualizados: {updates}
-            - Registros sin coincidencia: {no_matches}
-            - Pedidos encontrados: {', '.join(match_pedidos)}
-            - Pedidos no encontrados: {', '.join(no_match_pedidos)}
+            # Guardar archivo actualizado
+            logging.info(f"Guardando archivo actualizado ({len(csv_files)} CSV aplicados)...")
+            sheet.save()
             
-            El reporte detallado se ha guardado en: {self.report_file}
-            """)
+            # Reportes por archivo, igual que en el modo individual
+            for result in results:
+                self.write_report(result)
             
         except Exception as e:
             logging.error(f"Error durante el proceso de merge CSV: {str(e)}")
             raise
 
-    def process_all_csvs(self):
-        """Procesa todos los CSVs en la carpeta CSVreporte"""
+    def list_csvs(self):
+        """Rutas de los CSV de la carpeta CSVreporte en orden alfabético (crea la carpeta si no existe)"""
         if not os.path.exists(self.input_dir):
             os.makedirs(self.input_dir)
             logging.info(f"Carpeta {self.input_dir} creada")
-            return
+            return []
         
         csv_files = [f for f in os.listdir(self.input_dir) if f.endswith('.csv')]
         if not csv_files:
             logging.info("No se encontraron archivos CSV para procesar")
+        return [os.path.join(self.input_dir, csv_file) for csv_file in sorted(csv_files)]
+
+    def process_all_csvs(self, batch=True):
+        """
+        Procesa todos los CSVs en la carpeta CSVreporte. En modo lote el concentrado se abre
+        y se guarda una sola vez; si no, cada CSV tiene su propio respaldo, carga y guardado.
+        """
+        csv_paths = self.list_csvs()
+        if not csv_paths:
             return
         
-        for csv_file in sorted(csv_files):
-            file_path = os.path.join(self.input_dir, csv_file)
-            self.merge_csv_data(file_path)
-            time.sleep(1)  # Delay entre archivos
+        if batch:
+            self.merge_csv_batch(csv_paths)
+        else:
+            for file_path in csv_paths:
+                self.merge_csv_data(file_path)
 
 if __name__ == "__main__":
-    merger = SearsCsvMerger()
-    merger.process_all_csvs()
+    parser = argparse.ArgumentParser(description='Actualiza el concentrado con los reportes CSV de pedidos')
+    parser.add_argument('--pausa', type=float, default=0,
+                        help='Pausa en segundos por fila del CSV (por defecto sin pausas)')
+    parser.add_argument('--duplicados', choices=DUPLICATE_POLICIES, default='first',
+                        help='Pedidos repetidos en el concentrado: primera fila, todas, o reportar conflicto')
+    parser.add_argument('--por-archivo', action='store_true',
+                        help='Abrir y guardar el concentrado por cada CSV en lugar de una sola vez')
+    parser.add_argument('--respaldos', type=int, default=20,
+                        help='Respaldos recientes a conservar (además de uno diario y uno semanal)')
+    parser.add_argument('--comprimir-respaldos', action='store_true',
+                        help='Guardar los respaldos comprimidos con gzip')
+    parser.add_argument('--registro-cambios', action='store_true',
+                        help='Agregar las celdas modificadas a RESULTADOFINAL/cambios_merge_csv.csv')
+    parser.add_argument('--filas-por-bloque', type=int, default=50000,
+                        help='Filas del CSV que se leen y aplican a la vez')
+    parser.add_argument('--lector-csv', choices=CSV_ENGINES, default='pandas',
+                        help='pandas (predeterminado) o pyarrow (requiere instalar pyarrow)')
+    parser.add_argument('--motor-excel', choices=ENGINES, default='openpyxl',
+                        help='openpyxl carga el libro completo; xml solo reescribe las celdas modificadas; '
+                        'sqlite guarda el concentrado en EXCELPDFSEARS/concentrado.db y exporta el xlsx')
+    parser.add_argument('--sin-indice', action='store_true',
+                        help='Leer la columna de pedidos del concentrado sin usar el índice guardado')
+    parser.add_argument('--detalle', action='store_true',
+                        help='Registrar el detalle por pedido (nivel DEBUG)')
+    args = parser.parse_args()
+    if args.detalle:
+        enable_debug_logging()
+    backup_policy = BackupPolicy(keep_last=args.respaldos, compress=args.comprimir_respaldos)
+
+    merger = SearsCsvMerger(throttle=args.pausa, duplicate_policy=args.duplicados,
+                            backup_policy=backup_policy, engine=args.motor_excel,
+                            export_changes=args.registro_cambios, chunk_rows=args.filas_por_bloque,
+                            csv_engine=args.lector_csv, use_index=not args.sin_indice)
+    merger.process_all_csvs(batch=not args.por_archivo)
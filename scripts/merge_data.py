@@ -1,10 +1,13 @@
 import os
+import argparse
 import pandas as pd
 import logging
-from datetime import datetime
-from openpyxl import load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import Font, numbers
+from store import ExtractionStore
+from backups import BackupPolicy, create_backup
+from concentrado import DUPLICATE_POLICIES, load_concentrado, resolve_rows
+from xlsx_engine import ENGINES
+from metrics import enable_debug_logging
+from order_cache import OrderIndexCache
 
 # Configuración de logging
 logging.basicConfig(
@@ -17,167 +20,216 @@ logging.basicConfig(
 )
 
 class SearsMerger:
-    def __init__(self):
+    def __init__(self, duplicate_policy='first', backup_policy=None, engine='openpyxl', use_index=True):
         self.output_file = os.path.join('EXCELPDFSEARS', 'sears_extractions.xlsx')
+        self.store_file = os.path.join('EXCELPDFSEARS', 'sears_extractions.db')
         self.concentrado_file = os.path.join('RESULTADOFINAL', 'Concentrado Sears.xlsx')
         self.backup_dir = os.path.join('RESULTADOFINAL', 'backups')
+        # Retención (y compresión opcional) de los respaldos del concentrado
+        self.backup_policy = backup_policy or BackupPolicy()
         self.report_file = os.path.join('RESULTADOFINAL', 'reporte_merge.xlsx')
+        # Política ante pedidos repetidos en el concentrado (ver concentrado.DUPLICATE_POLICIES)
+        if duplicate_policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Política de duplicados no válida: {duplicate_policy}")
+        self.duplicate_policy = duplicate_policy
+        # Motor de actualización del concentrado (ver xlsx_engine.ENGINES)
+        if engine not in ENGINES:
+            raise ValueError(f"Motor de Excel no válido: {engine}")
+        self.engine = engine
+        # Índice persistente de pedidos del concentrado (ver order_cache.OrderIndexCache)
+        self.index_cache = OrderIndexCache(
+            os.path.join('EXCELPDFSEARS', 'concentrado_index.db')
+        ) if use_index else None
 
     def create_backup(self):
         """Crea una copia de respaldo del archivo concentrado antes de modificarlo"""
-        if not os.path.exists(self.backup_dir):
-            os.makedirs(self.backup_dir)
-            
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = os.path.join(self.backup_dir, f'Concentrado_Sears_backup_{timestamp}.xlsx')
-        
-        if os.path.exists(self.concentrado_file):
-            wb = load_workbook(self.concentrado_file)
-            wb.save(backup_file)
-            logging.info(f"Backup creado: {backup_file}")
+        return create_backup(self.concentrado_file, self.backup_dir, '', self.backup_policy)
 
     def process_duplicates(self, extractions_df):
         """Procesa los pedidos duplicados, sumando sus totales"""
         # Identificar duplicados
         duplicados = extractions_df[extractions_df.duplicated(['Numero_Pedido'], keep=False)]
         pedidos_duplicados = duplicados['Numero_Pedido'].unique()
+        if duplicados.empty:
+            return {}, pedidos_duplicados
         
-        # Diccionario para almacenar los resultados procesados
-        processed_data = {}
+        # Una sola agregación agrupada: suma de totales y documentos unidos por pedido
+        por_pedido = duplicados.groupby('Numero_Pedido', sort=False)
+        totales = por_pedido['Total'].sum()
+        # Texto por elemento: con pandas 3, astype(str) deja los nulos como NaN y el join falla
+        documentos = duplicados['Numero_Documento'].astype(object).map(str).groupby(
+            duplicados['Numero_Pedido'], sort=False
+        ).agg(', '.join)
         
-        for pedido in pedidos_duplicados:
-            registros = extractions_df[extractions_df['Numero_Pedido'] == pedido]
-            
-            # Sumar los totales
-            total_sumado = registros['Total'].sum()
-            
-            # Tomar los datos del primer registro
-            primer_registro = registros.iloc[0].to_dict()
-            
-            # Actualizar el total y agregar nota sobre la suma
-            primer_registro['Total'] = total_sumado
-            primer_registro['documentos_sumados'] = ', '.join(registros['Numero_Documento'].astype(str))
-            
-            # Guardar en el diccionario de procesados
-            processed_data[pedido] = primer_registro
-            
-            logging.info(f"""
+        # Tomar los datos del primer registro de cada pedido
+        primeros = duplicados.drop_duplicates('Numero_Pedido', keep='first').set_index('Numero_Pedido', drop=False)
+        primeros['Total'] = totales
+        primeros['documentos_sumados'] = documentos
+        
+        # Diccionario de procesados en el orden de aparición de los pedidos
+        processed_data = primeros.to_dict('index')
+        
+        # Detalle por pedido solo con nivel DEBUG (--detalle)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            for pedido, registro in processed_data.items():
+                logging.debug(f"""
             Pedido duplicado procesado: {pedido}
-            Documentos sumados: {primer_registro['documentos_sumados']}
-            Total sumado: {total_sumado}
+            Documentos sumados: {registro['documentos_sumados']}
+            Total sumado: {registro['Total']}
             """)
+        logging.info(f"Pedidos duplicados procesados: {len(processed_data)}")
         
         return processed_data, pedidos_duplicados
 
+    def update_row(self, sheet, column_mapping, row_idx, pedido, row, processed_duplicates):
+        """Escribe en una fila del concentrado los datos de un pedido extraído"""
+        if pedido in processed_duplicates:
+            datos = processed_duplicates[pedido]
+            # Actualizar campos usando el mapeo de columnas
+            sheet.set(row_idx, column_mapping['Total'], datos['Total'])
+            sheet.set(row_idx, column_mapping['OBSERVACIONES '], f"SUMA DE PRODUCTOS - Documentos: {datos['documentos_sumados']}")
+            
+            # Formatear fechas si existen
+            if 'Fecha_Pedido' in datos and pd.notna(datos['Fecha_Pedido']):
+                sheet.set(row_idx, column_mapping['Fecha_Pedido'], datos['Fecha_Pedido'], "dd/mm/yyyy")
+            if 'Fecha_Vencimiento' in datos and pd.notna(datos['Fecha_Vencimiento']):
+                sheet.set(row_idx, column_mapping['Fecha_Vencimiento'], datos['Fecha_Vencimiento'], "dd/mm/yyyy")
+            
+            logging.debug(f"""
+            Actualizado pedido duplicado: {pedido}
+            Total sumado: {datos['Total']}
+            Documentos: {datos['documentos_sumados']}
+            """)
+        else:
+            # Actualizar campos usando el mapeo de columnas
+            sheet.set(row_idx, column_mapping['Total'], row['Total'])
+            if pd.notna(row['Fecha_Pedido']):
+                sheet.set(row_idx, column_mapping['Fecha_Pedido'], row['Fecha_Pedido'], "dd/mm/yyyy")
+            if pd.notna(row['Fecha_Vencimiento']):
+                sheet.set(row_idx, column_mapping['Fecha_Vencimiento'], row['Fecha_Vencimiento'], "dd/mm/yyyy")
+            sheet.set(row_idx, column_mapping['Numero_Documento'], int(row['Numero_Documento']) if pd.notna(row['Numero_Documento']) else None)
+            sheet.set(row_idx, column_mapping['Tipo_Docto'], row['Tipo_Docto'])
+            sheet.set(row_idx, column_mapping['Descripcion'], row['Descripcion'])
+            sheet.set(row_idx, column_mapping['Cheque'], row['Cheque'])
+            sheet.set(row_idx, column_mapping['Proveedor'], row['Proveedor'])
+
+    def load_extractions(self):
+        """Lee las extracciones del almacén (o del Excel si aún no existe el almacén)"""
+        if os.path.exists(self.store_file):
+            logging.info("Leyendo almacén de extracciones...")
+            store = ExtractionStore(self.store_file)
+            extractions_df = store.load()
+            store.close()
+        else:
+            logging.info("Leyendo archivo de extracciones...")
+            extractions_df = pd.read_excel(self.output_file)
+        return extractions_df
+
+    def apply_extractions(self, extractions_df, sheet, order_index):
+        """
+        Aplica las extracciones sobre la hoja del concentrado ya cargada (ver xlsx_engine).
+        Devuelve los contadores del proceso para el resumen.
+        """
+        extractions_df = extractions_df.copy()
+        
+        # Convertir columnas de fecha a datetime
+        date_columns = ['Fecha_Pedido', 'Fecha_Vencimiento']
+        for col in date_columns:
+            if col in extractions_df.columns and not pd.api.types.is_datetime64_any_dtype(extractions_df[col]):
+                extractions_df[col] = pd.to_datetime(extractions_df[col], errors='coerce')  # Convertir a datetime
+        
+        # Asegurar tipos de datos correctos
+        extractions_df['Numero_Pedido'] = extractions_df['Numero_Pedido'].astype(str)
+        
+        # Procesar duplicados
+        processed_duplicates, pedidos_duplicados = self.process_duplicates(extractions_df)
+        pedidos_duplicados = set(pedidos_duplicados)
+        
+        # Contador para seguimiento
+        updates = 0
+        no_matches = 0
+        conflicts = 0
+        
+        # Obtener el mapeo de columnas por nombre
+        column_mapping = sheet.header_map()  # Mapeo de nombres a índices
+        
+        # Iterar sobre las filas del archivo de extracciones
+        for idx, row in extractions_df.iterrows():
+            pedido = row['Numero_Pedido']
+            
+            # Si es un duplicado y ya lo procesamos, saltarlo
+            if pedido in pedidos_duplicados and pedido not in processed_duplicates:
+                continue
+            
+            # Buscar coincidencia en el índice del concentrado
+            target_rows = resolve_rows(order_index, pedido, self.duplicate_policy)
+            if target_rows is None:
+                conflicts += 1
+                logging.warning(f"Pedido {pedido} repetido en las filas {order_index[pedido]} del concentrado; no se actualiza")
+            elif target_rows:
+                for row_idx in target_rows:
+                    self.update_row(sheet, column_mapping, row_idx, pedido, row, processed_duplicates)
+                updates += 1
+            else:
+                no_matches += 1
+                logging.warning(f"No se encontró coincidencia para el pedido: {pedido}")
+        
+        return {
+            'total_rows': len(extractions_df),
+            'updates': updates,
+            'no_matches': no_matches,
+            'conflicts': conflicts,
+        }
+
+    def log_summary(self, result):
+        """Registra el resumen del proceso de merge"""
+        logging.info(f"""
+        Resumen del proceso de merge:
+        - Total de registros procesados: {result['total_rows']}
+        - Registros actualizados: {result['updates']}
+        - Registros sin coincidencia: {result['no_matches']}
+        - Registros en conflicto (pedido repetido en el concentrado): {result['conflicts']}
+        """)
+
     def merge_data(self):
         try:
             # Crear backup antes de comenzar
             self.create_backup()
             
-            # Leer el archivo de extracciones
-            logging.info("Leyendo archivo de extracciones...")
-            extractions_df = pd.read_excel(self.output_file)
-            
-            # Convertir columnas de fecha a datetime
-            date_columns = ['Fecha_Pedido', 'Fecha_Vencimiento']
-            for col in date_columns:
-                if col in extractions_df.columns:
-                    extractions_df[col] = pd.to_datetime(extractions_df[col], errors='coerce')  # Convertir a datetime
-            
-            # Leer el archivo concentrado
-            logging.info("Leyendo archivo concentrado...")
-            concentrado_df = pd.read_excel(self.concentrado_file)
-            
-            # Asegurar tipos de datos correctos
-            extractions_df['Numero_Pedido'] = extractions_df['Numero_Pedido'].astype(str)
-            concentrado_df['ORDEN SEARS '] = concentrado_df['ORDEN SEARS '].astype(str)
-            
-            # Procesar duplicados
-            processed_duplicates, pedidos_duplicados = self.process_duplicates(extractions_df)
-            
-            # Contador para seguimiento
-            updates = 0
-            no_matches = 0
-            
-            # Cargar el archivo existente con openpyxl
-            wb = load_workbook(self.concentrado_file)
-            ws = wb.active
-            
-            # Obtener el mapeo de columnas por nombre
-            column_mapping = {cell.value: idx + 1 for idx, cell in enumerate(ws[1])}  # Mapeo de nombres a índices
-            
-            # Iterar sobre las filas del archivo de extracciones
-            for idx, row in extractions_df.iterrows():
-                pedido = row['Numero_Pedido']
-                
-                # Si es un duplicado y ya lo procesamos, saltarlo
-                if pedido in pedidos_duplicados and pedido not in processed_duplicates:
-                    continue
-                
-                # Buscar coincidencia en el archivo concentrado
-                mask = concentrado_df['ORDEN SEARS '] == pedido
-                if mask.any():
-                    # Encontrar la fila correspondiente
-                    row_idx = mask.idxmax() + 2  # +2 porque Excel usa 1-based indexing y tiene encabezado
-                    
-                    if pedido in processed_duplicates:
-                        datos = processed_duplicates[pedido]
-                        # Actualizar campos usando el mapeo de columnas
-                        ws.cell(row=row_idx, column=column_mapping['Total']).value = datos['Total']
-                        ws.cell(row=row_idx, column=column_mapping['OBSERVACIONES ']).value = (
-                            f"SUMA DE PRODUCTOS - Documentos: {datos['documentos_sumados']}"
-                        )
-                        
-                        # Formatear fechas si existen
-                        if 'Fecha_Pedido' in datos and pd.notna(datos['Fecha_Pedido']):
-                            ws.cell(row=row_idx, column=column_mapping['Fecha_Pedido']).value = datos['Fecha_Pedido']
-                            ws.cell(row=row_idx, column=column_mapping['Fecha_Pedido']).number_format = "dd/mm/yyyy"
-                        if 'Fecha_Vencimiento' in datos and pd.notna(datos['Fecha_Vencimiento']):
-                            ws.cell(row=row_idx, column=column_mapping['Fecha_Vencimiento']).value = datos['Fecha_Vencimiento']
-                            ws.cell(row=row_idx, column=column_mapping['Fecha_Vencimiento']).number_format = "dd/mm/yyyy"
-                        
-                        updates += 1
-                        logging.info(f"""
-                        Actualizado pedido duplicado: {pedido}
-                        Total sumado: {datos['Total']}
-                        Documentos: {datos['documentos_sumados']}
-                        """)
-                    else:
-                        # Actualizar campos usando el mapeo de columnas
-                        ws.cell(row=row_idx, column=column_mapping['Total']).value = row['Total']
-                        if pd.notna(row['Fecha_Pedido']):
-                            ws.cell(row=row_idx, column=column_mapping['Fecha_Pedido']).value = row['Fecha_Pedido']
-                            ws.cell(row=row_idx, column=column_mapping['Fecha_Pedido']).number_format = "dd/mm/yyyy"
-                        if pd.notna(row['Fecha_Vencimiento']):
-                            ws.cell(row=row_idx, column=column_mapping['Fecha_Vencimiento']).value = row['Fecha_Vencimiento']
-                            ws.cell(row=row_idx, column=column_mapping['Fecha_Vencimiento']).number_format = "dd/mm/yyyy"
-                        ws.cell(row=row_idx, column=column_mapping['Numero_Documento']).value = int(row['Numero_Documento']) if pd.notna(row['Numero_Documento']) else None
-                        ws.cell(row=row_idx, column=column_mapping['Tipo_Docto']).value = row['Tipo_Docto']
-                        ws.cell(row=row_idx, column=column_mapping['Descripcion']).value = row['Descripcion']
-                        ws.cell(row=row_idx, column=column_mapping['Cheque']).value = row['Cheque']
-                        ws.cell(row=row_idx, column=column_mapping['Proveedor']).value = row['Proveedor']
-                        
-                        updates += 1
-                else:
-                    no_matches += 1
-                    logging.warning(f"No se encontró coincidencia para el pedido: {pedido}")
+            extractions_df = self.load_extractions()
+            sheet, order_index = load_concentrado(self.concentrado_file, self.engine, self.index_cache)
+            result = self.apply_extractions(extractions_df, sheet, order_index)
             
             # Guardar el archivo actualizado
             logging.info("Guardando archivo actualizado...")
-            wb.save(self.concentrado_file)
+            sheet.save()
             
-            # Resumen del proceso
-            logging.info(f"""
-            Resumen del proceso de merge:
-            - Total de registros procesados: {len(extractions_df)}
-            - Registros actualizados: {updates}
-            - Registros sin coincidencia: {no_matches}
-            """)
+            self.log_summary(result)
             logging.info("Proceso de merge completado exitosamente")
         except Exception as e:
             logging.error(f"Error durante el proceso de merge: {str(e)}")
             raise
 
 if __name__ == "__main__":
-    merger = SearsMerger()
+    parser = argparse.ArgumentParser(description='Actualiza el concentrado con los pedidos extraídos de los PDFs')
+    parser.add_argument('--duplicados', choices=DUPLICATE_POLICIES, default='first',
+                        help='Pedidos repetidos en el concentrado: primera fila, todas, o reportar conflicto')
+    parser.add_argument('--respaldos', type=int, default=20,
+                        help='Respaldos recientes a conservar (además de uno diario y uno semanal)')
+    parser.add_argument('--comprimir-respaldos', action='store_true',
+                        help='Guardar los respaldos comprimidos con gzip')
+    parser.add_argument('--motor-excel', choices=ENGINES, default='openpyxl',
+                        help='openpyxl carga el libro completo; xml solo reescribe las celdas modificadas; '
+                        'sqlite guarda el concentrado en EXCELPDFSEARS/concentrado.db y exporta el xlsx')
+    parser.add_argument('--sin-indice', action='store_true',
+                        help='Leer la columna de pedidos del concentrado sin usar el índice guardado')
+    parser.add_argument('--detalle', action='store_true',
+                        help='Registrar el detalle por pedido (nivel DEBUG)')
+    args = parser.parse_args()
+    if args.detalle:
+        enable_debug_logging()
+    backup_policy = BackupPolicy(keep_last=args.respaldos, compress=args.comprimir_respaldos)
+
+    merger = SearsMerger(duplicate_policy=args.duplicados, backup_policy=backup_policy, engine=args.motor_excel,
+                         use_index=not args.sin_indice)
     merger.merge_data()
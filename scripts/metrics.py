@@ -0,0 +1,186 @@
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import importlib.util
+from datetime import datetime
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Perfiladores opcionales para una ejecución: 'cprofile' (biblioteca estándar) o 'pyinstrument'
+PROFILERS = ('cprofile', 'pyinstrument')
+
+# Carpeta de los reportes de ejecución (junto a los logs)
+METRICS_DIR = os.path.join('logs', 'metricas')
+
+# Bibliotecas cuyo nivel DEBUG es demasiado verboso (pdfminer registra cada operador del PDF)
+QUIET_LOGGERS = ('pdfminer', 'pdfplumber', 'PIL')
+
+
+def enable_debug_logging():
+    """Activa el detalle por página y por pedido (nivel DEBUG) sin el de las bibliotecas"""
+    logging.getLogger().setLevel(logging.DEBUG)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.INFO)
+
+
+def peak_rss_mb(children=False):
+    """
+    Memoria residente máxima en MB del proceso (o de sus procesos hijos ya terminados, como los
+    del pool de extracción). None si la plataforma no tiene el módulo resource (Windows).
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss / divisor, 1)
+
+
+class RunMetrics:
+    """
+    Métricas de una ejecución: segundos por etapa, por PDF y por página, contadores (filas,
+    páginas, celdas actualizadas) y memoria máxima. write() guarda el reporte completo en JSON
+    y los tiempos en CSV dentro de logs/metricas, y agrega el resumen a logs/metricas/ejecuciones.csv.
+    """
+
+    def __init__(self, process):
+        self.process = process
+        self.started = datetime.now()
+        # Segundos por etapa, en el orden de ejecución
+        self.stages = {}
+        # [{'archivo', 'paginas', 'filas', 'segundos'}] por PDF extraído
+        self.pdfs = []
+        # [{'archivo', 'pagina', 'filas', 'segundos'}] por página leída
+        self.pages = []
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Mide y registra la duración de una etapa"""
+        logging.info(f"Etapa {name}...")
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - inicio
+            logging.info(f"Etapa {name} terminada en {self.stages[name]:.2f} s")
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_page(self, archivo, pagina, filas, segundos):
+        self.pages.append({'archivo': archivo, 'pagina': pagina, 'filas': filas, 'segundos': segundos})
+
+    def add_pdf(self, archivo, paginas, filas, segundos):
+        self.pdfs.append({'archivo': archivo, 'paginas': paginas, 'filas': filas, 'segundos': segundos})
+        self.count('pdfs')
+        self.count('paginas', paginas)
+        self.count('filas_extraidas', filas)
+
+    def report(self):
+        """Reporte completo de la ejecución como diccionario serializable a JSON"""
+        return {
+            'proceso': self.process,
+            'inicio': self.started.isoformat(timespec='seconds'),
+            'fin': datetime.now().isoformat(timespec='seconds'),
+            'etapas': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            'total_segundos': round(sum(self.stages.values()), 4),
+            'contadores': dict(self.counters),
+            'memoria_max_mb': peak_rss_mb(),
+            'memoria_max_hijos_mb': peak_rss_mb(children=True),
+            'pdfs': [dict(pdf, segundos=round(pdf['segundos'], 4)) for pdf in self.pdfs],
+            'paginas': [dict(page, segundos=round(page['segundos'], 4)) for page in self.pages],
+        }
+
+    def write(self, output_dir=METRICS_DIR):
+        """
+        Guarda <proceso>_<fecha>.json (reporte completo) y <proceso>_<fecha>.csv (una fila por
+        etapa, PDF y página) y agrega una fila de resumen a ejecuciones.csv. Devuelve la ruta del JSON.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        report = self.report()
+        base = os.path.join(output_dir, f"{self.process}_{self.started.strftime('%Y%m%d_%H%M%S')}")
+
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        with open(base + '.csv', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Tipo', 'Nombre', 'Pagina', 'Paginas', 'Filas', 'Segundos'])
+            for name, seconds in report['etapas'].items():
+                writer.writerow(['etapa', name, '', '', '', seconds])
+            for pdf in report['pdfs']:
+                writer.writerow(['pdf', pdf['archivo'], '', pdf['paginas'], pdf['filas'], pdf['segundos']])
+            for page in report['paginas']:
+                writer.writerow(['pagina', page['archivo'], page['pagina'], '', page['filas'], page['segundos']])
+
+        # Resumen acumulado: una fila por ejecución para comparar noches entre sí
+        summary_file = os.path.join(output_dir, 'ejecuciones.csv')
+        summary = {
+            'Inicio': report['inicio'],
+            'Proceso': self.process,
+            'Total_Segundos': report['total_segundos'],
+            'Memoria_Max_MB': report['memoria_max_mb'],
+            'Memoria_Max_Hijos_MB': report['memoria_max_hijos_mb'],
+            'Etapas': json.dumps(report['etapas'], ensure_ascii=False),
+            'Contadores': json.dumps(report['contadores'], ensure_ascii=False),
+        }
+        exists = os.path.exists(summary_file)
+        with open(summary_file, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(summary))
+            if not exists:
+                writer.writeheader()
+            writer.writerow(summary)
+
+        logging.info(f"Reporte de métricas guardado en: {base}.json")
+        return base + '.json'
+
+
+def check_profiler(profiler):
+    """Valida el perfilador antes de empezar (pyinstrument es opcional)"""
+    if profiler not in PROFILERS:
+        raise ValueError(f"Perfilador no válido: {profiler}")
+    if profiler == 'pyinstrument' and importlib.util.find_spec('pyinstrument') is None:
+        raise ImportError("El perfilador 'pyinstrument' requiere instalar pyinstrument")
+
+
+@contextmanager
+def profiling(profiler, name, output_dir=METRICS_DIR):
+    """
+    Perfila el bloque si se indica un perfilador: cprofile guarda <name>_<fecha>.prof (se abre
+    con pstats o snakeviz) y pyinstrument guarda <name>_<fecha>.html. Con None no hace nada.
+    """
+    if profiler is None:
+        yield
+        return
+    check_profiler(profiler)
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    if profiler == 'cprofile':
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(base + '.prof')
+            logging.info(f"Perfil de la ejecución guardado en: {base}.prof")
+    else:
+        from pyinstrument import Profiler
+        profile = Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            with open(base + '.html', 'w', encoding='utf-8') as f:
+                f.write(profile.output_html())
+            logging.info(f"Perfil de la ejecución guardado en: {base}.html")
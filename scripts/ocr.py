@@ -0,0 +1,136 @@
+import os
+import io
+import time
+import shutil
+import sqlite3
+import logging
+import subprocess
+from datetime import datetime
+from concurrent.futures import Future, ProcessPoolExecutor
+import pdfplumber
+
+# Programa de OCR local (debe estar en el PATH) y el idioma de los estados de cuenta
+TESSERACT = 'tesseract'
+OCR_LANG = 'spa'
+# Resolución (DPI) con la que se rasteriza la página antes del OCR
+OCR_RESOLUTION = 300
+# Caché de textos por hash de contenido de página (ver pdf_backends.page_content_hash)
+OCR_CACHE = os.path.join('EXCELPDFSEARS', 'ocr_cache.db')
+
+
+def check_ocr():
+    """Valida antes de empezar que tesseract esté instalado (el OCR es opcional)"""
+    if shutil.which(TESSERACT) is None:
+        raise RuntimeError(f"El OCR de páginas escaneadas requiere instalar tesseract (idioma '{OCR_LANG}')")
+
+
+def ocr_page(pdf_path, page_num, lang=OCR_LANG, resolution=OCR_RESOLUTION):
+    """
+    Tarea del pool de OCR: rasteriza la página con pdfplumber (pypdfium2), la pasa a escala de
+    grises con Pillow y la lee con tesseract como un bloque de texto (los renglones se conservan).
+    Devuelve (texto, segundos).
+    """
+    inicio = time.perf_counter()
+    with pdfplumber.open(pdf_path) as pdf:
+        image = pdf.pages[page_num].to_image(resolution=resolution).original.convert('L')
+    png = io.BytesIO()
+    image.save(png, format='PNG')
+    salida = subprocess.run(
+        [TESSERACT, 'stdin', 'stdout', '-l', lang, '--psm', '6'],
+        input=png.getvalue(), capture_output=True, check=True
+    )
+    return salida.stdout.decode('utf-8', errors='replace').strip(), time.perf_counter() - inicio
+
+
+class OcrCache:
+    """Textos de OCR ya obtenidos, por hash de contenido de la página (SQLite)"""
+
+    def __init__(self, db_path=OCR_CACHE):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS paginas (
+                sha256 TEXT PRIMARY KEY,
+                texto TEXT NOT NULL,
+                segundos REAL NOT NULL,
+                fecha TEXT NOT NULL
+            )
+        """)
+
+    def get(self, key):
+        registro = self.conn.execute("SELECT texto FROM paginas WHERE sha256 = ?", (key,)).fetchone()
+        return registro[0] if registro else None
+
+    def put(self, key, texto, segundos):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO paginas (sha256, texto, segundos, fecha) VALUES (?, ?, ?, ?)",
+                (key, texto, segundos, datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class PageOcr:
+    """
+    OCR de las páginas sin texto extraíble. submit() programa una página y devuelve de
+    inmediato: con workers > 0 el OCR corre en un pool de procesos propio (creado al primer uso)
+    mientras la extracción sigue con las páginas de texto; con workers = 0 corre en el mismo
+    proceso (dentro de las tareas de la extracción en paralelo). Las páginas ya leídas se toman
+    de la caché sin rasterizar.
+    """
+
+    def __init__(self, workers=1, lang=OCR_LANG, resolution=OCR_RESOLUTION, cache_path=OCR_CACHE):
+        check_ocr()
+        self.workers = workers
+        self.lang = lang
+        self.resolution = resolution
+        self.cache = OcrCache(cache_path)
+        self.executor = None
+
+    def submit(self, pdf_path, page_num, key):
+        """Programa el OCR de una página; devuelve (key, Future con (texto, segundos), de_cache)"""
+        texto = self.cache.get(key)
+        if texto is not None:
+            future = Future()
+            future.set_result((texto, 0.0))
+            return key, future, True
+        if self.workers > 0:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            return key, self.executor.submit(ocr_page, pdf_path, page_num, self.lang, self.resolution), False
+        future = Future()
+        try:
+            future.set_result(ocr_page(pdf_path, page_num, self.lang, self.resolution))
+        except Exception as e:
+            future.set_exception(e)
+        return key, future, False
+
+    def result(self, pending):
+        """
+        Espera el OCR programado con submit() y devuelve (texto, segundos, de_cache). Los textos
+        nuevos se guardan en la caché; si el OCR falla se registra y la página queda sin texto.
+        """
+        key, future, de_cache = pending
+        try:
+            texto, segundos = future.result()
+        except subprocess.CalledProcessError as e:
+            logging.error(f"Error en el OCR de la página: {e.stderr.decode('utf-8', errors='replace').strip()}")
+            return '', 0.0, False
+        except Exception as e:
+            logging.error(f"Error en el OCR de la página: {str(e)}")
+            return '', 0.0, False
+        if not de_cache:
+            self.cache.put(key, texto, segundos)
+        return texto, segundos, de_cache
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.cache.close()
+
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import logging
+from manifest import ExtractionManifest
+
+
+def file_fingerprint(path, registro=None):
+    """
+    (tamaño, mtime_ns, sha256) del archivo. Si el tamaño y la fecha coinciden con el registro
+    (tamaño, mtime_ns, sha256) guardado no se vuelve a calcular el hash.
+    """
+    stat = os.stat(path)
+    if registro and registro[0] == stat.st_size and registro[1] == stat.st_mtime_ns:
+        return stat.st_size, stat.st_mtime_ns, registro[2]
+    return stat.st_size, stat.st_mtime_ns, ExtractionManifest.file_hash(path)
+
+
+class OrderIndexCache:
+    """
+    Índice persistente pedido -> filas de Excel del concentrado (SQLite), para no leer la
+    columna 'ORDEN SEARS ' del libro en cada ejecución. Cada libro se identifica por ruta,
+    tamaño, fecha de modificación y hash de contenido; el índice se reconstruye solo si el
+    archivo cambió fuera del proceso. Tras un guardado propio (que no toca la columna de
+    pedidos) basta con actualizar la huella.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS libros (
+                ruta TEXT PRIMARY KEY,
+                tamano INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pedidos (
+                ruta TEXT NOT NULL,
+                pedido TEXT,
+                fila INTEGER NOT NULL,
+                PRIMARY KEY (ruta, fila)
+            );
+        """)
+
+    def _record(self, path):
+        return self.conn.execute(
+            "SELECT tamano, mtime_ns, sha256 FROM libros WHERE ruta = ?", (path,)
+        ).fetchone()
+
+    def load(self, path):
+        """Devuelve el índice {pedido: [filas]} guardado si el libro no cambió; None si hay que reconstruirlo"""
+        registro = self._record(path)
+        if registro is None:
+            return None
+        huella = file_fingerprint(path, registro)
+        if huella[2] != registro[2]:
+            logging.info("El concentrado cambió desde la última ejecución; se reconstruye el índice de pedidos")
+            return None
+        if huella != tuple(registro):
+            # Mismo contenido con otra fecha (p. ej. copiado de nuevo): solo actualizar la huella
+            self._save_fingerprint(path, huella)
+        index = {}
+        for pedido, fila in self.conn.execute(
+                "SELECT pedido, fila FROM pedidos WHERE ruta = ? ORDER BY fila", (path,)):
+            index.setdefault(pedido, []).append(fila)
+        logging.info(f"Índice de pedidos leído de {self.db_path} ({len(index)} pedidos)")
+        return index
+
+    def save(self, path, index):
+        """Guarda el índice completo del libro con su huella actual"""
+        with self.conn:
+            self.conn.execute("DELETE FROM pedidos WHERE ruta = ?", (path,))
+            self.conn.executemany(
+                "INSERT INTO pedidos (ruta, pedido, fila) VALUES (?, ?, ?)",
+                ((path, pedido, fila) for pedido, filas in index.items() for fila in filas)
+            )
+            self._save_fingerprint(path, file_fingerprint(path), commit=False)
+
+    def _save_fingerprint(self, path, huella, commit=True):
+        sql = "INSERT OR REPLACE INTO libros (ruta, tamano, mtime_ns, sha256) VALUES (?, ?, ?, ?)"
+        if commit:
+            with self.conn:
+                self.conn.execute(sql, (path, *huella))
+        else:
+            self.conn.execute(sql, (path, *huella))
+
+    def invalidate(self, path):
+        with self.conn:
+            self.conn.execute("DELETE FROM libros WHERE ruta = ?", (path,))
+            self.conn.execute("DELETE FROM pedidos WHERE ruta = ?", (path,))
+
+    def after_save(self, path, sheet, order_col):
+        """
+        Llamado después de guardar la hoja en path: si no se escribió la columna de pedidos el
+        índice sigue siendo válido y solo se actualiza la huella; si se escribió, se descarta.
+        """
+        if order_col in sheet.written_columns:
+            self.invalidate(path)
+        elif self._record(path) is not None:
+            self._save_fingerprint(path, file_fingerprint(path))
+
+    def close(self):
+        self.conn.close()
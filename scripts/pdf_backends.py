@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import pdfplumber
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LTChar
+from pdfminer.pdftypes import PDFStream, resolve1
+
+# Tolerancias (en puntos) con las que pdfplumber agrupa caracteres en palabras y líneas
+X_TOLERANCE = 3
+Y_TOLERANCE = 3
+
+
+class PdfplumberDocument:
+    """Backend de referencia: texto de página con pdfplumber.Page.extract_text()"""
+
+    name = 'pdfplumber'
+
+    def __init__(self, pdf_path):
+        self.pdf = pdfplumber.open(pdf_path)
+        self.num_pages = len(self.pdf.pages)
+
+    def page_text(self, page_num):
+        page = self.pdf.pages[page_num]
+        try:
+            return page.extract_text()
+        finally:
+            # Liberar los caracteres y objetos de layout que pdfplumber guarda por página
+            getattr(page, 'close', page.flush_cache)()
+
+    def page_hash(self, page_num):
+        return page_content_hash(self.pdf.pages[page_num].page_obj)
+
+    def close(self):
+        self.pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PdfminerDocument:
+    """
+    Backend ligero: interpreta la página con pdfminer sin análisis de layout (LAParams=None)
+    y arma las líneas directamente desde los LTChar con las mismas tolerancias que pdfplumber,
+    sin construir sus objetos de caracteres. Si una página no devuelve texto o falla, se usa
+    pdfplumber para esa página.
+    """
+
+    name = 'pdfminer'
+
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self.file = open(pdf_path, 'rb')
+        try:
+            self.pages = list(PDFPage.create_pages(PDFDocument(PDFParser(self.file))))
+        except Exception:
+            self.file.close()
+            raise
+        self.num_pages = len(self.pages)
+        resources = PDFResourceManager(caching=True)
+        self.device = PDFPageAggregator(resources, laparams=None)
+        self.interpreter = PDFPageInterpreter(resources, self.device)
+        self.fallback = None
+
+    def page_text(self, page_num):
+        try:
+            self.interpreter.process_page(self.pages[page_num])
+            text = chars_to_text(self.device.get_result())
+        except Exception as e:
+            logging.warning(f"pdfminer no pudo leer la página {page_num+1} de {self.pdf_path}: {str(e)}")
+            text = ''
+        if text:
+            return text
+        if self.fallback is None:
+            self.fallback = PdfplumberDocument(self.pdf_path)
+        return self.fallback.page_text(page_num)
+
+    def page_hash(self, page_num):
+        return page_content_hash(self.pages[page_num])
+
+    def close(self):
+        self.file.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def chars_to_text(layout, x_tolerance=X_TOLERANCE, y_tolerance=Y_TOLERANCE):
+    """
+    Reproduce pdfplumber.extract_text() sobre los LTChar de una página: agrupa en líneas por
+    la coordenada superior, ordena cada línea por x y separa palabras en los espacios y en
+    huecos mayores a x_tolerance. Las líneas sin palabras se omiten.
+    """
+    chars = [obj for obj in layout if isinstance(obj, LTChar)]
+    chars.sort(key=lambda c: -c.y1)
+
+    lines = []
+    current = []
+    last_top = None
+    for char in chars:
+        top = -char.y1
+        if last_top is not None and top - last_top > y_tolerance:
+            lines.append(current)
+            current = []
+        current.append(char)
+        last_top = top
+    if current:
+        lines.append(current)
+
+    text_lines = []
+    for line in lines:
+        line.sort(key=lambda c: c.x0)
+        words = []
+        word = []
+        previous = None
+        for char in line:
+            text = char.get_text()
+            if text.isspace():
+                if word:
+                    words.append(''.join(word))
+                    word = []
+                previous = None
+                continue
+            if word and char.x0 > previous.x1 + x_tolerance:
+                words.append(''.join(word))
+                word = []
+            word.append(text)
+            previous = char
+        if word:
+            words.append(''.join(word))
+        if words:
+            text_lines.append(' '.join(words))
+    return '\n'.join(text_lines)
+
+
+def _stream_bytes(stream):
+    """Bytes del flujo tal como están en el archivo (sin descomprimir si aún no se leyó)"""
+    raw = stream.get_rawdata()
+    return raw if raw is not None else stream.get_data()
+
+
+def page_content_hash(page):
+    """
+    sha256 del contenido de una página de pdfminer: tamaño, rotación, flujos de contenido e
+    imágenes o formularios (XObject) que dibuja. Una página escaneada da el mismo hash aunque
+    se vuelva a recibir en otro archivo.
+    """
+    digest = hashlib.sha256(repr((page.mediabox, page.rotate)).encode())
+    for content in page.contents:
+        stream = resolve1(content)
+        if isinstance(stream, PDFStream):
+            digest.update(_stream_bytes(stream))
+    xobjects = resolve1((page.resources or {}).get('XObject')) or {}
+    for name in sorted(xobjects):
+        stream = resolve1(xobjects[name])
+        if isinstance(stream, PDFStream):
+            digest.update(str(name).encode())
+            digest.update(_stream_bytes(stream))
+    return digest.hexdigest()
+
+
+# Backends disponibles para SearsExtractor; pdfplumber es el predeterminado
+BACKENDS = {
+    'pdfplumber': PdfplumberDocument,
+    'pdfminer': PdfminerDocument,
+}
+
+
+def open_pdf(pdf_path, backend='pdfplumber'):
+    """Abre un PDF con el backend indicado; el resultado expone num_pages, page_text(n) y page_hash(n)"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de PDF no válido: {backend}")
+    return BACKENDS[backend](pdf_path)
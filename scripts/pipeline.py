@@ -0,0 +1,188 @@
+import os
+import logging
+import argparse
+
+# Configuración de logging (antes de importar los demás scripts, que configuran su propio archivo)
+os.makedirs('logs', exist_ok=True)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(os.path.join('logs', 'pipeline.log')),
+        logging.StreamHandler()
+    ]
+)
+
+from extract import SearsExtractor
+from merge_data import SearsMerger
+from merge_csv_data import SearsCsvMerger
+from backups import BackupPolicy, create_backup
+from concentrado import DUPLICATE_POLICIES, load_concentrado
+from pdf_backends import BACKENDS
+from xlsx_engine import ENGINES
+from csv_reader import CSV_ENGINES
+from metrics import PROFILERS, RunMetrics, check_profiler, enable_debug_logging, peak_rss_mb, profiling
+
+
+class SearsPipeline:
+    """
+    Proceso completo en un solo intérprete: extracción de PDFs, merge de extracciones y
+    merge de reportes CSV. Las extracciones y el concentrado se pasan en memoria entre etapas:
+    el concentrado se respalda, se carga y se guarda una sola vez.
+    """
+
+    def __init__(self, workers=1, pages_per_task=50, use_manifest=True, export_excel=False,
+                 duplicate_policy='first', backup_policy=None, backend='pdfplumber', streaming=False,
+                 engine='openpyxl', export_changes=False, chunk_rows=50000, csv_engine='pandas',
+                 profiler=None, use_index=True, ocr_workers=None):
+        # Tiempos por etapa, PDF y página, contadores y memoria máxima (ver metrics.RunMetrics)
+        self.metrics = RunMetrics('pipeline')
+        # Perfilador opcional de toda la ejecución (ver metrics.PROFILERS)
+        if profiler is not None:
+            check_profiler(profiler)
+        self.profiler = profiler
+        self.extractor = SearsExtractor(workers=workers, pages_per_task=pages_per_task,
+                                        use_manifest=use_manifest, backend=backend, metrics=self.metrics,
+                                        ocr_workers=ocr_workers)
+        self.merger = SearsMerger(duplicate_policy=duplicate_policy, backup_policy=backup_policy, engine=engine,
+                                  use_index=use_index)
+        # El índice de pedidos se carga una vez con el del merger de PDFs
+        self.csv_merger = SearsCsvMerger(duplicate_policy=duplicate_policy, backup_policy=backup_policy,
+                                         engine=engine, export_changes=export_changes,
+                                         chunk_rows=chunk_rows, csv_engine=csv_engine, use_index=False)
+        self.export_excel = export_excel
+        # Extracción página por página con escritura al almacén por bloques
+        self.streaming = streaming
+        self.backup_policy = self.merger.backup_policy
+        self.concentrado_file = self.merger.concentrado_file
+        self.backup_dir = self.merger.backup_dir
+
+    def stage(self, name):
+        """Mide y registra la duración de una etapa"""
+        return self.metrics.stage(name)
+
+    def run(self):
+        try:
+            with profiling(self.profiler, 'pipeline'):
+                self.run_stages()
+        except Exception as e:
+            logging.error(f"Error durante el proceso: {str(e)}")
+            raise
+        finally:
+            self.extractor.close()
+            self.log_timings()
+            self.metrics.write()
+
+    def run_stages(self):
+        metrics = self.metrics
+        with self.stage('extraccion'):
+            if self.streaming:
+                inserted = self.extractor.stream_to_store()
+            else:
+                self.extractor.process_all_pdfs()
+                inserted = self.extractor.save_to_store()
+            metrics.count('filas_nuevas_almacen', inserted)
+            # Las extracciones pasan a la siguiente etapa sin releer sears_extractions.xlsx
+            extractions_df = (self.extractor.store.load() if self.extractor.store is not None
+                              else self.extractor.load_combined())
+
+        if self.export_excel:
+            with self.stage('exportar_excel'):
+                self.extractor.generate_excel()
+
+        with self.stage('cargar_concentrado'):
+            create_backup(self.concentrado_file, self.backup_dir, '', self.backup_policy)
+            sheet, order_index = load_concentrado(self.concentrado_file, self.merger.engine,
+                                                  self.merger.index_cache)
+
+        with self.stage('merge_pdf'):
+            merge_result = self.merger.apply_extractions(extractions_df, sheet, order_index)
+        metrics.count('pedidos_actualizados_pdf', merge_result['updates'])
+        metrics.count('celdas_actualizadas_pdf', sheet.cells_written)
+
+        celdas = sheet.cells_written
+        with self.stage('merge_csv'):
+            csv_results = [
+                self.csv_merger.apply_csv(csv_file, sheet, order_index)
+                for csv_file in self.csv_merger.list_csvs()
+            ]
+        metrics.count('csv', len(csv_results))
+        metrics.count('filas_csv', sum(result['total_rows'] for result in csv_results))
+        metrics.count('pedidos_actualizados_csv', sum(result['updates'] for result in csv_results))
+        metrics.count('celdas_actualizadas_csv', sheet.cells_written - celdas)
+
+        with self.stage('guardar_concentrado'):
+            logging.info("Guardando archivo actualizado...")
+            sheet.save()
+
+        with self.stage('reportes'):
+            self.merger.log_summary(merge_result)
+            for result in csv_results:
+                self.csv_merger.write_report(result)
+            self.extractor.write_reconciliation()
+
+    def log_timings(self):
+        """Registra el tiempo de cada etapa, el total y la memoria máxima"""
+        stages = self.metrics.stages
+        lineas = '\n'.join(f"        - {name}: {segundos:.2f} s" for name, segundos in stages.items())
+        memoria = peak_rss_mb()
+        logging.info(f"""
+        Tiempos del proceso:
+{lineas}
+        - Total: {sum(stages.values()):.2f} s
+        - Memoria máxima: {f'{memoria} MB' if memoria is not None else 'no disponible'}
+        """)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ejecuta extracción, merge de PDFs y merge de CSV en un solo proceso')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Procesos para la extracción (0 = todos los núcleos)')
+    parser.add_argument('--paginas-por-tarea', type=int, default=50,
+                        help='Páginas por tarea al dividir PDFs grandes')
+    parser.add_argument('--sin-manifiesto', action='store_true',
+                        help='Volver a extraer todos los PDFs aunque no hayan cambiado')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='pdfplumber',
+                        help='Lector de PDFs: pdfplumber (predeterminado) o pdfminer (solo texto, más rápido)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Extraer página por página y escribir al almacén por bloques (memoria acotada)')
+    parser.add_argument('--ocr', action='store_true',
+                        help='Leer con OCR (tesseract) las páginas sin texto extraíble, como los estados escaneados')
+    parser.add_argument('--workers-ocr', type=int, default=1,
+                        help='Procesos para el OCR de páginas escaneadas')
+    parser.add_argument('--excel', action='store_true',
+                        help='Exportar también sears_extractions.xlsx')
+    parser.add_argument('--duplicados', choices=DUPLICATE_POLICIES, default='first',
+                        help='Pedidos repetidos en el concentrado: primera fila, todas, o reportar conflicto')
+    parser.add_argument('--respaldos', type=int, default=20,
+                        help='Respaldos recientes a conservar (además de uno diario y uno semanal)')
+    parser.add_argument('--comprimir-respaldos', action='store_true',
+                        help='Guardar los respaldos comprimidos con gzip')
+    parser.add_argument('--registro-cambios', action='store_true',
+                        help='Agregar las celdas modificadas por los CSV a RESULTADOFINAL/cambios_merge_csv.csv')
+    parser.add_argument('--filas-por-bloque', type=int, default=50000,
+                        help='Filas de cada CSV que se leen y aplican a la vez')
+    parser.add_argument('--lector-csv', choices=CSV_ENGINES, default='pandas',
+                        help='pandas (predeterminado) o pyarrow (requiere instalar pyarrow)')
+    parser.add_argument('--motor-excel', choices=ENGINES, default='openpyxl',
+                        help='openpyxl carga el libro completo; xml solo reescribe las celdas modificadas; '
+                        'sqlite guarda el concentrado en EXCELPDFSEARS/concentrado.db y exporta el xlsx')
+    parser.add_argument('--sin-indice', action='store_true',
+                        help='Leer la columna de pedidos del concentrado sin usar el índice guardado')
+    parser.add_argument('--perfil', choices=PROFILERS,
+                        help='Perfilar la ejecución y guardar el perfil en logs/metricas (pyinstrument es opcional)')
+    parser.add_argument('--detalle', action='store_true',
+                        help='Registrar el detalle por página y por pedido (nivel DEBUG)')
+    args = parser.parse_args()
+    if args.detalle:
+        enable_debug_logging()
+    backup_policy = BackupPolicy(keep_last=args.respaldos, compress=args.comprimir_respaldos)
+
+    pipeline = SearsPipeline(workers=args.workers, pages_per_task=args.paginas_por_tarea,
+                             use_manifest=not args.sin_manifiesto, export_excel=args.excel,
+                             duplicate_policy=args.duplicados, backup_policy=backup_policy,
+                             backend=args.backend, streaming=args.streaming, engine=args.motor_excel,
+                             export_changes=args.registro_cambios, chunk_rows=args.filas_por_bloque,
+                             csv_engine=args.lector_csv, profiler=args.perfil,
+                             use_index=not args.sin_indice, ocr_workers=args.workers_ocr if args.ocr else None)
+    pipeline.run()
@@ -0,0 +1,169 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from store import COLUMNS
+
+# Columnas de texto con pocos valores distintos: se guardan como códigos de categoría
+CATEGORY_COLUMNS = ('Tipo_Docto', 'Descripcion', 'Cheque', 'Proveedor', 'Archivo_PDF')
+# Columnas enteras que pueden quedar vacías si el texto no es numérico
+NULLABLE_INT_COLUMNS = ('Numero_Pedido', 'Numero_Documento')
+
+_NAT = np.datetime64('NaT', 'us')
+
+
+class RowBuffer:
+    """
+    Buffer columnar de las filas extraídas. Cada columna es un arreglo de numpy preasignado que
+    crece por duplicación: enteros (con máscara de nulos), float64 para el total, datetime64 para
+    las fechas y códigos int32 para los textos repetidos (tipo, descripción, cheque, proveedor y
+    archivo). to_frame() arma el DataFrame tipado sobre esos arreglos sin volver a convertir.
+    """
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.arrays = {
+            'Numero_Pedido': np.zeros(capacity, dtype=np.int64),
+            'Fecha_Pedido': np.full(capacity, _NAT),
+            'Fecha_Vencimiento': np.full(capacity, _NAT),
+            'Numero_Documento': np.zeros(capacity, dtype=np.int64),
+            'Total': np.full(capacity, np.nan),
+            'Pagina_PDF': np.zeros(capacity, dtype=np.int64),
+        }
+        for col in CATEGORY_COLUMNS:
+            self.arrays[col] = np.full(capacity, -1, dtype=np.int32)
+        # True = valor nulo (texto no numérico)
+        self.masks = {col: np.ones(capacity, dtype=bool) for col in NULLABLE_INT_COLUMNS}
+        self.categories = {col: {} for col in CATEGORY_COLUMNS}
+        self.date_cache = {}
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, extra):
+        """Asegura espacio para extra filas más, duplicando la capacidad si hace falta"""
+        needed = self.size + extra
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2)
+        for group in (self.arrays, self.masks):
+            for col, array in group.items():
+                grown = np.empty(capacity, dtype=array.dtype)
+                grown[:self.size] = array[:self.size]
+                group[col] = grown
+        self.capacity = capacity
+
+    def _code(self, col, value):
+        """Código de categoría de un texto (-1 para nulos)"""
+        if value is None:
+            return -1
+        categories = self.categories[col]
+        code = categories.get(value)
+        if code is None:
+            code = categories[value] = len(categories)
+        return code
+
+    def _date(self, value):
+        """Convierte una fecha extraída a datetime64[us]; lo no convertible queda como NaT"""
+        try:
+            return self.date_cache[value]
+        except KeyError:
+            pass
+        except TypeError:  # valor no hashable
+            return _NAT
+        if value is None or value is pd.NaT:
+            converted = _NAT
+        elif isinstance(value, datetime):  # incluye pd.Timestamp
+            converted = np.datetime64(pd.Timestamp(value).as_unit('us').asm8)
+        elif isinstance(value, str):
+            converted = pd.to_datetime(value, errors='coerce')
+            converted = _NAT if pd.isna(converted) else np.datetime64(converted.as_unit('us').asm8)
+        else:
+            converted = _NAT
+        self.date_cache[value] = converted
+        return converted
+
+    def extend_document(self, archivo, rows, cheque, proveedor, doc_types):
+        """
+        Agrega las filas compactas (pedido, fecha_pedido, fecha_vencimiento, documento, tipo,
+        total, pagina) de un documento; cheque, proveedor y archivo se codifican una sola vez.
+        """
+        if not rows:
+            return
+        self._reserve(len(rows))
+        start = self.size
+        end = start + len(rows)
+        arrays = self.arrays
+        masks = self.masks
+        arrays['Cheque'][start:end] = self._code('Cheque', cheque)
+        arrays['Proveedor'][start:end] = self._code('Proveedor', proveedor)
+        arrays['Archivo_PDF'][start:end] = self._code('Archivo_PDF', archivo)
+
+        pedidos, pedidos_mask = arrays['Numero_Pedido'], masks['Numero_Pedido']
+        documentos, documentos_mask = arrays['Numero_Documento'], masks['Numero_Documento']
+        fechas_pedido, fechas_vencimiento = arrays['Fecha_Pedido'], arrays['Fecha_Vencimiento']
+        totales, paginas = arrays['Total'], arrays['Pagina_PDF']
+        tipos, descripciones = arrays['Tipo_Docto'], arrays['Descripcion']
+        for i, (pedido, fecha_pedido, fecha_vencimiento, documento, tipo, total, pagina) in enumerate(rows, start):
+            pedidos[i], pedidos_mask[i] = _to_int(pedido)
+            documentos[i], documentos_mask[i] = _to_int(documento)
+            fechas_pedido[i] = self._date(fecha_pedido)
+            fechas_vencimiento[i] = self._date(fecha_vencimiento)
+            totales[i] = _to_float(total)
+            paginas[i] = pagina
+            tipos[i] = self._code('Tipo_Docto', tipo)
+            descripciones[i] = self._code('Descripcion', doc_types.get(tipo, 'OTRO'))
+        self.size = end
+
+    def to_frame(self):
+        """DataFrame con las columnas de store.COLUMNS construido sobre los arreglos del buffer"""
+        n = self.size
+        data = {}
+        for col in COLUMNS:
+            array = self.arrays[col][:n]
+            if col in NULLABLE_INT_COLUMNS:
+                data[col] = pd.arrays.IntegerArray(array, self.masks[col][:n])
+            elif col in CATEGORY_COLUMNS:
+                data[col] = pd.Categorical.from_codes(array, categories=list(self.categories[col]))
+            else:
+                data[col] = array
+        return pd.DataFrame(data, columns=COLUMNS, copy=False)
+
+    def clear(self):
+        """Vacía el buffer; los arreglos se reemplazan para no alterar DataFrames ya entregados"""
+        self.size = 0
+        self._allocate(min(self.capacity, 1024))
+
+
+_INT64_MIN = np.iinfo(np.int64).min
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+def _to_int(value):
+    """
+    (entero, es_nulo) a partir del texto extraído, como pd.to_numeric(errors='coerce').
+    Los valores no enteros o fuera de rango quedan nulos (el almacén guarda estas columnas como enteros).
+    """
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return 0, True
+        if not number.is_integer():
+            return 0, True
+        number = int(number)
+    if not _INT64_MIN <= number <= _INT64_MAX:
+        return 0, True
+    return number, False
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import logging
+import pandas as pd
+from analytics import RunningAggregates
+
+# Columnas de la tabla de pedidos, en el mismo orden que la hoja 'Pedidos'
+COLUMNS = [
+    'Numero_Pedido', 'Fecha_Pedido', 'Fecha_Vencimiento', 'Numero_Documento',
+    'Tipo_Docto', 'Total', 'Descripcion', 'Cheque', 'Proveedor',
+    'Pagina_PDF', 'Archivo_PDF'
+]
+DATE_COLUMNS = ['Fecha_Pedido', 'Fecha_Vencimiento']
+
+
+class ExtractionStore:
+    """
+    Almacén acumulado de extracciones (SQLite). Es la fuente de verdad de los pedidos
+    extraídos: las filas nuevas se agregan y las repetidas (Numero_Pedido, Numero_Documento)
+    se ignoran, conservando la primera como hacía drop_duplicates(keep='first').
+    Los agregados de análisis (ver analytics.RunningAggregates) se actualizan en la misma
+    transacción que cada inserción o eliminación.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pedidos (
+                Numero_Pedido INTEGER,
+                Fecha_Pedido TEXT,
+                Fecha_Vencimiento TEXT,
+                Numero_Documento INTEGER,
+                Tipo_Docto TEXT,
+                Total REAL,
+                Descripcion TEXT,
+                Cheque TEXT,
+                Proveedor TEXT,
+                Pagina_PDF INTEGER,
+                Archivo_PDF TEXT
+            );
+            -- IFNULL para que los nulos también cuenten como duplicados, igual que en pandas
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_pedidos_documento
+                ON pedidos (IFNULL(Numero_Pedido, -1), IFNULL(Numero_Documento, -1));
+            CREATE INDEX IF NOT EXISTS ix_pedidos_archivo ON pedidos (Archivo_PDF);
+            CREATE INDEX IF NOT EXISTS ix_pedidos_pedido ON pedidos (Numero_Pedido);
+        """)
+        self.analytics = RunningAggregates(self.conn)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM pedidos").fetchone()[0]
+
+    def has_file(self, archivo):
+        """Indica si el almacén ya contiene filas de un PDF"""
+        return self.conn.execute(
+            "SELECT 1 FROM pedidos WHERE Archivo_PDF = ? LIMIT 1", (archivo,)
+        ).fetchone() is not None
+
+    def delete_files(self, archivos):
+        """Elimina las filas de los PDFs indicados (para reemplazarlas)"""
+        archivos = list(archivos)
+        if not archivos:
+            return 0
+        with self.conn:
+            self.analytics.remove_rows(f"Archivo_PDF IN ({', '.join('?' * len(archivos))})", archivos)
+            cursor = self.conn.executemany(
+                "DELETE FROM pedidos WHERE Archivo_PDF = ?", [(a,) for a in archivos]
+            )
+        return cursor.rowcount
+
+    def append(self, df, commit=True):
+        """
+        Agrega las filas de un DataFrame ignorando las claves ya existentes; devuelve cuántas entraron.
+        Con commit=False las filas quedan en la transacción abierta (ver commit/rollback).
+        """
+        if df.empty:
+            return 0
+        # Las filas nuevas quedan después del rowid máximo actual: solo esas se suman a los agregados
+        ultimo = self.conn.execute("SELECT IFNULL(MAX(rowid), 0) FROM pedidos").fetchone()[0]
+        sql = (f"INSERT OR IGNORE INTO pedidos ({', '.join(COLUMNS)}) "
+               f"VALUES ({', '.join('?' * len(COLUMNS))})")
+        # rowcount de executemany suma las filas insertadas (las ignoradas no cuentan), sin
+        # recorrer la tabla completa como COUNT(*)
+        if commit:
+            with self.conn:
+                insertadas = self.conn.executemany(sql, _to_records(df)).rowcount
+                self.analytics.add_rows(ultimo)
+        else:
+            insertadas = self.conn.executemany(sql, _to_records(df)).rowcount
+            self.analytics.add_rows(ultimo)
+        return insertadas
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def import_excel(self, excel_file):
+        """Carga una sola vez el Excel acumulado existente para conservar el historial"""
+        df = pd.read_excel(excel_file, sheet_name='Pedidos')
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+        inserted = self.append(df)
+        logging.info(f"Importadas {inserted} filas de {excel_file} al almacén {self.db_path}")
+        return inserted
+
+    def load(self):
+        """Devuelve todas las filas en orden de inserción, con tipos de fecha y numéricos"""
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(COLUMNS)} FROM pedidos ORDER BY rowid", self.conn
+        )
+        return _typed(df)
+
+    def load_orders(self, pedidos, batch_size=500):
+        """
+        Devuelve solo las filas de los pedidos indicados, en orden de inserción y con los mismos
+        tipos que load(). Las consultas se hacen por lotes de batch_size pedidos.
+        """
+        pedidos = sorted({int(pedido) for pedido in pedidos})
+        frames = []
+        for start in range(0, len(pedidos), batch_size):
+            batch = pedidos[start:start + batch_size]
+            frames.append(pd.read_sql_query(
+                f"SELECT rowid AS _rowid, {', '.join(COLUMNS)} FROM pedidos "
+                f"WHERE Numero_Pedido IN ({', '.join('?' * len(batch))})", self.conn, params=batch
+            ))
+        if not frames:
+            return _typed(pd.DataFrame(columns=COLUMNS))
+        df = pd.concat(frames, ignore_index=True).sort_values('_rowid', ignore_index=True)
+        return _typed(df.drop(columns='_rowid'))
+
+    def close(self):
+        self.conn.close()
+
+
+def _typed(df):
+    """Tipos de las filas leídas del almacén: fechas como datetime y enteros con nulos"""
+    for col in DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    # Enteros con nulos: Int64 evita que se conviertan en float (p. ej. '84778047.0')
+    for col in ('Numero_Pedido', 'Numero_Documento', 'Pagina_PDF'):
+        df[col] = df[col].astype('Int64')
+    return df
+
+
+def _to_records(df):
+    """Convierte el DataFrame en tuplas con tipos nativos de SQLite (NaN/NaT -> NULL)"""
+    df = df.reindex(columns=COLUMNS)
+    columns = []
+    for col in COLUMNS:
+        series = df[col]
+        if col in DATE_COLUMNS:
+            series = pd.to_datetime(series, errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S')
+        elif col in ('Numero_Pedido', 'Numero_Documento', 'Pagina_PDF'):
+            series = pd.to_numeric(series, errors='coerce').astype('Int64')
+        columns.append(series.astype(object).where(series.notna(), None).tolist())
+    return list(zip(*columns))
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+# Encabezados del concentrado: A-L datos de Sears/PDF, M-Y columnas del reporte CSV
+CONCENTRADO_HEADERS = [
+    'ORDEN SEARS ', 'CLIENTE', 'Fecha_Pedido', 'Fecha_Vencimiento', 'Numero_Documento',
+    'Tipo_Docto', 'Total', 'Descripcion', 'Cheque', 'Proveedor', 'OBSERVACIONES ', 'ESTATUS',
+    'Pedido', 'Marketplace', 'Seller', 'Monto', 'Nombre_producto', 'Precio', 'sku',
+    'Estatus_pedido', 'Estatus_partida', 'Fecha Pedido MKP', 'IdFulfillment', 'NoGuia', 'Tipo_envio'
+]
+
+# Tamaño de página carta en puntos, letra y separación entre renglones de los PDFs sintéticos
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+FONT_SIZE = 8
+LEADING = 10
+# Renglones de pedidos por página (además del encabezado de cada página)
+LINES_PER_PAGE = 60
+
+# Tipos de documento de las líneas sintéticas y su proporción; los de descuento llevan total negativo
+DOC_TYPE_WEIGHTS = {'NP': 0.85, 'NT': 0.05, 'ND': 0.04, 'DR': 0.03, 'DV': 0.03}
+NEGATIVE_TYPES = ('ND', 'DR', 'DV')
+
+
+def generar_pedidos(filas, semilla=0):
+    """Números de pedido únicos de 8 dígitos"""
+    rng = np.random.default_rng(semilla)
+    return rng.choice(np.arange(80000000, 99999999), size=filas, replace=False)
+
+
+def generar_concentrado(path, pedidos):
+    """Escribe un concentrado sintético con la distribución de columnas real"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Concentrado')
+    ws.append(CONCENTRADO_HEADERS)
+    for pedido in pedidos:
+        ws.append([int(pedido), 'CLIENTE'] + [None] * 9 + ['ABIERTO'] + [None] * 13)
+    wb.save(path)
+
+
+def generar_csv(path, pedidos, semilla=0):
+    """Escribe un Reporte - Pedidos sintético para los pedidos indicados"""
+    rng = np.random.default_rng(semilla)
+    filas = len(pedidos)
+    precios = rng.integers(100, 20000, filas).astype(float)
+    pd.DataFrame({
+        'Pedido': pedidos,
+        'Marketplace': 'SR',
+        'Seller': 77304,
+        'Monto': precios,
+        'Nombre_producto': [f'Producto {i}' for i in range(filas)],
+        'Precio': precios,
+        'sku': [f'SKU{i:07d}' for i in range(filas)],
+        'Estatus_pedido': rng.choice(['por enviar', 'enviado', 'entregado'], filas),
+        'Estatus_partida': 'por enviar',
+        'Fecha_Pedido': (pd.Timestamp('2025-01-01')
+                         + pd.to_timedelta(rng.integers(0, 60, filas), unit='D')).strftime('%Y-%m-%d'),
+        'IdFulfillment': 0,
+        'NoGuia': 'NoGuia no disponible',
+        'Tipo_envio': 'dropshipping',
+    }).to_csv(path, index=False, encoding='utf-8')
+
+
+def lineas_pedidos(pedidos, semilla=0):
+    """
+    Líneas de pedidos con el formato del estado de cuenta:
+    '84778047 26/12/2024 12/01/2025 657261 NP $1,117.14'. Un 5% de los pedidos repite una línea
+    anterior (como las devoluciones), para que el merge sume duplicados igual que con PDFs reales.
+    """
+    rng = np.random.default_rng(semilla)
+    filas = len(pedidos)
+    pedidos = np.array(pedidos)
+    repetidos = rng.random(filas) < 0.05
+    repetidos[0] = False
+    pedidos[repetidos] = pedidos[np.maximum(np.flatnonzero(repetidos) - 1, 0)]
+    tipos = rng.choice(list(DOC_TYPE_WEIGHTS), size=filas, p=list(DOC_TYPE_WEIGHTS.values()))
+    fechas = pd.Timestamp('2024-12-01') + pd.to_timedelta(rng.integers(0, 60, filas), unit='D')
+    vencimientos = fechas + pd.Timedelta(days=17)
+    totales = rng.integers(10000, 2000000, filas) / 100
+    documentos = rng.integers(600000, 700000, filas)
+    lineas = []
+    for pedido, fecha, vencimiento, documento, tipo, total in zip(
+            pedidos, fechas.strftime('%d/%m/%Y'), vencimientos.strftime('%d/%m/%Y'), documentos, tipos, totales):
+        signo = '-' if tipo in NEGATIVE_TYPES else ''
+        lineas.append(f"{pedido} {fecha} {vencimiento} {documento} {tipo} {signo}${total:,.2f}")
+    return lineas
+
+
+def generar_estado_cuenta(path, pedidos, cheque, proveedor='131609', semilla=0, lineas_por_pagina=LINES_PER_PAGE):
+    """
+    Escribe un estado de cuenta sintético con el encabezado de Sears (Cheque y Proveedor) en cada
+    página y las líneas de los pedidos indicados. Devuelve el número de páginas.
+    """
+    encabezado = [
+        'SEARS OPERADORA MÉXICO',
+        'Relación del Pago de los Pedidos.',
+        f'Cheque : {cheque} Fecha de Cheque : 13/01/2025',
+        f'No. de Proveedor : {proveedor} Proveedor : PROVEEDOR SINTETICO S DE RL DE CV',
+        'Numero Fecha Fecha de Número Tipo Folio Fiscal Total',
+        'Pedido Pedido Vencimiento Documento Docto',
+    ]
+    lineas = lineas_pedidos(pedidos, semilla)
+    paginas = [
+        encabezado + lineas[inicio:inicio + lineas_por_pagina]
+        for inicio in range(0, max(len(lineas), 1), lineas_por_pagina)
+    ]
+    escribir_pdf(path, paginas)
+    return len(paginas)
+
+
+def _texto_pdf(texto):
+    """Cadena literal de PDF en WinAnsiEncoding"""
+    data = texto.encode('cp1252', errors='replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def escribir_pdf(path, paginas):
+    """
+    Escribe un PDF mínimo sin dependencias: una fuente Helvetica estándar y, por página, un
+    flujo de texto sin comprimir con un renglón por línea. paginas es una lista de listas de líneas.
+    """
+    # Objetos: 1 catálogo, 2 árbol de páginas, 3 fuente; después página y contenido de cada página
+    kids = ' '.join(f'{4 + 2 * i} 0 R' for i in range(len(paginas)))
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        f'<< /Type /Pages /Kids [{kids}] /Count {len(paginas)} >>'.encode(),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    for i, lineas in enumerate(paginas):
+        contenido = [f'BT /F1 {FONT_SIZE} Tf {LEADING} TL 36 {PAGE_HEIGHT - 40} Td'.encode()]
+        contenido.extend(_texto_pdf(linea) + b' Tj T*' for linea in lineas)
+        contenido.append(b'ET')
+        stream = b'\n'.join(contenido)
+        objetos.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>'.encode()
+        )
+        objetos.append(f'<< /Length {len(stream)} >>\nstream\n'.encode() + stream + b'\nendstream')
+
+    salida = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for numero, objeto in enumerate(objetos, 1):
+        offsets.append(len(salida))
+        salida += f'{numero} 0 obj\n'.encode() + objeto + b'\nendobj\n'
+    xref = len(salida)
+    salida += f'xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        salida += f'{offset:010d} 00000 n \n'.encode()
+    salida += f'trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    with open(path, 'wb') as f:
+        f.write(salida)
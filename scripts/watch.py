@@ -0,0 +1,361 @@
+import os
+import time
+import signal
+import logging
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+# Configuración de logging (antes de importar los demás scripts, que configuran su propio archivo)
+os.makedirs('logs', exist_ok=True)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(os.path.join('logs', 'watch.log')),
+        logging.StreamHandler()
+    ]
+)
+
+from extract import SearsExtractor, _parse_pdf_pages_task
+from merge_data import SearsMerger
+from merge_csv_data import SearsCsvMerger
+from backups import BackupPolicy, create_backup
+from concentrado import DUPLICATE_POLICIES, load_concentrado
+from pdf_backends import BACKENDS
+from xlsx_engine import ENGINES
+from csv_reader import CSV_ENGINES
+from metrics import enable_debug_logging
+
+
+def _file_state(path):
+    """(tamaño, mtime en ns) de un archivo, o None si ya no existe"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class SearsWatcher:
+    """
+    Modo servicio: vigila PDFSEARS y CSVreporte por sondeo y procesa cada archivo nuevo o
+    modificado en cuanto deja de cambiar entre dos sondeos (copia terminada).
+
+    El concentrado y su índice de pedidos se cargan una sola vez y quedan en memoria. Los PDFs
+    se extraen en un pool de procesos que se mantiene vivo, con a lo más queue_size archivos en
+    curso; al terminar cada uno sus filas se agregan al almacén y se aplican al concentrado solo
+    los pedidos de ese PDF (con todas sus filas del almacén, así los duplicados suman igual que
+    en el proceso completo). Los CSV se aplican en cuanto llegan. El concentrado se respalda y se
+    guarda cuando pasan debounce segundos sin cambios nuevos, o a más tardar max_delay segundos
+    después del primer cambio sin guardar.
+    """
+
+    def __init__(self, interval=2.0, debounce=5.0, max_delay=60.0, workers=1, queue_size=4,
+                 duplicate_policy='first', backup_policy=None, backend='pdfplumber', engine='openpyxl',
+                 export_changes=False, chunk_rows=50000, csv_engine='pandas', use_index=True, ocr_workers=None):
+        # Con OCR, las tareas devuelven las páginas sin texto y se leen en el pool de OCR del extractor
+        self.extractor = SearsExtractor(workers=workers, backend=backend, ocr_workers=ocr_workers)
+        self.merger = SearsMerger(duplicate_policy=duplicate_policy, backup_policy=backup_policy, engine=engine,
+                                  use_index=use_index)
+        self.csv_merger = SearsCsvMerger(duplicate_policy=duplicate_policy, backup_policy=backup_policy,
+                                         engine=engine, export_changes=export_changes,
+                                         chunk_rows=chunk_rows, csv_engine=csv_engine, use_index=False)
+        self.concentrado_file = self.merger.concentrado_file
+        self.backup_dir = self.merger.backup_dir
+        self.backup_policy = self.merger.backup_policy
+        self.interval = interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.queue_size = max(queue_size, 1)
+        self.running = True
+
+        # Estado observado en el sondeo anterior y estado ya procesado de cada archivo
+        self.observed = {}
+        self.processed = {}
+        # PDFs en extracción: {ruta: (future, estado del archivo, inicio)}
+        self.in_flight = {}
+        # PDFs extraídos con páginas en OCR: {ruta: (documento, [(página, pendiente)], inicio, num_pages)}
+        self.in_ocr = {}
+
+        # Concentrado en memoria y cambios aplicados desde el último guardado
+        self.sheet = None
+        self.order_index = None
+        self.concentrado_state = None
+        self.saved_cells = 0
+        # Aplicaciones pendientes de guardar, para repetirlas si el archivo cambia por fuera
+        self.unsaved = []
+        self.first_change = None
+        self.last_change = None
+
+    # --- Concentrado -------------------------------------------------------------------------
+
+    def load_concentrado(self):
+        """Carga el concentrado y su índice de pedidos (una vez, o de nuevo si cambió por fuera)"""
+        if self.sheet is not None:
+            # Descarta lo no guardado (se repite sobre la hoja nueva) y libera la base del motor sqlite
+            self.sheet.close()
+        self.concentrado_state = _file_state(self.concentrado_file)
+        self.sheet, self.order_index = load_concentrado(self.concentrado_file, self.merger.engine,
+                                                         self.merger.index_cache)
+        self.saved_cells = self.sheet.cells_written
+
+    def check_concentrado(self):
+        """
+        Si el concentrado se modificó fuera del servicio, lo vuelve a cargar y repite sobre él
+        las aplicaciones aún no guardadas, para no sobrescribir los cambios externos.
+        """
+        if _file_state(self.concentrado_file) == self.concentrado_state:
+            return
+        logging.warning("El concentrado cambió fuera del servicio; se vuelve a cargar")
+        self.load_concentrado()
+        unsaved, self.unsaved = self.unsaved, []
+        for kind, item in unsaved:
+            if kind == 'pdf':
+                self.merge_orders(item)
+            else:
+                self.apply_csv(item, report=False)
+
+    def dirty(self):
+        return self.sheet.cells_written != self.saved_cells
+
+    def mark_changed(self):
+        now = time.monotonic()
+        if self.dirty():
+            self.first_change = self.first_change or now
+            self.last_change = now
+
+    def flush(self, force=False):
+        """Respalda y guarda el concentrado si hay cambios y ya se cumplió la espera (o con force)"""
+        if not self.dirty():
+            self.unsaved = []
+            self.first_change = self.last_change = None
+            return
+        now = time.monotonic()
+        if not force and now - self.last_change < self.debounce and now - self.first_change < self.max_delay:
+            return
+        self.check_concentrado()
+        if not self.dirty():
+            return
+        create_backup(self.concentrado_file, self.backup_dir, '', self.backup_policy)
+        logging.info(f"Guardando archivo actualizado ({len(self.unsaved)} archivos aplicados)...")
+        self.sheet.save()
+        self.extractor.write_reconciliation()
+        self.concentrado_state = _file_state(self.concentrado_file)
+        self.saved_cells = self.sheet.cells_written
+        self.unsaved = []
+        self.first_change = self.last_change = None
+
+    # --- Aplicación de archivos -------------------------------------------------------------
+
+    def merge_orders(self, pedidos=None):
+        """Aplica al concentrado todas las filas del almacén de los pedidos indicados (None = todos)"""
+        store = self.extractor.store
+        extractions_df = store.load() if pedidos is None else store.load_orders(pedidos)
+        result = self.merger.apply_extractions(extractions_df, self.sheet, self.order_index)
+        self.unsaved.append(('pdf', pedidos))
+        return result
+
+    def apply_csv(self, csv_file, report=True):
+        result = self.csv_merger.apply_csv(csv_file, self.sheet, self.order_index)
+        self.unsaved.append(('csv', csv_file))
+        if report:
+            self.csv_merger.write_report(result)
+
+    def store_document(self, pdf_path, document, fingerprint):
+        """Registra un PDF extraído en el manifiesto y el almacén y aplica sus pedidos"""
+        extractor = self.extractor
+        if fingerprint is not None:
+            extractor.manifest.save_document(pdf_path, fingerprint, document)
+        extractor.add_document_rows(pdf_path, *document)
+        # Solo se reemplazan las filas anteriores de este PDF (otros pueden seguir en extracción)
+        archivo = os.path.basename(pdf_path)
+        replaced = extractor.replaced_files
+        extractor.replaced_files = replaced & {archivo}
+        extractor.save_to_store()
+        extractor.replaced_files = replaced - {archivo}
+        extractor.processed_data.clear()
+        pedidos = {row[0] for row in document[0] if str(row[0]).isdigit()}
+        result = self.merge_orders(pedidos)
+        logging.info(f"{os.path.basename(pdf_path)}: {len(document[0])} líneas, "
+                     f"{result['updates']} pedidos actualizados, {result['no_matches']} sin coincidencia")
+
+    # --- Sondeo ------------------------------------------------------------------------------
+
+    def ready_files(self, folder, extension):
+        """
+        Archivos de la carpeta que no han cambiado desde el sondeo anterior y cuyo estado
+        aún no se procesó, en orden alfabético
+        """
+        if not os.path.isdir(folder):
+            return []
+        ready = []
+        for filename in sorted(os.listdir(folder)):
+            if not filename.endswith(extension):
+                continue
+            path = os.path.join(folder, filename)
+            state = _file_state(path)
+            previous = self.observed.get(path)
+            self.observed[path] = state
+            if state is not None and state == previous and self.processed.get(path) != state:
+                ready.append(path)
+        return ready
+
+    def poll(self, pool):
+        """Un ciclo: recoge los PDFs extraídos, envía los nuevos y aplica los CSV nuevos"""
+        self.collect()
+        for pdf_path in self.ready_files(self.extractor.input_dir, '.pdf'):
+            if pdf_path in self.in_flight or pdf_path in self.in_ocr:
+                continue
+            if len(self.in_flight) >= self.queue_size:
+                # Cola llena: el archivo se toma en un sondeo posterior
+                break
+            self.submit(pool, pdf_path)
+        for csv_file in self.ready_files(self.csv_merger.input_dir, '.csv'):
+            self.check_concentrado()
+            try:
+                self.apply_csv(csv_file)
+            except Exception as e:
+                logging.error(f"Error procesando {csv_file}: {str(e)}")
+                logging.error(traceback.format_exc())
+            self.processed[csv_file] = self.observed[csv_file]
+            self.mark_changed()
+        self.flush()
+
+    def submit(self, pool, pdf_path):
+        """Envía un PDF al pool si el manifiesto indica que es nuevo o cambió"""
+        state = self.observed[pdf_path]
+        pending, documents = self.extractor.plan_extraction([pdf_path])
+        if pdf_path in documents:
+            # Ya extraído pero sin filas en el almacén
+            self.check_concentrado()
+            self.store_document(pdf_path, documents[pdf_path], None)
+            self.mark_changed()
+        if not pending:
+            self.processed[pdf_path] = state
+            return
+        logging.info(f"Procesando archivo: {pdf_path}")
+        future = pool.submit(_parse_pdf_pages_task, pdf_path, 0, None, self.extractor.backend,
+                             self.extractor.ocr is not None)
+        self.in_flight[pdf_path] = (future, state, time.perf_counter())
+
+    def collect(self, wait=False):
+        """
+        Aplica los PDFs cuya extracción terminó (con wait, espera a todos). Las páginas sin texto
+        se envían al pool de OCR y el PDF se aplica cuando termina su OCR, sin detener los demás.
+        """
+        for pdf_path, (future, state, inicio) in list(self.in_flight.items()):
+            if not wait and not future.done():
+                continue
+            del self.in_flight[pdf_path]
+            self.processed[pdf_path] = state
+            try:
+                (rows, cheque, proveedor, num_pages), ocr_pages, _, _ = future.result()
+            except Exception as e:
+                logging.error(f"Error procesando {pdf_path}: {str(e)}")
+                self.extractor.pending_fingerprints.pop(pdf_path, None)
+                self.extractor.replaced_files.discard(os.path.basename(pdf_path))
+                continue
+            ocr_pending = self.extractor.submit_ocr_pages(pdf_path, ocr_pages) if ocr_pages else []
+            self.in_ocr[pdf_path] = ((rows, cheque, proveedor), ocr_pending, inicio, num_pages)
+
+        for pdf_path, (document, ocr_pending, inicio, num_pages) in list(self.in_ocr.items()):
+            if not wait and not all(pending[1].done() for _, pending in ocr_pending):
+                continue
+            del self.in_ocr[pdf_path]
+            fingerprint = self.extractor.pending_fingerprints.pop(pdf_path, None)
+            rows, cheque, proveedor = self.extractor.add_ocr_rows(pdf_path, document, ocr_pending)
+            logging.info(f"Finalizado procesamiento de {pdf_path}: {len(rows)} líneas en {num_pages} páginas "
+                         f"({time.perf_counter() - inicio:.2f} s)")
+            self.check_concentrado()
+            self.store_document(pdf_path, (rows, cheque, proveedor), fingerprint)
+            self.mark_changed()
+
+    def run(self, once=False):
+        """
+        Vigila las carpetas hasta recibir SIGINT/SIGTERM. Con once procesa los archivos
+        presentes, guarda y termina.
+        """
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        self.extractor.seed_store()
+        self.load_concentrado()
+        # Al arrancar se aplica el almacén completo, igual que el proceso por lotes
+        self.merger.log_summary(self.merge_orders())
+        self.mark_changed()
+        logging.info(f"Vigilando {self.extractor.input_dir} y {self.csv_merger.input_dir} "
+                     f"cada {self.interval} s (Ctrl+C para terminar)")
+
+        with ProcessPoolExecutor(max_workers=self.extractor.workers) as pool:
+            try:
+                while self.running:
+                    self.poll(pool)
+                    if once and not self.in_flight and not self.in_ocr and self.settled():
+                        break
+                    time.sleep(self.interval)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                logging.info("Deteniendo el servicio...")
+                self.collect(wait=True)
+                self.flush(force=True)
+                self.extractor.close()
+
+    def settled(self):
+        """Todos los archivos observados ya están procesados"""
+        return all(self.processed.get(path) == state for path, state in self.observed.items() if state is not None)
+
+    def stop(self):
+        self.running = False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Vigila PDFSEARS y CSVreporte y aplica cada archivo nuevo al concentrado')
+    parser.add_argument('--intervalo', type=float, default=2.0,
+                        help='Segundos entre revisiones de las carpetas')
+    parser.add_argument('--espera', type=float, default=5.0,
+                        help='Segundos sin cambios nuevos antes de guardar el concentrado')
+    parser.add_argument('--espera-maxima', type=float, default=60.0,
+                        help='Segundos máximos con cambios sin guardar')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Procesos para la extracción (0 = todos los núcleos)')
+    parser.add_argument('--cola', type=int, default=4,
+                        help='PDFs en extracción a la vez; los demás esperan al siguiente ciclo')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='pdfplumber',
+                        help='Lector de PDFs: pdfplumber (predeterminado) o pdfminer (solo texto, más rápido)')
+    parser.add_argument('--ocr', action='store_true',
+                        help='Leer con OCR (tesseract) las páginas sin texto extraíble, como los estados escaneados')
+    parser.add_argument('--workers-ocr', type=int, default=1,
+                        help='Procesos para el OCR de páginas escaneadas')
+    parser.add_argument('--duplicados', choices=DUPLICATE_POLICIES, default='first',
+                        help='Pedidos repetidos en el concentrado: primera fila, todas, o reportar conflicto')
+    parser.add_argument('--respaldos', type=int, default=20,
+                        help='Respaldos recientes a conservar (además de uno diario y uno semanal)')
+    parser.add_argument('--comprimir-respaldos', action='store_true',
+                        help='Guardar los respaldos comprimidos con gzip')
+    parser.add_argument('--registro-cambios', action='store_true',
+                        help='Agregar las celdas modificadas por los CSV a RESULTADOFINAL/cambios_merge_csv.csv')
+    parser.add_argument('--filas-por-bloque', type=int, default=50000,
+                        help='Filas de cada CSV que se leen y aplican a la vez')
+    parser.add_argument('--lector-csv', choices=CSV_ENGINES, default='pandas',
+                        help='pandas (predeterminado) o pyarrow (requiere instalar pyarrow)')
+    parser.add_argument('--motor-excel', choices=ENGINES, default='openpyxl',
+                        help='openpyxl carga el libro completo; xml solo reescribe las celdas modificadas; '
+                        'sqlite guarda el concentrado en EXCELPDFSEARS/concentrado.db y exporta el xlsx')
+    parser.add_argument('--sin-indice', action='store_true',
+                        help='Leer la columna de pedidos del concentrado sin usar el índice guardado')
+    parser.add_argument('--una-vez', action='store_true',
+                        help='Procesar los archivos presentes, guardar y terminar')
+    parser.add_argument('--detalle', action='store_true',
+                        help='Registrar el detalle por página y por pedido (nivel DEBUG)')
+    args = parser.parse_args()
+    if args.detalle:
+        enable_debug_logging()
+    backup_policy = BackupPolicy(keep_last=args.respaldos, compress=args.comprimir_respaldos)
+
+    watcher = SearsWatcher(interval=args.intervalo, debounce=args.espera, max_delay=args.espera_maxima,
+                           workers=args.workers, queue_size=args.cola, duplicate_policy=args.duplicados,
+                           backup_policy=backup_policy, backend=args.backend, engine=args.motor_excel,
+                           export_changes=args.registro_cambios, chunk_rows=args.filas_por_bloque,
+                           csv_engine=args.lector_csv, use_index=not args.sin_indice,
+                           ocr_workers=args.workers_ocr if args.ocr else None)
+    watcher.run(once=args.una_vez)
@@ -0,0 +1,586 @@
+import os
+import re
+import html
+import math
+import shutil
+import zipfile
+import logging
+import tempfile
+import posixpath
+import numbers as pynumbers
+from io import BytesIO
+from datetime import date, datetime, time, timedelta
+from xml.etree.ElementTree import iterparse
+import numpy as np
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE, TIME_FORMATS
+from openpyxl.styles.numbers import BUILTIN_FORMATS, BUILTIN_FORMATS_REVERSE, is_date_format, is_timedelta_format
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, to_excel
+from openpyxl.utils.escape import unescape as unescape_xlsx
+from openpyxl.utils.exceptions import IllegalCharacterError
+
+# Motores para actualizar el concentrado:
+#   'openpyxl' -> carga el libro completo (objetos por celda) y lo reescribe al guardar
+#   'xml'      -> recorre el XML de la hoja y solo reescribe las celdas modificadas
+#   'sqlite'   -> el concentrado vive en una base SQLite y el .xlsx se exporta al guardar (ver concentrado_db)
+ENGINES = ('openpyxl', 'xml', 'sqlite')
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_ROW_RE = re.compile(rb'<row\b')
+_ROW_NUMBER_RE = re.compile(rb'<row\b[^>]*?\sr="(\d+)"')
+_CELL_RE = re.compile(rb'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.DOTALL)
+_ATTR_RE = re.compile(rb'([\w:]+)="([^"]*)"')
+_REF_RE = re.compile(r'([A-Z]+)(\d+)')
+_VALUE_RE = re.compile(rb'<v>(.*?)</v>', re.DOTALL)
+_FORMULA_RE = re.compile(rb'<f\b([^>]*?)(?:/>|>(.*?)</f>)', re.DOTALL)
+_TEXT_RE = re.compile(rb'<t\b[^>]*?(?:/>|>(.*?)</t>)', re.DOTALL)
+_PHONETIC_RE = re.compile(rb'<rPh\b.*?</rPh>', re.DOTALL)
+_DIMENSION_RE = re.compile(rb'<dimension ref="([^"]*)"\s*/>')
+_XF_RE = re.compile(rb'<xf\b[^>]*?(?:/>|>.*?</xf>)', re.DOTALL)
+
+
+class OpenpyxlSheet:
+    """Hoja activa del concentrado cargada completa con openpyxl (comportamiento histórico)"""
+
+    engine = 'openpyxl'
+
+    def __init__(self, path):
+        self.path = path
+        self.wb = load_workbook(path)
+        self.ws = self.wb.active
+        # Celdas escritas desde la carga (métricas de la ejecución) y columnas modificadas
+        self.cells_written = 0
+        self.written_columns = set()
+        # Funciones hook(path) que se llaman después de cada guardado (ver order_cache)
+        self.save_hooks = []
+
+    def header_map(self):
+        """{nombre de encabezado: índice de columna} a partir de la fila 1"""
+        return {cell.value: idx + 1 for idx, cell in enumerate(self.ws[1])}
+
+    def column_values(self, col, first_row=2):
+        """Valores de una columna desde first_row hasta la última fila de la hoja"""
+        return [row[0] for row in self.ws.iter_rows(min_row=first_row, min_col=col, max_col=col, values_only=True)]
+
+    def get(self, row, col):
+        return self.ws.cell(row=row, column=col).value
+
+    def read_block(self, rows, cols):
+        """Arreglo (filas x columnas) con los valores de las celdas indicadas, sin crear celdas vacías"""
+        cells = self.ws._cells
+        block = np.full((len(rows), len(cols)), None, dtype=object)
+        for i, row in enumerate(rows):
+            for j, col in enumerate(cols):
+                cell = cells.get((row, col))
+                if cell is not None:
+                    block[i, j] = cell.value
+        return block
+
+    def row_numbers(self):
+        """Números de las filas de la hoja"""
+        return list(range(1, self.ws.max_row + 1))
+
+    def iter_cells(self):
+        """(fila, columna, valor) de cada celda con valor, fila por fila"""
+        for (row, col), cell in sorted(self.ws._cells.items()):
+            if cell.value is not None:
+                yield row, col, cell.value
+
+    def set(self, row, col, value, number_format=None):
+        """Escribe el valor conservando el estilo de la celda; number_format lo reemplaza si se indica"""
+        cell = self.ws.cell(row=row, column=col)
+        cell.value = value
+        if number_format is not None:
+            cell.number_format = number_format
+        self.cells_written += 1
+        self.written_columns.add(col)
+
+    def save(self, path=None):
+        self.wb.save(path or self.path)
+        for hook in self.save_hooks:
+            hook(path or self.path)
+
+    def close(self):
+        self.wb.close()
+
+
+class XmlSheet:
+    """
+    Hoja activa del concentrado editada sobre el XML del archivo .xlsx, sin crear un objeto por
+    celda. Al cargar solo se ubican las filas (desplazamientos en el XML) y los textos compartidos;
+    las lecturas analizan únicamente la fila pedida. Al guardar se reescriben solo las filas con
+    celdas modificadas, cada celda conserva su estilo (atributo s) y los cambios de formato
+    numérico agregan el estilo derivado en styles.xml. El resto del libro se copia tal cual.
+    """
+
+    engine = 'xml'
+
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as zf:
+            self.names = set(zf.namelist())
+            self.sheet_name, self.date1904 = self._locate_active_sheet(zf)
+            self.sheet_xml = zf.read(self.sheet_name)
+            self.styles_xml = zf.read('xl/styles.xml') if 'xl/styles.xml' in self.names else None
+            self.shared_strings = self._read_shared_strings(zf)
+        if b'<worksheet' not in self.sheet_xml[:4096]:
+            raise ValueError(f"{path}: la hoja usa prefijos de espacio de nombres; use el motor 'openpyxl'")
+        self.epoch = CALENDAR_MAC_1904 if self.date1904 else CALENDAR_WINDOWS_1900
+        self._index_rows()
+        self._load_styles()
+        # Celdas modificadas pendientes de guardar: {fila: {columna: (valor, estilo)}}
+        self.pending = {}
+        self.row_cache = {}
+        self.formulas_removed = False
+        # Celdas escritas desde la carga (métricas de la ejecución) y columnas modificadas
+        self.cells_written = 0
+        self.written_columns = set()
+        # Funciones hook(path) que se llaman después de cada guardado (ver order_cache)
+        self.save_hooks = []
+
+    # --- Lectura del paquete ---------------------------------------------------------------
+
+    def _locate_active_sheet(self, zf):
+        """Ruta del XML de la hoja activa (como wb.active en openpyxl) y si el libro usa fechas 1904"""
+        workbook = zf.read('xl/workbook.xml')
+        active = 0
+        date1904 = False
+        sheets = []
+        for _, elem in iterparse(BytesIO(workbook)):
+            if elem.tag == _MAIN_NS + 'workbookView':
+                active = int(elem.get('activeTab', 0))
+            elif elem.tag == _MAIN_NS + 'workbookPr':
+                date1904 = elem.get('date1904', '0') in ('1', 'true')
+            elif elem.tag == _MAIN_NS + 'sheet':
+                sheets.append(elem.get(_REL_NS + 'id'))
+        rels = {}
+        for _, elem in iterparse(BytesIO(zf.read('xl/_rels/workbook.xml.rels'))):
+            if elem.tag == _PKG_REL_NS + 'Relationship':
+                rels[elem.get('Id')] = elem.get('Target')
+        target = rels[sheets[min(active, len(sheets) - 1)]]
+        if target.startswith('/'):
+            return target.lstrip('/'), date1904
+        return posixpath.normpath(posixpath.join('xl', target)), date1904
+
+    def _read_shared_strings(self, zf):
+        """Textos compartidos en orden; los textos enriquecidos se concatenan sin la fonética"""
+        if 'xl/sharedStrings.xml' not in self.names:
+            return []
+        strings = []
+        for _, elem in iterparse(zf.open('xl/sharedStrings.xml')):
+            if elem.tag == _MAIN_NS + 'si':
+                parts = []
+                for child in elem:
+                    if child.tag == _MAIN_NS + 't':
+                        parts.append(child.text or '')
+                    elif child.tag == _MAIN_NS + 'r':
+                        parts.extend(t.text or '' for t in child.iter(_MAIN_NS + 't'))
+                strings.append(unescape_xlsx(''.join(parts)))
+                elem.clear()
+        return strings
+
+    def _index_rows(self):
+        """Desplazamiento de cada <row> en el XML de la hoja, indexado por número de fila"""
+        starts = []
+        numbers = []
+        for match in _ROW_NUMBER_RE.finditer(self.sheet_xml):
+            starts.append(match.start())
+            numbers.append(int(match.group(1)))
+        if len(numbers) != len(_ROW_RE.findall(self.sheet_xml)):
+            raise ValueError(f"{self.path}: filas sin número (r); use el motor 'openpyxl'")
+        rows = np.array(numbers, dtype=np.int64)
+        self.max_row = int(rows.max()) if len(rows) else 0
+        self.row_offsets = np.full(self.max_row + 1, -1, dtype=np.int64)
+        self.row_offsets[rows] = starts
+
+    def _load_styles(self):
+        """Formato numérico de cada estilo de celda (cellXfs) para reconocer fechas"""
+        self.custom_formats = {}
+        self.xf_formats = []
+        self.xf_cache = {}
+        if self.styles_xml is None:
+            return
+        for num_fmt_id, code in re.findall(rb'<numFmt\b[^>]*?numFmtId="(\d+)"[^>]*?formatCode="([^"]*)"',
+                                           self.styles_xml):
+            self.custom_formats[int(num_fmt_id)] = html.unescape(code.decode('utf-8'))
+        for xf in self._cell_xfs():
+            match = re.search(rb'\bnumFmtId="(\d+)"', xf)
+            self.xf_formats.append(self._format_code(int(match.group(1)) if match else 0))
+
+    def _cell_xfs(self):
+        section = re.search(rb'<cellXfs\b[^>]*>(.*?)</cellXfs>', self.styles_xml, re.DOTALL)
+        return _XF_RE.findall(section.group(1)) if section else []
+
+    def _format_code(self, num_fmt_id):
+        if num_fmt_id in self.custom_formats:
+            return self.custom_formats[num_fmt_id]
+        return BUILTIN_FORMATS.get(num_fmt_id, 'General')
+
+    # --- Lectura de celdas -----------------------------------------------------------------
+
+    def _row_span(self, row):
+        """(inicio, fin) del elemento <row> en el XML, o None si la fila no existe"""
+        if row > self.max_row or self.row_offsets[row] < 0:
+            return None
+        start = int(self.row_offsets[row])
+        tag_end = self.sheet_xml.index(b'>', start) + 1
+        if self.sheet_xml[tag_end - 2:tag_end] == b'/>':
+            return start, tag_end
+        return start, self.sheet_xml.index(b'</row>', tag_end) + len(b'</row>')
+
+    def _row_cells(self, row):
+        """{columna: (atributos, contenido, xml)} de las celdas de una fila tal como están en el archivo"""
+        cells = self.row_cache.get(row)
+        if cells is None:
+            cells = self.row_cache[row] = self._parse_row(row)
+        return cells
+
+    def _parse_row(self, row):
+        """Analiza las celdas de una fila en el XML, sin usar la caché"""
+        cells = {}
+        span = self._row_span(row)
+        if span is not None:
+            for match in _CELL_RE.finditer(self.sheet_xml, *span):
+                attrs = dict(_ATTR_RE.findall(match.group(1)))
+                if b'r' not in attrs:
+                    raise ValueError(f"{self.path}: celdas sin referencia (r); use el motor 'openpyxl'")
+                col = column_index_from_string(_REF_RE.fullmatch(attrs[b'r'].decode()).group(1))
+                cells[col] = (attrs, match.group(2) or b'', match.group(0))
+        return cells
+
+    def header_map(self):
+        """{nombre de encabezado: índice de columna} a partir de la fila 1"""
+        cells = self._row_cells(1)
+        if not cells:
+            return {}
+        return {self.get(1, col): col for col in range(1, max(cells) + 1)}
+
+    def column_values(self, col, first_row=2):
+        """Valores de una columna desde first_row hasta la última fila de la hoja"""
+        letter = get_column_letter(col).encode()
+        pattern = re.compile(rb'<c\b(?=[^>]*?\br="' + letter + rb'(\d+)")([^>]*?)(?:/>|>(.*?)</c>)', re.DOTALL)
+        values = [None] * max(self.max_row - first_row + 1, 0)
+        for match in pattern.finditer(self.sheet_xml):
+            row = int(match.group(1))
+            if row >= first_row:
+                values[row - first_row] = self._decode(dict(_ATTR_RE.findall(match.group(2))), match.group(3) or b'')
+        for row, changes in self.pending.items():
+            if row >= first_row and col in changes:
+                values[row - first_row] = changes[col][0]
+        return values
+
+    def get(self, row, col):
+        changes = self.pending.get(row)
+        if changes and col in changes:
+            return changes[col][0]
+        cell = self._row_cells(row).get(col)
+        if cell is None:
+            return None
+        return self._decode(cell[0], cell[1])
+
+    def read_block(self, rows, cols):
+        """Arreglo (filas x columnas) con los valores de las celdas indicadas"""
+        block = np.full((len(rows), len(cols)), None, dtype=object)
+        for i, row in enumerate(rows):
+            row = int(row)
+            changes = self.pending.get(row, {})
+            cells = self.row_cache.get(row)
+            if cells is None:
+                # Sin guardar en caché: un bloque grande puede abarcar toda la hoja
+                cells = self._parse_row(row)
+            for j, col in enumerate(cols):
+                if col in changes:
+                    block[i, j] = changes[col][0]
+                elif col in cells:
+                    attrs, inner, _ = cells[col]
+                    block[i, j] = self._decode(attrs, inner)
+        return block
+
+    def row_numbers(self):
+        """Números de las filas que existen en el XML de la hoja"""
+        return np.flatnonzero(self.row_offsets >= 0).tolist()
+
+    def iter_cells(self):
+        """(fila, columna, valor) de cada celda con valor, fila por fila, sin usar la caché"""
+        for row in self.row_numbers():
+            changes = self.pending.get(row, {})
+            cells = self._parse_row(row)
+            for col in sorted(set(cells) | set(changes)):
+                if col in changes:
+                    value = changes[col][0]
+                else:
+                    attrs, inner, _ = cells[col]
+                    value = self._decode(attrs, inner)
+                if value is not None:
+                    yield row, col, value
+
+    def _style_index(self, row, col):
+        changes = self.pending.get(row)
+        if changes and col in changes:
+            return changes[col][1]
+        cell = self._row_cells(row).get(col)
+        return int(cell[0].get(b's', 0)) if cell else 0
+
+    def _decode(self, attrs, inner):
+        """Valor de una celda con las mismas reglas de tipo que el lector de openpyxl"""
+        data_type = attrs.get(b't', b'n')
+        formula = _FORMULA_RE.search(inner)
+        if formula is not None:
+            return '=' + html.unescape((formula.group(2) or b'').decode('utf-8'))
+        if data_type == b'inlineStr':
+            texts = _TEXT_RE.findall(_PHONETIC_RE.sub(b'', inner))
+            return unescape_xlsx(html.unescape(b''.join(texts).decode('utf-8')))
+        match = _VALUE_RE.search(inner)
+        if match is None:
+            return None
+        value = html.unescape(match.group(1).decode('utf-8'))
+        if data_type == b's':
+            return self.shared_strings[int(value)]
+        if data_type == b'b':
+            return value in ('1', 'true')
+        if data_type in (b'str', b'e'):
+            return value
+        if data_type == b'd':
+            return datetime.fromisoformat(value)
+        if not value:
+            return None
+        number = float(value) if ('.' in value or 'E' in value or 'e' in value) else int(value)
+        style = int(attrs.get(b's', 0))
+        if style < len(self.xf_formats) and is_date_format(self.xf_formats[style]):
+            fmt = self.xf_formats[style]
+            return from_excel(number, self.epoch, timedelta=is_timedelta_format(fmt))
+        return number
+
+    # --- Escritura -------------------------------------------------------------------------
+
+    def set(self, row, col, value, number_format=None):
+        """
+        Registra el nuevo valor de una celda conservando su estilo; number_format lo reemplaza
+        por un estilo derivado. Igual que en openpyxl, una fecha en una celda sin formato de
+        fecha recibe el formato de fecha predeterminado.
+        """
+        if isinstance(value, str) and ILLEGAL_CHARACTERS_RE.search(value):
+            raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+        if self._row_span(row) is None:
+            raise KeyError(f"La fila {row} no existe en la hoja")
+        style = self._style_index(row, col)
+        current_format = self.xf_formats[style] if style < len(self.xf_formats) else 'General'
+        if number_format is None and isinstance(value, (datetime, date, time, timedelta)):
+            if not is_date_format(current_format):
+                number_format = TIME_FORMATS[type(value) if type(value) in TIME_FORMATS else datetime]
+        if number_format is not None and number_format != current_format:
+            style = self._derive_style(style, number_format)
+        cell = self._row_cells(row).get(col)
+        if cell is not None and _FORMULA_RE.search(cell[1]):
+            formula_attrs = dict(_ATTR_RE.findall(_FORMULA_RE.search(cell[1]).group(1)))
+            if formula_attrs.get(b't') == b'shared' and b'ref' in formula_attrs:
+                raise ValueError(f"La celda {get_column_letter(col)}{row} es la base de una fórmula compartida")
+            self.formulas_removed = True
+        self.pending.setdefault(row, {})[col] = (value, style)
+        self.cells_written += 1
+        self.written_columns.add(col)
+
+    def _derive_style(self, style, number_format):
+        """Índice de un estilo igual a style pero con otro formato numérico (se agrega si no existe)"""
+        key = (style, number_format)
+        if key in self.xf_cache:
+            return self.xf_cache[key]
+        if self.styles_xml is None:
+            raise ValueError("El libro no tiene styles.xml; use el motor 'openpyxl'")
+        num_fmt_id = self._num_fmt_id(number_format)
+        xfs = self._cell_xfs()
+        base = xfs[style] if style < len(xfs) else xfs[0]
+        tag_end = base.index(b'>')
+        opening = base[:tag_end]
+        if re.search(rb'\bnumFmtId="\d+"', opening):
+            opening = re.sub(rb'\bnumFmtId="\d+"', b'numFmtId="%d"' % num_fmt_id, opening)
+        else:
+            opening = opening.replace(b'<xf', b'<xf numFmtId="%d"' % num_fmt_id, 1)
+        if re.search(rb'\bapplyNumberFormat="[^"]*"', opening):
+            opening = re.sub(rb'\bapplyNumberFormat="[^"]*"', b'applyNumberFormat="1"', opening)
+        else:
+            closing = b'/' if opening.endswith(b'/') else b''
+            opening = opening[:len(opening) - len(closing)].rstrip() + b' applyNumberFormat="1"' + closing
+        derived = opening + base[tag_end:]
+        if derived in xfs:
+            index = xfs.index(derived)
+        else:
+            section = re.search(rb'<cellXfs\b[^>]*>(.*?)</cellXfs>', self.styles_xml, re.DOTALL)
+            insert_at = section.end(1)
+            self.styles_xml = self.styles_xml[:insert_at] + derived + self.styles_xml[insert_at:]
+            index = len(xfs)
+            self.styles_xml = re.sub(rb'(<cellXfs\b[^>]*?\bcount=")\d+(")',
+                                     lambda m: m.group(1) + b'%d' % (index + 1) + m.group(2),
+                                     self.styles_xml, count=1)
+            self.xf_formats.append(self._format_code(num_fmt_id))
+        self.xf_cache[key] = index
+        return index
+
+    def _num_fmt_id(self, number_format):
+        """Id del formato numérico; los formatos personalizados nuevos se agregan a numFmts"""
+        if number_format in BUILTIN_FORMATS_REVERSE:
+            return BUILTIN_FORMATS_REVERSE[number_format]
+        for num_fmt_id, code in self.custom_formats.items():
+            if code == number_format:
+                return num_fmt_id
+        num_fmt_id = max([163] + list(self.custom_formats)) + 1
+        element = b'<numFmt numFmtId="%d" formatCode="%s"/>' % (num_fmt_id, _escape(number_format, quote=True))
+        # <numFmts count="0"/> vacío (como lo escribe openpyxl) se abre para poder agregar formatos
+        self.styles_xml = re.sub(rb'<numFmts\b([^>]*?)\s*/>', rb'<numFmts\1></numFmts>', self.styles_xml, count=1)
+        if b'<numFmts' in self.styles_xml:
+            self.styles_xml = re.sub(rb'</numFmts>', element + b'</numFmts>', self.styles_xml, count=1)
+            self.styles_xml = re.sub(rb'(<numFmts\b[^>]*?\bcount=")\d+(")',
+                                     lambda m: m.group(1) + b'%d' % (len(self.custom_formats) + 1) + m.group(2),
+                                     self.styles_xml, count=1)
+        else:
+            self.styles_xml = re.sub(rb'(<styleSheet\b[^>]*>)',
+                                     lambda m: m.group(1) + b'<numFmts count="1">' + element + b'</numFmts>',
+                                     self.styles_xml, count=1)
+        self.custom_formats[num_fmt_id] = number_format
+        return num_fmt_id
+
+    def _encode(self, ref, value, style):
+        """XML de una celda con el valor indicado, al estilo del escritor de openpyxl"""
+        attrs = b'r="%s"' % ref.encode()
+        if style:
+            attrs += b' s="%d"' % style
+        if value is None:
+            return b'<c %s/>' % attrs
+        if isinstance(value, bool):
+            return b'<c %s t="b"><v>%d</v></c>' % (attrs, int(value))
+        if isinstance(value, (datetime, date, time, timedelta)):
+            serial = to_excel(value, self.epoch)
+            return b'<c %s><v>%s</v></c>' % (attrs, _number(serial))
+        if isinstance(value, pynumbers.Number):
+            if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+                return b'<c %s t="n"><v/></c>' % attrs
+            return b'<c %s t="n"><v>%s</v></c>' % (attrs, _number(value))
+        text = str(value)
+        if text.startswith('=') and len(text) > 1:
+            return b'<c %s><f>%s</f><v/></c>' % (attrs, _escape(text[1:]))
+        space = b' xml:space="preserve"' if text != text.strip() or '\n' in text else b''
+        return b'<c %s t="inlineStr"><is><t%s>%s</t></is></c>' % (attrs, space, _escape(text))
+
+    def _render_row(self, row, span):
+        """Fila con las celdas modificadas reemplazadas o insertadas en orden de columna"""
+        tag = self.sheet_xml[span[0]:self.sheet_xml.index(b'>', span[0]) + 1]
+        # spans es solo una pista de las columnas usadas; se omite porque pueden agregarse celdas
+        opening = re.sub(rb'\s+spans="[^"]*"', b'', tag)
+        if opening.endswith(b'/>'):
+            opening = opening[:-2].rstrip() + b'>'
+        cells = {col: xml for col, (_, _, xml) in self._row_cells(row).items()}
+        for col, (value, style) in self.pending[row].items():
+            cells[col] = self._encode(f'{get_column_letter(col)}{row}', value, style)
+        return opening + b''.join(cells[col] for col in sorted(cells)) + b'</row>'
+
+    def save(self, path=None):
+        """Escribe el libro reemplazando solo la hoja modificada y, si cambió, styles.xml"""
+        path = path or self.path
+        pieces = []
+        position = 0
+        max_col = 0
+        for row in sorted(self.pending, key=lambda r: int(self.row_offsets[r])):
+            span = self._row_span(row)
+            pieces.append(self.sheet_xml[position:span[0]])
+            pieces.append(self._render_row(row, span))
+            position = span[1]
+            max_col = max(max_col, max(self.pending[row]))
+        pieces.append(self.sheet_xml[position:])
+        sheet_xml = b''.join(pieces)
+        if self.pending:
+            sheet_xml = self._update_dimension(sheet_xml, max_col)
+
+        replaced = {self.sheet_name: sheet_xml}
+        if self.styles_xml is not None:
+            replaced['xl/styles.xml'] = self.styles_xml
+        removed = set()
+        if self.formulas_removed and 'xl/calcChain.xml' in self.names:
+            # La cadena de cálculo referencia las fórmulas reemplazadas: Excel la reconstruye al abrir
+            removed.add('xl/calcChain.xml')
+            with zipfile.ZipFile(self.path) as zin:
+                replaced['xl/_rels/workbook.xml.rels'] = re.sub(
+                    rb'<Relationship\b[^>]*?Target="[^"]*calcChain\.xml"[^>]*/>', b'',
+                    zin.read('xl/_rels/workbook.xml.rels'))
+                replaced['[Content_Types].xml'] = re.sub(
+                    rb'<Override\b[^>]*?PartName="/xl/calcChain\.xml"[^>]*/>', b'',
+                    zin.read('[Content_Types].xml'))
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(suffix='.xlsx', dir=directory)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(self.path) as zin, \
+                    zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+                for info in zin.infolist():
+                    if info.filename in removed:
+                        continue
+                    data = replaced.get(info.filename)
+                    zout.writestr(info, zin.read(info.filename) if data is None else data)
+            if os.path.exists(path):
+                shutil.copymode(path, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        logging.info(f"Concentrado guardado ({sum(len(c) for c in self.pending.values())} celdas en "
+                     f"{len(self.pending)} filas modificadas)")
+
+        # El contenido guardado pasa a ser el estado actual de la hoja
+        self.path = path
+        self.names -= removed
+        self.sheet_xml = sheet_xml
+        self._index_rows()
+        self.pending = {}
+        self.row_cache = {}
+        self.formulas_removed = False
+        for hook in self.save_hooks:
+            hook(path)
+
+    def close(self):
+        """El archivo no queda abierto entre lecturas: no hay nada que liberar"""
+
+    def _update_dimension(self, sheet_xml, max_col):
+        match = _DIMENSION_RE.search(sheet_xml)
+        if match is None:
+            return sheet_xml
+        ref = match.group(1).decode()
+        first, _, last = ref.partition(':')
+        last = last or first
+        last_match = _REF_RE.fullmatch(last)
+        if last_match is None:
+            return sheet_xml
+        col = max(column_index_from_string(last_match.group(1)), max_col)
+        row = max(int(last_match.group(2)), max(self.pending))
+        new_ref = f'{first}:{get_column_letter(col)}{row}'.encode()
+        return sheet_xml[:match.start(1)] + new_ref + sheet_xml[match.end(1):]
+
+
+def open_sheet(path, engine='openpyxl'):
+    """Abre la hoja activa del concentrado con el motor indicado (ver ENGINES)"""
+    if engine == 'openpyxl':
+        return OpenpyxlSheet(path)
+    if engine == 'xml':
+        return XmlSheet(path)
+    if engine == 'sqlite':
+        # Importación diferida: concentrado_db usa las hojas de este módulo para importar y exportar
+        from concentrado_db import SqliteSheet
+        return SqliteSheet(path)
+    raise ValueError(f"Motor de Excel no válido: {engine}")
+
+
+def _escape(text, quote=False):
+    return html.escape(text, quote=quote).encode('utf-8')
+
+
+def _number(value):
+    """
+    Texto de un número como lo escribe openpyxl ('%.16g': 5499.0 -> 5499, 0.1 -> 0.1); los
+    enteros se escriben con todos sus dígitos aunque pasen de 16
+    """
+    if isinstance(value, pynumbers.Integral):
+        return b'%d' % int(value)
+    return b'%.16g' % float(value)
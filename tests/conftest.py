@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Los scripts se importan entre sí como módulos planos desde scripts/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+# Cada script abre su log en logs/ al importarse: las pruebas corren en un directorio temporal
+_workdir = tempfile.mkdtemp(prefix='sears-tests-')
+os.makedirs(os.path.join(_workdir, 'logs'))
+os.chdir(_workdir)
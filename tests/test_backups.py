@@ -0,0 +1,55 @@
+import os
+from datetime import datetime
+
+import backups
+from backups import BackupPolicy, create_backup, list_backups
+
+
+def concentrado(tmp_path, contenido=b'concentrado'):
+    src = tmp_path / 'Concentrado Sears.xlsx'
+    src.write_bytes(contenido)
+    return str(src)
+
+
+def test_create_backup_twice_keeps_both(tmp_path):
+    src = concentrado(tmp_path)
+    backup_dir = str(tmp_path / 'backups')
+    primero = create_backup(src, backup_dir, 'csv_')
+    segundo = create_backup(src, backup_dir, 'csv_')
+    assert primero != segundo
+    assert sorted(os.listdir(backup_dir)) == sorted([os.path.basename(primero), os.path.basename(segundo)])
+
+
+def test_create_backup_compressed_twice_keeps_both(tmp_path):
+    src = concentrado(tmp_path)
+    backup_dir = str(tmp_path / 'backups')
+    policy = BackupPolicy(compress=True)
+    primero = create_backup(src, backup_dir, policy=policy)
+    segundo = create_backup(src, backup_dir, policy=policy)
+    assert primero != segundo
+    assert len(os.listdir(backup_dir)) == 2
+
+
+def test_create_backup_same_instant_never_overwrites(tmp_path, monkeypatch):
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2026, 10, 17, 23, 49, 58, 123456)
+
+    monkeypatch.setattr(backups, 'datetime', FixedDatetime)
+    backup_dir = str(tmp_path / 'backups')
+    rutas = [create_backup(concentrado(tmp_path, f'version {i}'.encode()), backup_dir, 'csv_') for i in range(3)]
+    assert len(set(rutas)) == 3
+    # Cada respaldo conserva el contenido que tenía el concentrado al crearlo
+    assert [open(ruta, 'rb').read() for ruta in rutas] == [b'version 0', b'version 1', b'version 2']
+    # El más reciente (mayor contador) va primero
+    assert [ruta for _, _, ruta in list_backups(backup_dir)] == rutas[::-1]
+
+
+def test_list_backups_reads_names_without_microseconds(tmp_path):
+    backup_dir = tmp_path / 'backups'
+    backup_dir.mkdir()
+    (backup_dir / 'Concentrado_Sears_backup_20261017_234958.xlsx').write_bytes(b'')
+    (backup_dir / 'Concentrado_Sears_backup_csv_20261017_234958_500000.xlsx').write_bytes(b'')
+    fechas = [created for created, _, _ in list_backups(str(backup_dir))]
+    assert fechas == [datetime(2026, 10, 17, 23, 49, 58, 500000), datetime(2026, 10, 17, 23, 49, 58)]
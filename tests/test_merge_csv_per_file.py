@@ -0,0 +1,36 @@
+import os
+
+from merge_csv_data import SearsCsvMerger
+from synthetic import generar_concentrado, generar_csv, generar_pedidos
+
+
+def test_per_file_mode_keeps_one_backup_per_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('RESULTADOFINAL')
+    os.makedirs('CSVreporte')
+    pedidos = generar_pedidos(30)
+    generar_concentrado(os.path.join('RESULTADOFINAL', 'Concentrado Sears.xlsx'), pedidos)
+    for i in range(3):
+        generar_csv(os.path.join('CSVreporte', f'Reporte - Pedidos-{i}.csv'), pedidos[i * 10:(i + 1) * 10], semilla=i)
+
+    merger = SearsCsvMerger(use_index=False)
+    estados = []
+    # Contenido del concentrado antes de cada CSV (lo que debe guardar su respaldo)
+    original_merge = merger.merge_csv_data
+
+    def merge_csv_data(csv_file):
+        with open(merger.concentrado_file, 'rb') as f:
+            estados.append(f.read())
+        original_merge(csv_file)
+
+    monkeypatch.setattr(merger, 'merge_csv_data', merge_csv_data)
+    merger.process_all_csvs(batch=False)
+
+    respaldos = sorted(os.listdir(merger.backup_dir))
+    assert len(respaldos) == 3
+    assert all(nombre.startswith('Concentrado_Sears_backup_csv_') for nombre in respaldos)
+    contenidos = []
+    for nombre in respaldos:
+        with open(os.path.join(merger.backup_dir, nombre), 'rb') as f:
+            contenidos.append(f.read())
+    assert contenidos == estados
@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from merge_data import SearsMerger
+
+
+def process_duplicates_reference(extractions_df):
+    """Ciclo original por pedido de SearsMerger.process_duplicates (referencia de paridad)"""
+    duplicados = extractions_df[extractions_df.duplicated(['Numero_Pedido'], keep=False)]
+    pedidos_duplicados = duplicados['Numero_Pedido'].unique()
+
+    processed_data = {}
+    for pedido in pedidos_duplicados:
+        registros = extractions_df[extractions_df['Numero_Pedido'] == pedido]
+        total_sumado = registros['Total'].sum()
+        primer_registro = registros.iloc[0].to_dict()
+        primer_registro['Total'] = total_sumado
+        # astype(object).map(str) da el mismo texto que astype(str) con pandas < 3 ('<NA>', 'None')
+        primer_registro['documentos_sumados'] = ', '.join(registros['Numero_Documento'].astype(object).map(str))
+        processed_data[pedido] = primer_registro
+
+    return processed_data, pedidos_duplicados
+
+
+def extractions(filas, pedidos, seed, documentos_enteros):
+    """Extracciones sintéticas con pedidos repetidos, totales NaN y documentos nulos"""
+    rng = np.random.default_rng(seed)
+    totales = rng.uniform(-5000, 5000, filas).round(2)
+    totales[rng.random(filas) < 0.1] = np.nan
+    documentos = pd.Series(rng.integers(1_000_000, 9_999_999, filas), dtype='Int64')
+    documentos[rng.random(filas) < 0.1] = pd.NA
+    if not documentos_enteros:
+        documentos = documentos.astype(object).where(documentos.notna(), None)
+    return pd.DataFrame({
+        'Numero_Pedido': pd.Series(rng.integers(80_000_000, 80_000_000 + pedidos, filas), dtype='Int64'),
+        'Fecha_Pedido': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, filas), unit='D'),
+        'Fecha_Vencimiento': pd.NaT,
+        'Numero_Documento': documentos,
+        'Total': totales,
+        'Tipo_Docto': rng.choice(['NP', 'NC', 'ND'], filas),
+        'Descripcion': rng.choice(['PEDIDO ENTREGADO', 'NOTA DE CREDITO', None], filas),
+        'Cheque': '71113',
+        'Proveedor': '131609',
+        'Archivo_PDF': rng.choice(['Pago-1.pdf', 'Pago-2.pdf'], filas),
+    })
+
+
+def same_value(a, b):
+    if a is None or b is None or (not isinstance(a, str) and pd.isna(a)):
+        return (a is None or pd.isna(a)) and (b is None or pd.isna(b))
+    return a == b
+
+
+@pytest.mark.parametrize('filas, pedidos, seed, documentos_enteros', [
+    (2000, 1500, 1, True),
+    (2000, 300, 2, False),
+    (500, 50, 3, True),
+])
+def test_process_duplicates_matches_reference(filas, pedidos, seed, documentos_enteros):
+    df = extractions(filas, pedidos, seed, documentos_enteros)
+    esperado, pedidos_esperados = process_duplicates_reference(df)
+    resultado, pedidos_resultado = SearsMerger(use_index=False).process_duplicates(df)
+
+    assert list(pedidos_resultado) == list(pedidos_esperados)
+    assert list(resultado) == list(esperado)
+    for pedido, registro in esperado.items():
+        obtenido = resultado[pedido]
+        assert set(obtenido) == set(registro)
+        assert obtenido['documentos_sumados'] == registro['documentos_sumados']
+        # groupby suma con compensación: puede diferir en el último bit del ciclo original
+        assert math.isclose(obtenido['Total'], registro['Total'], rel_tol=1e-12, abs_tol=1e-9)
+        for columna in registro.keys() - {'Total', 'documentos_sumados'}:
+            assert same_value(obtenido[columna], registro[columna]), (pedido, columna)
+
+
+def test_process_duplicates_without_duplicates():
+    df = extractions(100, 10_000_000, 4, True).drop_duplicates('Numero_Pedido')
+    resultado, pedidos = SearsMerger(use_index=False).process_duplicates(df)
+    assert resultado == {}
+    assert len(pedidos) == 0